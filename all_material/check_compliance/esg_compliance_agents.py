@@ -1,4 +1,5 @@
-import asyncio, json, os, re, aiomysql, pandas as pd
+import asyncio, json, os, random, re, aiomysql, pandas as pd
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Sequence, Dict, Any, List, Tuple
 
@@ -9,6 +10,7 @@ from autogen_agentchat.base import Response
 from autogen_core import CancellationToken
 from autogen_core.models import UserMessage
 from autogen_ext.models.openai import OpenAIChatCompletionClient
+from openai import APIConnectionError, APITimeoutError, RateLimitError
 
 # ──────────────────────────────────── 基本設定 ────────────────────────────────────
 env_path = Path(__file__).resolve().parent / ".env"
@@ -26,6 +28,10 @@ MYSQL_CONFIG = dict(
 TEST_PAIRS_JSON      = "all_material/check_compliance/test_pairs.json"
 TEST_EXCEL_OUTPUT    = "compliance_summary_report.xlsx"
 MODEL_NAME           = "gpt-4.1"
+MAX_CONCURRENCY      = 8      # 同時進行的 LLM 分析數
+MAX_RETRIES          = 5      # 遇到速率限制 / 連線錯誤時的最大重試次數
+DB_POOL_SIZE         = 10     # MySQL 連線池上限
+DB_WRITE_BATCH       = 50     # 每次 executemany 寫入的筆數
 
 # ─────────────────────────────── 資料庫：建立 / 更新 ───────────────────────────────
 async def setup_database(cfg: Dict[str, Any], *, recreate: bool = True) -> bool:
@@ -68,6 +74,59 @@ async def setup_database(cfg: Dict[str, Any], *, recreate: bool = True) -> bool:
         print("❌ 資料庫設定失敗:", e)
         return False
 
+# ─────────────────────────────── 資料庫：連線池 / 批次寫入 ───────────────────────────
+async def create_db_pool(cfg: Dict[str, Any], *, maxsize: int = DB_POOL_SIZE) -> aiomysql.Pool:
+    """建立整個流程共用的連線池（需在 setup_database 建好資料庫之後呼叫）"""
+    return await aiomysql.create_pool(minsize=1, maxsize=maxsize, **cfg)
+
+async def close_db_pool(pool: aiomysql.Pool) -> None:
+    pool.close()
+    await pool.wait_closed()
+
+@asynccontextmanager
+async def use_pool(pool: aiomysql.Pool | None, cfg: Dict[str, Any]):
+    """有共用連線池時直接使用；否則建立暫時的連線池並在結束時關閉"""
+    if pool is not None:
+        yield pool
+        return
+    pool = await create_db_pool(cfg)
+    try:
+        yield pool
+    finally:
+        await close_db_pool(pool)
+
+class ComplianceResultWriter:
+    """緩衝合規分析結果，累積 batch_size 筆後以 executemany 一次寫入"""
+    INSERT_SQL = """
+        INSERT INTO compliance_reports
+            (gri_standard_title, gri_clause, gri_query,
+             report_sentence, analysis_result, is_compliant)
+        VALUES (%s,%s,%s,%s,%s,%s)
+    """
+
+    def __init__(self, pool: aiomysql.Pool, *, batch_size: int = DB_WRITE_BATCH, name: str = "Writer"):
+        self.pool, self.batch_size, self.name = pool, max(1, batch_size), name
+        self.rows: List[Tuple] = []
+
+    async def add(self, *vals):
+        self.rows.append(vals)
+        if len(self.rows) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        if not self.rows: return
+        rows, self.rows = self.rows, []
+        try:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cur:
+                    await cur.executemany(self.INSERT_SQL, rows)
+            print(f"💾 [{self.name}] 已儲存 {len(rows)} 筆: {rows[0][1]} ~ {rows[-1][1]}")
+        except Exception as e:
+            print(f"❌ [{self.name}] 寫入失敗:", e)
+
+    async def __aenter__(self): return self
+    async def __aexit__(self, *exc): await self.flush()
+
 # ──────────────────────────────── 工具：解析 JSON ────────────────────────────────
 def extract_json(raw: str) -> Dict[str, Any] | None:
     """從 GPT 回覆中抓第一個 JSON 物件"""
@@ -90,26 +149,41 @@ def heuristic_compliance(txt: str) -> bool | None:
     if any(k in lower for k in ("符合", "true")):            return True
     return None
 
+def format_answer(answer: Dict[str, Any]) -> str:
+    """RAG 答案轉為提示文字；語意分塊帶有章節與頁碼時加上出處標記"""
+    content = answer.get("content", "")
+    source = []
+    if answer.get("heading_path"): source.append(answer["heading_path"])
+    if answer.get("page") is not None:
+        page = answer["page"]
+        source.append(f"p.{page}-{answer['page_end']}" if answer.get("page_end") else f"p.{page}")
+    return f"[{' | '.join(source)}]\n{content}" if source and content.strip() else content
+
 # ──────────────────────────── ComplianceAnalysisAgent ───────────────────────────
 class ComplianceAnalysisAgent(BaseChatAgent):
-    def __init__(self, name, db_cfg, model_client):
+    def __init__(self, name, db_cfg, model_client, *, pool: aiomysql.Pool | None = None,
+                 max_concurrency: int = MAX_CONCURRENCY, max_retries: int = MAX_RETRIES,
+                 batch_size: int = DB_WRITE_BATCH):
         super().__init__(name, description="使用 LLM 分析 ESG 與 GRI 的合規性")
-        self.db_cfg, self.model = db_cfg, model_client
+        self.db_cfg, self.model, self.pool = db_cfg, model_client, pool
+        self.max_concurrency, self.max_retries = max(1, max_concurrency), max_retries
+        self.batch_size = batch_size
 
-    async def _save(self, *vals):
-        try:
-            conn = await aiomysql.connect(**self.db_cfg)
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    INSERT INTO compliance_reports
-                        (gri_standard_title, gri_clause, gri_query,
-                         report_sentence, analysis_result, is_compliant)
-                    VALUES (%s,%s,%s,%s,%s,%s)
-                """, vals)
-            await conn.ensure_closed()
-            print(f"💾 [{self.name}] 已儲存: {vals[0]} - {vals[1]}")
-        except Exception as e:
-            print(f"❌ [{self.name}] 寫入失敗:", e)
+    async def _create_with_backoff(self, messages):
+        """呼叫 LLM；遇到速率限制或暫時性錯誤時依 Retry-After 或指數退避（含抖動）重試"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self.model.create(messages=messages)
+            except (RateLimitError, APITimeoutError, APIConnectionError) as e:
+                if attempt == self.max_retries: raise
+                retry_after = None
+                response = getattr(e, "response", None)
+                if response is not None:
+                    try: retry_after = float(response.headers.get("retry-after"))
+                    except (TypeError, ValueError): retry_after = None
+                delay = retry_after if retry_after is not None else min(2 ** attempt, 30) + random.random()
+                print(f"   ⏳ [{self.name}] {type(e).__name__}，{delay:.1f} 秒後重試 ({attempt+1}/{self.max_retries})")
+                await asyncio.sleep(delay)
 
     async def _analyze(self, title, clause, query, report_txt) -> Tuple[str,bool,bool]:
         prompt = f"""
@@ -125,9 +199,7 @@ GRI 標題: {title}
 --- 內容結束 ---
 """
         try:
-            rsp = await self.model.create(
-                messages=[UserMessage(content=prompt, source="user")]
-            )
+            rsp = await self._create_with_backoff([UserMessage(content=prompt, source="user")])
             gpt_text = rsp.content if hasattr(rsp, "content") else rsp.model_dump()["choices"][0]["message"]["content"]
             print("   LLM 回應:", gpt_text[:60], "...")
             data = extract_json(gpt_text)
@@ -144,26 +216,59 @@ GRI 標題: {title}
     async def on_messages(self, msgs: Sequence[BaseChatMessage], token: CancellationToken) -> Response:
         if not msgs: return Response(chat_message=TextMessage(content="缺少訊息",source=self.name))
         data = json.loads(msgs[-1].content)
-        processed=saved=0
+        jobs: List[Tuple[str,str,str,str]] = []
         for sec in data.get("rag_results", []):
             title = sec.get("title","未知")
             for item in sec.get("items", []):
                 clause=item.get("clause","無")
                 query =item.get("query","")
                 answers=item.get("answers",[])
-                content="\n\n---\n\n".join(a.get("content","") for a in answers if isinstance(a,dict))
+                content="\n\n---\n\n".join(format_answer(a) for a in answers if isinstance(a,dict))
                 if not content.strip(): continue
-                processed+=1
-                reason, ok, succ = await self._analyze(title, clause, query, content)
-                neg_hit = any(k in reason for k in ("不足", "不符合", "不完全", "矛盾"))
-                if neg_hit:
-                    ok = False
-                if succ:
-                    await self._save(title, clause, query, content, reason, int(ok))
-                    if ok:
-                        saved += 1
-                elif not succ:
-                    print(f"   ⚠️ 解析失敗略過: {title}-{clause}")
+                jobs.append((title, clause, query, content))
+
+        # 以 semaphore 限制同時進行的 LLM 呼叫數；單一子句失敗只影響該子句
+        sem = asyncio.Semaphore(self.max_concurrency)
+        async def run(index, job):
+            async with sem:
+                try:
+                    return index, await self._analyze(*job)
+                except Exception as e:
+                    return index, (f"LLM 呼叫錯誤: {e}", False, False)
+
+        processed, saved = len(jobs), 0
+        async with use_pool(self.pool, self.db_cfg) as pool:
+            async with ComplianceResultWriter(pool, batch_size=self.batch_size, name=self.name) as writer:
+                async def write(job, result):
+                    nonlocal saved
+                    title, clause, query, content = job
+                    reason, ok, succ = result
+                    neg_hit = any(k in reason for k in ("不足", "不符合", "不完全", "矛盾"))
+                    if neg_hit:
+                        ok = False
+                    if succ:
+                        await writer.add(title, clause, query, content, reason, int(ok))
+                        if ok:
+                            saved += 1
+                    else:
+                        print(f"   ⚠️ 解析失敗略過: {title}-{clause}")
+
+                # 結果一完成就交給 writer（累積 batch_size 筆即寫入），並以緩衝區維持子句原始順序
+                tasks = [asyncio.create_task(run(i, job)) for i, job in enumerate(jobs)]
+                done: Dict[int, Tuple[str,bool,bool]] = {}
+                next_index = 0
+                try:
+                    for future in asyncio.as_completed(tasks):
+                        index, result = await future
+                        done[index] = result
+                        while next_index in done:
+                            await write(jobs[next_index], done.pop(next_index))
+                            next_index += 1
+                finally:
+                    # 中途發生錯誤或被取消時，仍寫入已完成但還在緩衝區的結果
+                    for task in tasks: task.cancel()
+                    for index in sorted(done):
+                        await write(jobs[index], done[index])
         return Response(chat_message=TextMessage(
             content=f"已處理 {processed} 子句，已儲存 {saved} 條合規紀錄。", source=self.name))
 
@@ -173,18 +278,18 @@ GRI 標題: {title}
 
 # ─────────────────────────────── ResultIntegrationAgent ─────────────────────────
 class ResultIntegrationAgent(BaseChatAgent):
-    def __init__(self,name,db_cfg,out_file):
+    def __init__(self,name,db_cfg,out_file,*,pool:aiomysql.Pool|None=None):
         super().__init__(name, description="彙整合規結果並輸出 Excel")
-        self.db_cfg,self.out_file=db_cfg,out_file
+        self.db_cfg,self.out_file,self.pool=db_cfg,out_file,pool
 
     async def _fetch(self)->List[Dict]:
-        conn=await aiomysql.connect(**self.db_cfg)
-        async with conn.cursor(aiomysql.DictCursor) as cur:
-            await cur.execute("""SELECT * 
-                                 FROM compliance_reports 
-                                 ORDER BY gri_standard_title, gri_clause""")
-            data=await cur.fetchall()
-        await conn.ensure_closed()
+        async with use_pool(self.pool,self.db_cfg) as pool:
+            async with pool.acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await cur.execute("""SELECT * 
+                                         FROM compliance_reports 
+                                         ORDER BY gri_standard_title, gri_clause""")
+                    data=await cur.fetchall()
         print(f"📊 [{self.name}] 取回 {len(data)} 筆")
         return data
 
@@ -213,20 +318,24 @@ class ResultIntegrationAgent(BaseChatAgent):
 # ──────────────────────────────────── Main ──────────────────────────────────────
 async def main():
     if not await setup_database(MYSQL_CONFIG): return
+    pool  = await create_db_pool(MYSQL_CONFIG)
     model = OpenAIChatCompletionClient(model=MODEL_NAME, api_key=API_KEY)
-    comp = ComplianceAnalysisAgent("ComplianceAnalyzer", MYSQL_CONFIG, model)
-    integ= ResultIntegrationAgent("ReportIntegrator", MYSQL_CONFIG, TEST_EXCEL_OUTPUT)
+    comp = ComplianceAnalysisAgent("ComplianceAnalyzer", MYSQL_CONFIG, model, pool=pool)
+    integ= ResultIntegrationAgent("ReportIntegrator", MYSQL_CONFIG, TEST_EXCEL_OUTPUT, pool=pool)
 
     with open(TEST_PAIRS_JSON,"r",encoding="utf-8") as f:
         raw=f.read()
-    print("\n--- 🎬 開始 LLM 分析流程 ---")
-    await comp.on_messages([TextMessage(content=raw,source="Orchestrator")], CancellationToken())
-    print("--- ✅ 分析結束 ---\n")
-
-    print("--- 🎬 產生 Excel ---")
-    await integ.on_messages([TextMessage(content="export",source="Orchestrator")], CancellationToken())
-    print("--- ✅ 流程完成 ---")
-    await model.close()
+    try:
+        print("\n--- 🎬 開始 LLM 分析流程 ---")
+        await comp.on_messages([TextMessage(content=raw,source="Orchestrator")], CancellationToken())
+        print("--- ✅ 分析結束 ---\n")
+
+        print("--- 🎬 產生 Excel ---")
+        await integ.on_messages([TextMessage(content="export",source="Orchestrator")], CancellationToken())
+        print("--- ✅ 流程完成 ---")
+    finally:
+        await model.close()
+        await close_db_pool(pool)
 
 if __name__=="__main__":
     asyncio.run(main())
@@ -0,0 +1,67 @@
+"""
+OCR後端效能比較
+
+對指定目錄下的圖片，以每個可用的OCR後端（tesserocr / libtesseract / pytesseract）
+依序執行全部7種Tesseract配置，比較每張圖片的平均辨識時間。第一張圖片的時間
+另外列出，可看出常駐引擎載入語言資料的一次性成本。
+
+使用方式（於專案根目錄執行）:
+    python all_material/extract_standards/benchmark_ocr_backends.py --image_dir data/gri_pdf_to_md
+"""
+
+import argparse
+import time
+import warnings
+from pathlib import Path
+
+warnings.simplefilter("ignore")
+
+from gri_to_json_converter import OCR_BACKENDS, OCR_CONFIGS, load_ocr_dependencies
+
+def time_backend(backend, images):
+    """回傳 (第一張圖片耗時, 其餘圖片平均耗時)"""
+    timings = []
+    for image in images:
+        start = time.perf_counter()
+        for config, _ in OCR_CONFIGS:
+            backend.image_to_data(image, config)
+        timings.append(time.perf_counter() - start)
+    rest = timings[1:] or timings
+    return timings[0], sum(rest) / len(rest)
+
+def main():
+    parser = argparse.ArgumentParser(description='比較各OCR後端的辨識時間')
+    parser.add_argument('--image_dir', default='data/gri_pdf_to_md', help='圖片目錄（遞迴搜尋 jpeg/jpg/png）')
+    parser.add_argument('--limit', type=int, default=10, help='最多使用的圖片數')
+    args = parser.parse_args()
+
+    if not load_ocr_dependencies():
+        print("❌ OCR功能不可用: 請安裝 pytesseract, opencv-python-headless 和 Pillow")
+        return
+
+    from PIL import Image
+
+    image_paths = sorted(path for pattern in ("*.jpeg", "*.jpg", "*.png")
+                         for path in Path(args.image_dir).rglob(pattern))[:args.limit]
+    if not image_paths:
+        print(f"❌ 在 {args.image_dir} 中沒有找到圖片")
+        return
+    images = [Image.open(path).convert("L") for path in image_paths]
+
+    print(f"\n{len(images)} 張圖片，每張執行 {len(OCR_CONFIGS)} 種配置")
+    print("-" * 60)
+    print(f"{'後端':<16}{'第一張(秒)':>14}{'其餘平均(秒)':>16}")
+    for name, backend_class in OCR_BACKENDS.items():
+        try:
+            backend = backend_class()
+        except Exception as e:
+            print(f"{name:<16}不可用: {e}")
+            continue
+        try:
+            first, mean = time_backend(backend, images)
+        finally:
+            backend.close()
+        print(f"{name:<16}{first:>14.2f}{mean:>16.2f}")
+
+if __name__ == "__main__":
+    main()
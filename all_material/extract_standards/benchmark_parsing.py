@@ -0,0 +1,67 @@
+"""
+GRI Markdown 解析效能量測
+
+對指定目錄下每個 Markdown 檔案執行 parse_markdown_content（不含 PDF 轉換與 OCR），
+回報每個檔案的解析時間與提取的群組/項目數。每次量測前清除逐行分類快取，量測冷啟動時間。
+
+使用方式（於專案根目錄執行）:
+    python all_material/extract_standards/benchmark_parsing.py --md_dir data/gri_pdf_to_md --repeat 20
+"""
+
+import argparse
+import contextlib
+import io
+import time
+import warnings
+from pathlib import Path
+
+warnings.simplefilter("ignore")
+
+from gri_to_json_converter import (GRIMarkdownToJsonConverter, classify_line,
+                                   classify_lettered_item, classify_roman_subitem)
+
+def clear_line_caches():
+    classify_line.cache_clear()
+    classify_lettered_item.cache_clear()
+    classify_roman_subitem.cache_clear()
+
+def time_parse(content, repeat):
+    """回傳 (最佳耗時, 平均耗時, 轉換器)，解析時的輸出訊息會被隱藏"""
+    timings = []
+    converter = None
+    for _ in range(repeat):
+        clear_line_caches()
+        with contextlib.redirect_stdout(io.StringIO()):
+            converter = GRIMarkdownToJsonConverter(ocr_workers=1, ocr_cache=False)
+            start = time.perf_counter()
+            converter.parse_markdown_content(content)
+            timings.append(time.perf_counter() - start)
+    return min(timings), sum(timings) / len(timings), converter
+
+def main():
+    parser = argparse.ArgumentParser(description='量測GRI Markdown解析時間')
+    parser.add_argument('--md_dir', default='data/gri_pdf_to_md', help='Markdown檔案的目錄（遞迴搜尋）')
+    parser.add_argument('--repeat', type=int, default=20, help='每個檔案重複解析的次數')
+    args = parser.parse_args()
+
+    md_files = sorted(Path(args.md_dir).rglob("*.md"))
+    if not md_files:
+        print(f"❌ 在 {args.md_dir} 中沒有找到Markdown檔案")
+        return
+
+    print(f"\n解析 {len(md_files)} 個檔案，每個重複 {args.repeat} 次")
+    print("-" * 78)
+    print(f"{'檔案':<36}{'行數':>6}{'群組':>6}{'項目':>6}{'最佳(ms)':>12}{'平均(ms)':>12}")
+    total = 0.0
+    for md_file in md_files:
+        content = md_file.read_text(encoding='utf-8')
+        best, mean, converter = time_parse(content, args.repeat)
+        total += best
+        item_count = sum(len(group['items']) for group in converter.groups)
+        print(f"{str(md_file.relative_to(args.md_dir)):<36}{content.count(chr(10)) + 1:>6}"
+              f"{len(converter.groups):>6}{item_count:>6}{best * 1000:>12.2f}{mean * 1000:>12.2f}")
+    print("-" * 78)
+    print(f"總計（最佳）: {total * 1000:.2f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+OCR重複使用檢查
+
+建立只引用一張空白圖片（沒有文字，與每份準則的封面圖片相同）的暫存Markdown，以 --ocr auto
+的模式連續處理：
+1. 第一次：執行Tesseract，結果（空字串）寫入旁路檔與OCR結果快取
+2. 第二次：旁路檔仍有效，不應呼叫Tesseract
+3. 刪除旁路檔後第三次：命中OCR結果快取，同樣不應呼叫Tesseract
+
+需要安裝Tesseract與OCR套件；任一步驟不符合預期時以非零結束碼結束。
+
+使用方式（於專案根目錄執行）:
+    python all_material/extract_standards/check_ocr_reuse.py
+"""
+
+import contextlib
+import io
+import shutil
+import sys
+import tempfile
+import warnings
+from pathlib import Path
+
+warnings.simplefilter("ignore")
+
+from gri_to_json_converter import (GRIMarkdownToJsonConverter, OCRResultCache, get_ocr_backend,
+                                   load_ocr_dependencies, ocr_sidecar_path)
+
+def count_backend_calls(backend):
+    """包裝後端的 image_to_data，返回記錄呼叫次數的 list"""
+    calls = []
+    image_to_data = backend.image_to_data
+    def counted(pil_image, config):
+        calls.append(config)
+        return image_to_data(pil_image, config)
+    backend.image_to_data = counted
+    return calls
+
+def process(md_file, cache):
+    converter = GRIMarkdownToJsonConverter(ocr_workers=1, ocr_cache=cache, ocr_mode="auto")
+    with contextlib.redirect_stdout(io.StringIO()):
+        return converter.process_images_in_markdown(md_file)
+
+def main():
+    if not load_ocr_dependencies():
+        print("❌ OCR功能不可用: 請安裝 pytesseract, opencv-python-headless 和 Pillow")
+        return 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        backend = get_ocr_backend("auto")
+    if backend is None:
+        print("❌ 沒有可用的OCR後端")
+        return 1
+    calls = count_backend_calls(backend)
+
+    from PIL import Image
+
+    work_dir = Path(tempfile.mkdtemp(prefix="ocr_reuse_check_"))
+    try:
+        Image.new("RGB", (600, 800), "white").save(work_dir / "_page_0_Picture_0.jpeg")
+        md_file = work_dir / "GRI 999.md"
+        md_file.write_text("# GRI 999\n\n![](_page_0_Picture_0.jpeg)\n", encoding='utf-8')
+        cache = OCRResultCache(work_dir / "ocr_results.sqlite3")
+
+        steps = []
+        sidecar = process(md_file, cache)
+        steps.append(("第一次（執行OCR）", len(calls) > 0, len(calls)))
+        image = sidecar["images"][0] if sidecar else {}
+        steps.append(("旁路檔記錄OCR成功且沒有文字", image.get("ok") is True and image.get("text") == "", image))
+
+        calls.clear()
+        process(md_file, cache)
+        steps.append(("第二次（沿用旁路檔）", not calls, len(calls)))
+
+        ocr_sidecar_path(md_file).unlink()
+        calls.clear()
+        process(md_file, cache)
+        steps.append(("刪除旁路檔後（命中OCR快取）", not calls, len(calls)))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nOCR後端: {backend.name}")
+    print("-" * 60)
+    for name, passed, detail in steps:
+        print(f"{'✅' if passed else '❌'} {name}: {detail}")
+    return 0 if all(passed for _, passed, _ in steps) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,23 +7,56 @@ GRI Markdown轉JSON轉換器
 """
 
 import json
+import os
 import re
 import sys
+import time
+import hashlib
+import sqlite3
+import threading
 import argparse
+import contextlib
+import io
+from bisect import bisect_left
+from collections import namedtuple
+from functools import lru_cache
 from pathlib import Path
 import warnings
 
-# OCR相關imports
-try:
-    import pytesseract
-    import cv2
-    import numpy as np
-    from PIL import Image
-    OCR_AVAILABLE = True
+# OCR相關的第三方套件（pytesseract / cv2 / numpy / PIL）在第一次需要OCR時才由 load_ocr_dependencies() 載入，
+# 只解析Markdown（或使用 --ocr skip）時不需負擔這些套件的匯入時間
+pytesseract = None
+cv2 = None
+np = None
+Image = None
+_ocr_dependencies_available = None
+
+def load_ocr_dependencies(log=print):
+    """
+    載入OCR相關套件，並在Windows環境下設定Tesseract執行檔路徑（只在第一次呼叫時執行）
+
+    參數:
+        log: 輸出訊息的函式（GUI 傳入 append_progress_message）
+
+    返回:
+        OCR套件是否可用
+    """
+    global pytesseract, cv2, np, Image, _ocr_dependencies_available
+    if _ocr_dependencies_available is not None:
+        return _ocr_dependencies_available
+    
+    try:
+        import pytesseract
+        import cv2
+        import numpy as np
+        from PIL import Image
+    except ImportError:
+        _ocr_dependencies_available = False
+        warnings.warn("OCR功能不可用: 請安裝 pytesseract, opencv-python-headless 和 Pillow")
+        return False
     
     # 🔧 Windows環境下設定Tesseract執行檔路徑
     import platform
-    import os
     if platform.system() == "Windows":
         # 常見的Tesseract安裝路徑
         tesseract_paths = [
@@ -35,76 +68,1118 @@ try:
         for path in tesseract_paths:
             if Path(path).exists():
                 pytesseract.pytesseract.tesseract_cmd = path
-                print(f"✅ 找到Tesseract執行檔: {path}")
+                log(f"✅ 找到Tesseract執行檔: {path}")
                 
                 # 🔧 同時設定TESSDATA_PREFIX環境變數
                 tessdata_dir = str(Path(path).parent / "tessdata")
                 if Path(tessdata_dir).exists():
                     os.environ['TESSDATA_PREFIX'] = tessdata_dir
-                    print(f"✅ 設定TESSDATA_PREFIX: {tessdata_dir}")
+                    log(f"✅ 設定TESSDATA_PREFIX: {tessdata_dir}")
                 
                 break
         else:
-            print("⚠️  未在常見路徑找到Tesseract，請確認安裝位置")
-            
-except ImportError:
-    OCR_AVAILABLE = False
-    warnings.warn("OCR功能不可用: 請安裝 pytesseract, opencv-python-headless 和 Pillow")
+            log("⚠️  未在常見路徑找到Tesseract，請確認安裝位置")
+    
+    _ocr_dependencies_available = True
+    return True
 
-class GRIMarkdownToJsonConverter:
+def __getattr__(name):
+    """相容舊的 OCR_AVAILABLE 常數：存取時才載入OCR套件"""
+    if name == "OCR_AVAILABLE":
+        return load_ocr_dependencies()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class OrderedPatterns:
+    """
+    將「依序嘗試、第一個符合者優先」的多個模式合併成單一預編譯交替式
+    每個模式包在具名群組 p0、p1... 中，以 lastgroup 判斷是哪一個模式符合；
+    在同一位置錨定比對（match）時，交替式的嘗試順序與逐一比對完全相同
+    """
+    
+    def __init__(self, patterns):
+        self.patterns = [re.compile(pattern) for pattern in patterns]
+        self.group_offsets = []
+        parts = []
+        offset = 0
+        for index, pattern in enumerate(self.patterns):
+            # 外層具名群組本身佔一個編號，模式內的群組接在其後
+            self.group_offsets.append(offset + 1)
+            parts.append(f"(?P<p{index}>{pattern.pattern})")
+            offset += 1 + pattern.groups
+        self.regex = re.compile("|".join(parts))
+    
+    def match(self, text):
+        """回傳第一個符合的 (模式索引, 擷取群組)，都不符合時回傳 None"""
+        match = self.regex.match(text)
+        if not match:
+            return None
+        index = int(match.lastgroup[1:])
+        start = self.group_offsets[index]
+        return index, match.groups()[start:start + self.patterns[index].groups]
+    
+    def matches(self, text):
+        """依序產生所有符合的 (模式索引, 擷取群組)；呼叫端拒絕第一個結果時才逐一嘗試後續模式"""
+        first = self.match(text)
+        if first is None:
+            return
+        yield first
+        for index in range(first[0] + 1, len(self.patterns)):
+            match = self.patterns[index].match(text)
+            if match:
+                yield index, match.groups()
+
+# 🔤 Markdown解析用的預編譯模式
+BOLD_TEXT_RE = re.compile(r'\*\*([^*]+)\*\*')
+LIST_BULLET_RE = re.compile(r'^[-•]\s*')
+WHITESPACE_RE = re.compile(r'\s+')
+
+SECTION_DISCLOSURE_PATTERNS = [
+    re.compile(r'揭露項目\s*\*\*(\d+)-\d+\*\*'),    # 揭露項目 **405-1**
+    re.compile(r'揭露項目\s*(\d+)-\d+'),             # 揭露項目 405-1
+    re.compile(r'# 揭露項目\s*\*\*(\d+)-\d+\*\*'),   # # 揭露項目 **405-1**
+    re.compile(r'## 揭露項目\s*\*\*(\d+)-\d+\*\*'),  # ## 揭露項目 **405-1**
+]
+SECTION_GRI_RE = re.compile(r'GRI\s+(\d+)')
+SECTION_NUMBER_RE = re.compile(r'(\d+)-\d+')
+THREE_DIGIT_NUMBER_RE = re.compile(r'\b(\d{3,})\b')
+
+# 標準格式揭露項目標題，群組為 (編號, 標題)
+DISCLOSURE_HEADER_PATTERNS = OrderedPatterns([
+    r'^#+\s*揭露項目\s*\*\*(\d+-\d+)\*\*\s*(.+)',   # ## 揭露項目 **303-1** 標題
+    r'^#+\s*揭露項目\s*(\d+-\d+)\s*(.+)',           # ## 揭露項目 303-1 標題
+    r'^揭露項目\s*\*\*(\d+-\d+)\*\*\s*(.+)',        # 揭露項目 **303-1** 標題
+    r'^揭露項目\s*(\d+-\d+)\s*(.+)',                # 揭露項目 303-1 標題
+    r'^\*\*(\d+-\d+)\*\*\s*(.+)',                   # **303-1** 標題
+    r'^(\d+-\d+)\s*(.+)',                           # 303-1 標題
+])
+NEW_DISCLOSURE_RE = re.compile(
+    r'^#+\s*揭露項目\s*\*\*\d+-\d+\*\*'
+    r'|^#+\s*揭露項目\s*\d+-\d+'
+    r'|^揭露項目\s*\*\*\d+-\d+\*\*'
+    r'|^揭露項目\s*\d+-\d+'
+    r'|^\*\*\d+-\d+\*\*\s+\S+'
+)
+REQUIREMENTS_START_RE = re.compile(r'要求|報導組織應報導以下資訊')
+BOLD_MAIN_ITEM_MARKER_RE = re.compile(r'\*\*[a-e]\.\*\*')
+REQUIREMENTS_END_RE = re.compile(r'建議|指引|背景|彙編要求|^#+\s*(?:建議|指引|背景)|^\d+\.\d+\s+')
+STRONG_SECTION_END_RE = re.compile(
+    r'^#+\s*(?:建議|指引|背景)'         # 明確的標題（移除彙編要求）
+    r'|^揭露項目\s*\*\*\d+-\d+\*\*'    # 新的揭露項目標題
+    r'|^#.*揭露項目.*\d+-\d+'            # 其他揭露項目格式
+)
+MAIN_ITEM_RE = re.compile(r'\*\*[a-e]\.\*\*|^[a-e]\.\s+|[a-e]\.$|^#+\s*\*\*[a-e]\.\*\*')
+COMPILATION_REQUIREMENTS_RE = re.compile(r'^#+\s*彙編要求')
+GUIDANCE_HEADING_RE = re.compile(r'^#+\s*(指引|背景)')
+OCR_BLOCK_MARKER = "**[從圖片提取的文字]**"
+
+# 開頭有字母編號的項目，群組為 (字母, 內容)
+LETTERED_ITEM_START_PATTERNS = OrderedPatterns([
+    r'^\s*-\s*\*\*([a-e])\.\*\*\s+(.+)',       # - **a.** 內容
+    r'^\s*-\s*([a-e])\.\s+(.+)',               # - a. 內容
+    r'^\s*\*\*([a-e])\.\*\*\s+(.+)',           # **a.** 內容
+    r'^\s*([a-e])\.\s+(.+)',                   # a. 內容
+])
+# 結尾有字母編號的項目，群組為 (內容, 字母)
+LETTERED_ITEM_END_PATTERNS = OrderedPatterns([
+    r'^\s*-\s*(.+?)\s+\*\*([a-e])\.\*\*\s*$',  # - 內容 **a.**
+    r'^\s*-\s*(.+?)\s+([a-e])\.\s*$',          # - 內容 a.
+    r'^\s*(.+?)\s+\*\*([a-e])\.\*\*\s*$',      # 內容 **a.**
+    r'^\s*(.+?)\s+([a-e])\.\s*$',              # 內容 a.
+    # 處理冒號後面接字母編號的情況
+    r'^\s*-\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$',  # - 內容: **a.**
+    r'^\s*-\s*(.+?)[：:]\s*([a-e])\.\s*$',          # - 內容: a.
+    # 處理特殊的冒號前置格式
+    r'^\s*-?\s*#+?\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$',  # #### 內容: **a.**
+    r'^\s*-?\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$',       # 內容: **a.**
+    r'^\s*-?\s*(.+?)[：:]\s*([a-e])\.\s*$',               # 內容: a.
+])
+# 羅馬數字子項目：前8個模式的群組為 (羅馬數字, 內容)，後8個為 (內容, 羅馬數字)
+ROMAN_SUBITEM_PATTERNS = OrderedPatterns([
+    # 開頭位置的羅馬數字
+    r'^\s*-\s*\*\*([ivx]+)\.\*\*\s+(.+?)；?$',      # - **i.** 內容；
+    r'^\s*-\s*\*\*([ivx]+)\.\*\*\s+(.+?)$',         # - **i.** 內容
+    r'^\s*\*\*([ivx]+)\.\*\*\s+(.+?)；?$',          # **i.** 內容；
+    r'^\s*\*\*([ivx]+)\.\*\*\s+(.+?)$',             # **i.** 內容
+    r'^\s*-\s*([ivx]+)\.\s+(.+?)；?$',              # - i. 內容；
+    r'^\s*-\s*([ivx]+)\.\s+(.+?)$',                 # - i. 內容
+    r'^\s*([ivx]+)\.\s+(.+?)；?$',                  # i. 內容；
+    r'^\s*([ivx]+)\.\s+(.+?)$',                     # i. 內容
+    
+    # 結尾位置的羅馬數字
+    r'^\s*-\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*；?$',   # - 內容 **ii.**；
+    r'^\s*-\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*$',      # - 內容 **ii.**
+    r'^\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*；?$',       # 內容 **ii.**；
+    r'^\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*$',          # 內容 **ii.**
+    r'^\s*-\s*(.+?)\s+([ivx]+)\.\s*；?$',           # - 內容 ii.；
+    r'^\s*-\s*(.+?)\s+([ivx]+)\.\s*$',              # - 內容 ii.
+    r'^\s*(.+?)\s+([ivx]+)\.\s*；?$',               # 內容 ii.；
+    r'^\s*(.+?)\s+([ivx]+)\.\s*$',                  # 內容 ii.
+])
+ROMAN_SUBITEM_LEADING_COUNT = 8
+# 預先篩選：上述模式都要求行首或行尾有編號標記，沒有標記的行可直接略過
+LETTERED_ITEM_CANDIDATE_RE = re.compile(r'^\s*(?:-\s*)?(?:\*\*)?[a-e]\.|[a-e]\.(?:\*\*)?\s*$')
+ROMAN_SUBITEM_CANDIDATE_RE = re.compile(r'^\s*(?:-\s*)?(?:\*\*)?[ivx]+\.|[ivx]\.(?:\*\*)?\s*；?$')
+VALID_ROMAN_NUMERALS = ('i', 'ii', 'iii', 'iv', 'v')
+
+SPECIAL_COLON_ITEM_RE = re.compile(r'^-\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$')   # - 描述: **a.**
+COLON_BOLD_ITEM_RE = re.compile(r'(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$')          # 描述: **a.**
+BOLD_LETTER_SUFFIX_RE = re.compile(r'\*\*[a-e]\.\*\*\s*$')                        # COLON_BOLD_ITEM_RE 的預先篩選
+SEMICOLON_ROMAN_RE = re.compile(r'^(.+?);\s*\*\*([ivx]+)\.\*\*\s*$')             # 描述; **i.**
+BOLD_ROMAN_RE = re.compile(r'\*\*([ivx]+)\.\*\*')
+TITLE_ITEM_RE = re.compile(r'^#+\s*\*\*([a-h])\.\*\*\s*(.+)')                   # ### **a.** 內容
+# 要求區段掃描範圍：遇到「彙編要求」時回溯的行數，以及最終檢查f、g、h項目的行數
+REQUIREMENT_BACKTRACK_LINES = 30
+REQUIREMENT_LATE_WINDOW = 100
+BACKTRACK_BOLD_ITEM_RE = re.compile(r'^\s*-\s*\*\*[a-h]\.\*\*')
+BACKTRACK_PLAIN_ITEM_RE = re.compile(r'^\s*[a-h]\.\s*')
+# 最終檢查的f、g、h項目，群組為 (字母, 內容)；三種格式的行首字元互斥，每行最多符合一種
+LATE_ITEM_PATTERNS = OrderedPatterns([
+    r'^\s*-\s*\*\*([f-h])\.\*\*\s*(.*)',  # - **f.** 內容
+    r'^\s*\*\*([f-h])\.\*\*\s*(.*)',      # **f.** 內容
+    r'^\s*([f-h])\.\s*(.*)',              # f. 內容
+])
+
+def clean_markdown_text(text):
+    """清理文字，移除多餘空格、星號標記和換行"""
+    # 移除markdown粗體標記
+    text = BOLD_TEXT_RE.sub(r'\1', text)
+    # 移除列表符號
+    text = LIST_BULLET_RE.sub('', text.strip())
+    # 合併多個空格
+    text = WHITESPACE_RE.sub(' ', text)
+    text = text.strip()
+    return text
+
+# 單行的分類結果；每一行只分類一次，解析器直接讀取各欄位
+LineTags = namedtuple("LineTags", [
+    "disclosure",               # (揭露項目編號, 清理後標題) 或 None
+    "new_disclosure",           # 是否為新的揭露項目
+    "requirements_start",       # 是否為要求區段開始
+    "requirements_end",         # 是否為要求區段結束
+    "strong_section_end",       # 是否為強烈的區段結束信號
+    "compilation_requirements", # 是否為「彙編要求」標題
+    "main_item",                # 是否含有主項目標記（a.~e.）
+    "ocr_block",                # 是否為OCR文字區塊標記
+    "guidance_heading",         # 是否為「指引/背景」標題
+    "bold_item_start",          # 是否以 - **a.**~**h.** 開頭
+    "plain_item_start",         # 是否以 a.~h. 開頭
+    "late_item",                # 最終檢查用的 (字母, 原始內容) 或 None
+    "colon_bold_item",          # 冒號前置格式「描述: **a.**」的 (描述, 字母) 或 None
+])
+
+@lru_cache(maxsize=16384)
+def classify_lettered_item(line):
+    """從單行中提取字母編號項目，回傳 (字母, 清理後內容) 或 None，結果依行內容快取"""
+    if not line.strip() or not LETTERED_ITEM_CANDIDATE_RE.search(line):
+        return None
+    
+    # 格式1: 開頭有 a., b., c., d., e.（包括粗體格式）
+    for _, (clause_letter, query_text) in LETTERED_ITEM_START_PATTERNS.matches(line):
+        query_text = clean_markdown_text(query_text)
+        if query_text and len(query_text) > 5:
+            return clause_letter, query_text
+    
+    # 格式2: 結尾有 a., b., c., d., e.（包括粗體格式）
+    for _, (query_text, clause_letter) in LETTERED_ITEM_END_PATTERNS.matches(line):
+        query_text = clean_markdown_text(query_text)
+        if query_text and len(query_text) > 5:
+            return clause_letter, query_text
+    
+    return None
+
+@lru_cache(maxsize=16384)
+def classify_roman_subitem(line):
+    """提取羅馬數字子項目的文字（支援開頭和結尾位置），結果依行內容快取"""
+    if not ROMAN_SUBITEM_CANDIDATE_RE.search(line):
+        return None
+    
+    for index, groups in ROMAN_SUBITEM_PATTERNS.matches(line):
+        if index < ROMAN_SUBITEM_LEADING_COUNT:
+            roman_num, content = groups
+        else:
+            content, roman_num = groups
+        
+        # 驗證是否是有效的羅馬數字（i, ii, iii, iv, v）
+        if roman_num in VALID_ROMAN_NUMERALS:
+            # 移除結尾的分號，統一格式
+            return clean_markdown_text(content).rstrip('；;')
+    
+    return None
+
+@lru_cache(maxsize=16384)
+def classify_line(line):
+    """一次完成單行（已strip）的結構分類，結果依行內容快取；項目內容的提取見 classify_lettered_item / classify_roman_subitem"""
+    disclosure = DISCLOSURE_HEADER_PATTERNS.match(line)
+    if disclosure:
+        disclosure_number, title_text = disclosure[1]
+        disclosure = (disclosure_number, clean_markdown_text(title_text))
+    
+    # 避免將403-8 a項目誤判為要求區段：含有 **a.** 等項目標記的行不是要求區段開始
+    requirements_start = (BOLD_MAIN_ITEM_MARKER_RE.search(line) is None
+                          and REQUIREMENTS_START_RE.search(line) is not None)
+    late_item = LATE_ITEM_PATTERNS.match(line)
+    # 冒號前置格式的延遲比對在長行上代價很高，先確認行尾是 **a.** 再比對
+    colon_bold_item = COLON_BOLD_ITEM_RE.search(line) if BOLD_LETTER_SUFFIX_RE.search(line) else None
+    
+    return LineTags(
+        disclosure=disclosure,
+        new_disclosure=NEW_DISCLOSURE_RE.match(line) is not None,
+        requirements_start=requirements_start,
+        requirements_end=REQUIREMENTS_END_RE.search(line) is not None,
+        strong_section_end=STRONG_SECTION_END_RE.search(line) is not None,
+        compilation_requirements=COMPILATION_REQUIREMENTS_RE.search(line) is not None,
+        main_item=MAIN_ITEM_RE.search(line) is not None,
+        ocr_block=OCR_BLOCK_MARKER in line,
+        guidance_heading=GUIDANCE_HEADING_RE.search(line) is not None,
+        bold_item_start=BACKTRACK_BOLD_ITEM_RE.search(line) is not None,
+        plain_item_start=BACKTRACK_PLAIN_ITEM_RE.search(line) is not None,
+        late_item=late_item[1] if late_item else None,
+        colon_bold_item=colon_bold_item.groups() if colon_bold_item else None,
+    )
+
+# 📖 OCR文字校正字典（依用途分表，每個表內可再依類別分組）
+OCR_CORRECTIONS_FILE = Path(__file__).resolve().parent / "ocr_corrections.json"
+
+class CorrectionEngine:
+    """
+    以Aho-Corasick自動機實作的字串校正引擎
+    建立一次後，以單次由左至右的掃描完成所有替換；同一位置有多個候選時採最左、最長的匹配，
+    替換後的文字不再參與比對。處理時間與文字長度成線性，不隨字典大小增加
+    """
+    
+    def __init__(self, corrections):
+        # 節點以索引表示：goto[節點] = {字元: 子節點}
+        self.goto = [{}]
+        self.fail = [0]
+        self.depth = [0]
+        self.output = [None]    # 以該節點結尾的最長字典詞：(長度, 替換文字)
+        
+        for wrong, correct in corrections.items():
+            if not wrong:
+                continue
+            node = 0
+            for char in wrong:
+                if char not in self.goto[node]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.depth.append(self.depth[node] + 1)
+                    self.output.append(None)
+                    self.goto[node][char] = len(self.goto) - 1
+                node = self.goto[node][char]
+            self.output[node] = (len(wrong), correct)
+        
+        # 以廣度優先建立失敗連結；沒有自身輸出的節點沿用失敗節點的（最長後綴）輸出
+        queue = list(self.goto[0].values())
+        for node in queue:
+            for char, child in self.goto[node].items():
+                fallback = self.fail[node]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                if self.output[child] is None:
+                    self.output[child] = self.output[self.fail[child]]
+                queue.append(child)
+    
+    @classmethod
+    def from_file(cls, path, table):
+        """從JSON字典檔載入指定的表（表內的類別分組會被攤平）"""
+        with open(path, 'r', encoding='utf-8') as f:
+            tables = json.load(f)
+        corrections = {}
+        for key, value in tables[table].items():
+            if isinstance(value, dict):
+                corrections.update(value)
+            else:
+                corrections[key] = value
+        return cls(corrections)
+    
+    def _step(self, node, char):
+        while node and char not in self.goto[node]:
+            node = self.fail[node]
+        return self.goto[node].get(char, 0)
+    
+    def replace(self, text):
+        """套用所有校正，回傳 (校正後文字, 替換次數)"""
+        pieces = []
+        replacements = 0
+        last = 0            # 尚未輸出的文字起點
+        node = 0
+        pending = None      # 目前最左、最長的候選：(起點, 終點, 替換文字)
+        i = 0
+        
+        while i < len(text) or pending:
+            if i < len(text):
+                node = self._step(node, text[i])
+                output = self.output[node]
+                if output:
+                    start = i - output[0] + 1
+                    if pending is None or start <= pending[0]:
+                        pending = (start, i + 1, output[1])
+            
+            # 文字結束，或目前自動機狀態對應的部分匹配起點已超過候選起點時，
+            # 候選不會再被更左或更長的匹配取代：輸出替換並從候選終點重新掃描
+            if pending and (i >= len(text) or i - self.depth[node] + 1 > pending[0]):
+                start, end, correct = pending
+                pieces.append(text[last:start])
+                pieces.append(correct)
+                replacements += 1
+                last = i = end
+                node = 0
+                pending = None
+                continue
+            i += 1
+        
+        pieces.append(text[last:])
+        return "".join(pieces), replacements
+
+@lru_cache(maxsize=None)
+def get_correction_engine(table, path=OCR_CORRECTIONS_FILE):
+    """取得（並快取）指定校正表的引擎，自動機只建立一次"""
+    return CorrectionEngine.from_file(path, table)
+
+# 📋 針對繁體中文高度優化的Tesseract配置（預設順序即為分層OCR的初始順序）
+OCR_CONFIGS = [
+    # 配置1: 高精度單行處理
+    ('--oem 3 --psm 6 -l chi_tra -c preserve_interword_spaces=1', "高精度單行"),
+    
+    # 配置2: 垂直文字專用
+    ('--oem 3 --psm 5 -l chi_tra -c preserve_interword_spaces=1', "垂直文字專用"),
+    
+    # 配置3: 稀疏文字處理
+    ('--oem 3 --psm 8 -l chi_tra', "稀疏文字處理"),
+    
+    # 配置4: 自動分割優化
+    ('--oem 3 --psm 3 -l chi_tra -c preserve_interword_spaces=1', "自動分割優化"),
+    
+    # 配置5: 混合語言處理
+    ('--oem 3 --psm 6 -l chi_tra+eng', "混合語言處理"),
+    
+    # 配置6: 單字符優化
+    ('--oem 3 --psm 10 -l chi_tra', "單字符優化"),
+    
+    # 配置7: LSTM引擎
+    ('--oem 1 --psm 6 -l chi_tra', "LSTM引擎")
+]
+
+# 分層OCR提早結束的條件：平均字詞信心分數與最少字元數
+OCR_CONFIDENCE_THRESHOLD = 75.0
+OCR_MIN_EARLY_EXIT_CHARS = 20
+
+# 每辨識這麼多個圖塊就完整比較一次所有配置（不提早結束），讓排序較後的配置仍有機會勝出
+OCR_EXPLORE_INTERVAL = 10
+
+# 辨識結果中的中日韓文字；相鄰的字詞只要有一側是中日韓文字就直接相連，不加空白
+OCR_CJK_CHAR_RE = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+
+# OCR相關的持久化檔案目錄
+OCR_CACHE_DIR = Path(__file__).resolve().parent / "ocr_cache"
+OCR_CONFIG_STATS_FILE = OCR_CACHE_DIR / "config_stats.json"
+OCR_RESULT_CACHE_PATH = OCR_CACHE_DIR / "ocr_results.sqlite3"
+
+# 圖片預處理與OCR文字重組流程的版本；修改預處理或重組方法時需遞增，使舊的OCR快取失效
+OCR_PREPROCESS_VERSION = 3
+
+# 有界解析度預處理參數：目標文字行高、縮放範圍與單一圖塊的像素上限
+OCR_TARGET_TEXT_HEIGHT = 40
+OCR_MIN_SCALE = 1.0
+OCR_MAX_SCALE = 6.0
+OCR_MAX_TILE_PIXELS = 12_000_000
+OCR_MIN_TILE_ROWS = 200
+
+def ocr_config_signature():
+    """OCR配置組合的簽章（不含排序），配置或提早結束條件改變時快取自動失效"""
+    configs = "\n".join(sorted(config for config, _ in OCR_CONFIGS))
+    payload = f"{configs}\n{OCR_CONFIDENCE_THRESHOLD}\n{OCR_MIN_EARLY_EXIT_CHARS}"
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+def parse_tesseract_config(config):
+    """
+    解析Tesseract命令列配置字串
+
+    參數:
+        config: 例如 '--oem 3 --psm 6 -l chi_tra -c preserve_interword_spaces=1'
+
+    返回:
+        (語言, OEM, PSM, 變數dict)
+    """
+    lang, oem, psm, variables = "eng", 3, 3, {}
+    tokens = config.split()
+    for i, token in enumerate(tokens[:-1]):
+        value = tokens[i + 1]
+        if token == "-l":
+            lang = value
+        elif token == "--oem":
+            oem = int(value)
+        elif token == "--psm":
+            psm = int(value)
+        elif token == "-c" and "=" in value:
+            key, _, val = value.partition("=")
+            variables[key] = val
+    return lang, oem, psm, variables
+
+TSV_DATA_COLUMNS = ("level", "page_num", "block_num", "par_num", "line_num", "word_num",
+                    "left", "top", "width", "height", "conf", "text")
+
+def parse_tsv_data(tsv_text):
+    """將Tesseract的TSV輸出轉為與 pytesseract.image_to_data(output_type=DICT) 相同的結構"""
+    data = {column: [] for column in TSV_DATA_COLUMNS}
+    for row in tsv_text.splitlines():
+        fields = row.split("\t")
+        if len(fields) < len(TSV_DATA_COLUMNS) - 1 or fields[0] == "level":
+            continue
+        fields += [""] * (len(TSV_DATA_COLUMNS) - len(fields))
+        for column, value in zip(TSV_DATA_COLUMNS, fields):
+            if column == "text":
+                data[column].append(value)
+            elif column == "conf":
+                data[column].append(float(value))
+            else:
+                data[column].append(int(value))
+    return data
+
+class PytesseractBackend:
+    """以 pytesseract 呼叫 tesseract 執行檔：每次辨識都會啟動新行程並重新載入語言資料（備援方案）"""
+    
+    name = "pytesseract"
+    
+    def __init__(self):
+        if not load_ocr_dependencies():
+            raise RuntimeError("pytesseract 未安裝")
+        pytesseract.get_tesseract_version()
+    
+    def image_to_data(self, pil_image, config):
+        return pytesseract.image_to_data(pil_image, config=config, output_type=pytesseract.Output.DICT)
+    
+    def close(self):
+        pass
+
+class TesserocrBackend:
+    """
+    以 tesserocr（libtesseract 的 Python 綁定）常駐辨識引擎
+
+    每組 (語言, OEM, 變數) 只初始化一次 PyTessBaseAPI，之後只切換PSM，
+    語言資料在整個行程中只載入一次。
+    """
+    
+    name = "tesserocr"
+    
     def __init__(self):
+        import tesserocr
+        self._tesserocr = tesserocr
+        self._tessdata_path = os.environ.get("TESSDATA_PREFIX") or tesserocr.get_languages()[0]
+        self._apis = {}
+    
+    def _api(self, lang, oem, variables):
+        key = (lang, oem, tuple(sorted(variables.items())))
+        if key not in self._apis:
+            self._apis[key] = self._tesserocr.PyTessBaseAPI(
+                path=self._tessdata_path, lang=lang, oem=self._tesserocr.OEM(oem), variables=dict(variables))
+        return self._apis[key]
+    
+    def image_to_data(self, pil_image, config):
+        lang, oem, psm, variables = parse_tesseract_config(config)
+        api = self._api(lang, oem, variables)
+        api.SetPageSegMode(self._tesserocr.PSM(psm))
+        api.SetImage(pil_image)
+        api.Recognize()
+        return parse_tsv_data(api.GetTSVText(0))
+    
+    def close(self):
+        for api in self._apis.values():
+            api.End()
+        self._apis.clear()
+
+class LibTesseractBackend:
+    """
+    以 ctypes 直接呼叫 libtesseract 的C API常駐辨識引擎（不需額外的Python套件）
+
+    與 TesserocrBackend 相同，每組 (語言, OEM, 變數) 只建立一個 TessBaseAPI。
+    """
+    
+    name = "libtesseract"
+    
+    def __init__(self, library_path=None):
+        import ctypes
+        self._ctypes = ctypes
+        self._lib = ctypes.CDLL(library_path or self.find_library())
+        lib = self._lib
+        lib.TessBaseAPICreate.restype = ctypes.c_void_p
+        lib.TessBaseAPIDelete.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIInit2.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        lib.TessBaseAPIInit2.restype = ctypes.c_int
+        lib.TessBaseAPISetVariable.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_char_p]
+        lib.TessBaseAPISetPageSegMode.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPISetImage.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int,
+                                            ctypes.c_int, ctypes.c_int, ctypes.c_int]
+        lib.TessBaseAPIRecognize.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        lib.TessBaseAPIRecognize.restype = ctypes.c_int
+        lib.TessBaseAPIGetTsvText.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.TessBaseAPIGetTsvText.restype = ctypes.c_void_p
+        lib.TessDeleteText.argtypes = [ctypes.c_void_p]
+        lib.TessBaseAPIEnd.argtypes = [ctypes.c_void_p]
+        self._handles = {}
+    
+    @staticmethod
+    def find_library():
+        """尋找 libtesseract：系統函式庫路徑，或 Windows 上 tesseract.exe 所在目錄中的DLL"""
+        import ctypes.util
+        found = ctypes.util.find_library("tesseract") or ctypes.util.find_library("libtesseract-5")
+        if found:
+            return found
+        if load_ocr_dependencies():
+            tesseract_dir = Path(pytesseract.pytesseract.tesseract_cmd).parent
+            for dll in sorted(tesseract_dir.glob("libtesseract*.dll")):
+                return str(dll)
+        raise OSError("找不到 libtesseract 函式庫")
+    
+    def _handle(self, lang, oem, variables):
+        key = (lang, oem, tuple(sorted(variables.items())))
+        if key not in self._handles:
+            handle = self._lib.TessBaseAPICreate()
+            datapath = os.environ.get("TESSDATA_PREFIX")
+            if self._lib.TessBaseAPIInit2(handle, datapath.encode() if datapath else None,
+                                          lang.encode(), oem) != 0:
+                self._lib.TessBaseAPIDelete(handle)
+                raise RuntimeError(f"libtesseract 無法載入語言資料: {lang}")
+            for name, value in variables.items():
+                self._lib.TessBaseAPISetVariable(handle, name.encode(), value.encode())
+            self._handles[key] = handle
+        return self._handles[key]
+    
+    def image_to_data(self, pil_image, config):
+        lang, oem, psm, variables = parse_tesseract_config(config)
+        handle = self._handle(lang, oem, variables)
+        image = pil_image.convert("L")
+        width, height = image.size
+        self._lib.TessBaseAPISetPageSegMode(handle, psm)
+        self._lib.TessBaseAPISetImage(handle, image.tobytes(), width, height, 1, width)
+        if self._lib.TessBaseAPIRecognize(handle, None) != 0:
+            raise RuntimeError("libtesseract 辨識失敗")
+        text_pointer = self._lib.TessBaseAPIGetTsvText(handle, 0)
+        try:
+            tsv_text = self._ctypes.string_at(text_pointer).decode("utf-8", errors="replace")
+        finally:
+            self._lib.TessDeleteText(text_pointer)
+        return parse_tsv_data(tsv_text)
+    
+    def close(self):
+        for handle in self._handles.values():
+            self._lib.TessBaseAPIEnd(handle)
+            self._lib.TessBaseAPIDelete(handle)
+        self._handles.clear()
+
+# 依偏好順序嘗試的OCR後端：常駐引擎優先，pytesseract 為備援
+OCR_BACKENDS = {
+    "tesserocr": TesserocrBackend,
+    "libtesseract": LibTesseractBackend,
+    "pytesseract": PytesseractBackend
+}
+
+@lru_cache(maxsize=None)
+def get_ocr_backend(preferred="auto"):
+    """
+    取得本行程共用的OCR後端（每個行程只建立一次，語言資料常駐記憶體）
+
+    參數:
+        preferred: "auto" 依 tesserocr → libtesseract → pytesseract 的順序選擇可用的後端，
+                   或指定其中一個名稱
+
+    返回:
+        OCR後端實例，全部都不可用時返回 None
+    """
+    names = list(OCR_BACKENDS) if preferred == "auto" else [preferred]
+    for name in names:
+        try:
+            return OCR_BACKENDS[name]()
+        except Exception as e:
+            print(f"ℹ️  OCR後端 {name} 不可用: {e}")
+    return None
+
+# 轉換時需要OCR但無法執行（未安裝OCR套件或沒有可用的後端）的狀態，記錄在建置清單中
+OCR_STATUS_UNAVAILABLE = "unavailable"
+
+def ocr_backend_available(preferred="auto"):
+    """目前環境是否能執行OCR（OCR套件可匯入且有可用的後端）"""
+    return load_ocr_dependencies() and get_ocr_backend(preferred) is not None
+
+def sha256_file(file_path):
+    """以區塊方式計算檔案內容的SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+class OCRResultCache:
+    """
+    以 (圖片內容SHA-256, 預處理版本, Tesseract配置簽章) 為鍵的持久化OCR結果快取
+
+    儲存在 SQLite 中；總大小超過上限時，依最近使用時間（LRU）淘汰最舊的項目。
+    CLI 的 main() 與 GUI 的 gri_to_json 預設共用同一個快取檔案。
+    資料庫在第一次查詢或寫入時才開啟；無法開啟時快取停用，所有查詢視為未命中。
+    """
+    
+    def __init__(self, db_path=OCR_RESULT_CACHE_PATH, max_size_mb=64):
+        self.db_path = str(db_path)
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.disabled = False
+        self._lock = threading.Lock()
+        self._conn = None
+    
+    def _connection(self):
+        """取得資料庫連線（呼叫端需持有鎖），無法開啟時返回 None"""
+        if self._conn is None and not self.disabled:
+            try:
+                Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+                # GUI 會在背景執行緒使用，因此允許跨執行緒共用連線（以鎖保護）
+                conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30)
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS ocr_results (
+                        key TEXT PRIMARY KEY,
+                        text TEXT NOT NULL,
+                        config_name TEXT,
+                        last_access REAL NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_ocr_results_last_access ON ocr_results(last_access)")
+                conn.commit()
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                print(f"⚠️  無法開啟OCR快取，將不使用快取: {e}")
+                self.disabled = True
+        return self._conn
+    
+    @staticmethod
+    def hash_image(image_path):
+        """計算圖片檔案內容的SHA-256"""
+        return sha256_file(image_path)
+    
+    @staticmethod
+    def make_key(image_hash, preprocess_mode):
+        return f"{image_hash}:{preprocess_mode}-v{OCR_PREPROCESS_VERSION}:{ocr_config_signature()}"
+    
+    def get(self, image_hash, preprocess_mode):
+        """查詢快取，命中時回傳 (文字, 勝出配置名稱)，否則回傳 None"""
+        key = self.make_key(image_hash, preprocess_mode)
+        row = None
+        with self._lock:
+            conn = self._connection()
+            if conn is not None:
+                row = conn.execute("SELECT text, config_name FROM ocr_results WHERE key = ?", (key,)).fetchone()
+                if row:
+                    conn.execute("UPDATE ocr_results SET last_access = ? WHERE key = ?", (time.time(), key))
+                    conn.commit()
+        
+        if row:
+            self.hits += 1
+            return row[0], row[1]
+        self.misses += 1
+        return None
+    
+    def put(self, image_hash, preprocess_mode, text, config_name=None):
+        """寫入一筆OCR結果，並在超過容量時進行淘汰"""
+        with self._lock:
+            conn = self._connection()
+            if conn is None:
+                return
+            conn.execute(
+                "INSERT OR REPLACE INTO ocr_results (key, text, config_name, last_access) VALUES (?, ?, ?, ?)",
+                (self.make_key(image_hash, preprocess_mode), text, config_name, time.time())
+            )
+            conn.commit()
+            self._evict()
+    
+    def _evict(self):
+        """總大小超過上限時，刪除最久未使用的項目直到低於上限的 90%"""
+        total_size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM ocr_results").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+        
+        target_size = int(self.max_size_bytes * 0.9)
+        removed = 0
+        cursor = self._conn.execute("SELECT key, LENGTH(CAST(text AS BLOB)) FROM ocr_results ORDER BY last_access")
+        stale_keys = []
+        for key, size in cursor:
+            if total_size - removed <= target_size:
+                break
+            stale_keys.append((key,))
+            removed += size
+        self._conn.executemany("DELETE FROM ocr_results WHERE key = ?", stale_keys)
+        self._conn.commit()
+        print(f"🧹 OCR快取超過上限，已淘汰 {len(stale_keys)} 筆")
+    
+    def stats(self):
+        entries, total_size = 0, 0
+        with self._lock:
+            conn = self._connection()
+            if conn is not None:
+                entries, total_size = conn.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(text AS BLOB))), 0) FROM ocr_results"
+                ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": total_size}
+
+class OCRError(RuntimeError):
+    """OCR執行失敗（無法讀取圖片、所有配置都發生錯誤等），與「圖片中沒有文字」區分"""
+
+# 平行OCR子行程中共用的轉換器（每個子行程只初始化一次）
+_worker_converter = None
+
+# 整個執行期間共用的OCR行程池：跨Markdown檔案重複使用，子行程與其中常駐的OCR引擎只建立一次
+_ocr_pool = None
+_ocr_pool_workers = 0
+_ocr_pool_lock = threading.Lock()
+
+def _init_ocr_worker():
+    """子行程初始化：限制Tesseract內部執行緒數，避免與行程池互相搶占CPU"""
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+def _ocr_image_worker(image_path, preprocess_mode, ocr_backend="auto"):
+    """
+    行程池工作函式：在子行程中對單張圖片執行OCR（OCR引擎在子行程存活期間常駐）
+
+    返回:
+        (文字（OCR失敗時為 None）, 勝出配置名稱, 本次新增的配置勝出次數)
+    """
+    global _worker_converter
+    if _worker_converter is None or _worker_converter.ocr_backend_name != ocr_backend:
+        _worker_converter = GRIMarkdownToJsonConverter(ocr_workers=1, ocr_cache=False, ocr_backend=ocr_backend)
+    _worker_converter.preprocess_mode = preprocess_mode
+    try:
+        text = _worker_converter.extract_text_from_image(image_path, raise_errors=True)
+    except OCRError:
+        text = None
+    # 勝出次數由主行程彙整與儲存，子行程只保留在記憶體中供自己的排序使用
+    wins, _worker_converter._unsaved_ocr_config_wins = _worker_converter._unsaved_ocr_config_wins, {}
+    return text, _worker_converter.last_ocr_config, wins
+
+def get_ocr_process_pool(workers):
+    """
+    取得共用的OCR行程池；尚未建立或需要更多行程時才（重新）建立
+
+    參數:
+        workers: 需要的行程數
+
+    返回:
+        ProcessPoolExecutor
+    """
+    global _ocr_pool, _ocr_pool_workers
+    with _ocr_pool_lock:
+        if _ocr_pool is None or _ocr_pool_workers < workers:
+            if _ocr_pool is not None:
+                _ocr_pool.shutdown(wait=True)
+            else:
+                # 主行程與 --jobs 的子行程結束時都會執行 multiprocessing 的結束處理，確保行程池被關閉
+                from multiprocessing.util import Finalize
+                Finalize(None, shutdown_ocr_process_pool, exitpriority=10)
+            # 行程池（multiprocessing）只在平行OCR時才匯入
+            from concurrent.futures import ProcessPoolExecutor
+            _ocr_pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_ocr_worker)
+            _ocr_pool_workers = workers
+        return _ocr_pool
+
+def shutdown_ocr_process_pool():
+    """關閉共用的OCR行程池（下次平行OCR時會重新建立）"""
+    global _ocr_pool, _ocr_pool_workers
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=True)
+        _ocr_pool, _ocr_pool_workers = None, 0
+
+# Markdown中的圖片引用，以及OCR旁路檔的命名與格式版本
+OCR_IMAGE_REF_RE = re.compile(r'!\[\]\(([^)]+\.(?:jpeg|jpg|png|gif))\)')
+OCR_SIDECAR_SUFFIX = ".ocr.json"
+OCR_SIDECAR_VERSION = 2
+
+def ocr_sidecar_path(md_file_path):
+    """OCR旁路檔的位置: 與Markdown同目錄的 <檔名>.ocr.json"""
+    md_file_path = Path(md_file_path)
+    return md_file_path.with_name(md_file_path.stem + OCR_SIDECAR_SUFFIX)
+
+def load_ocr_sidecar(md_file_path, markdown_hash):
+    """讀取OCR旁路檔；檔案不存在、格式版本不符或Markdown內容已改變時返回 None"""
+    sidecar_path = ocr_sidecar_path(md_file_path)
+    if not sidecar_path.exists():
+        return None
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️  無法讀取OCR旁路檔，將重新OCR: {e}")
+        return None
+    if sidecar.get("version") != OCR_SIDECAR_VERSION or sidecar.get("markdown_sha256") != markdown_hash:
+        return None
+    return sidecar
+
+def save_ocr_sidecar(md_file_path, sidecar):
+    sidecar_path = ocr_sidecar_path(md_file_path)
+    tmp_path = sidecar_path.with_suffix(".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, sidecar_path)
+
+def is_ocr_sidecar_current(sidecar, ocr_version, image_hashes):
+    """
+    旁路檔的OCR版本與每張圖片的雜湊都相符，且沒有OCR失敗的圖片時返回 True
+
+    OCR成功但圖片中沒有文字（例如封面圖片，"ok": true 且 text 為空字串）視為有效，不會重新OCR
+    """
+    if not sidecar or sidecar.get("ocr_version") != ocr_version:
+        return False
+    recorded = {image["image"]: image for image in sidecar["images"]}
+    for image_filename, image_hash in image_hashes.items():
+        image = recorded.get(image_filename)
+        if image is None or image.get("image_sha256") != image_hash or not image.get("ok"):
+            return False
+    return True
+
+def merge_ocr_sidecar(content, sidecar):
+    """依旁路檔記錄的位置，以OCR文字取代對應的圖片引用（只在記憶體中合併）"""
+    if not sidecar:
+        return content
+    
+    replacements = sorted(
+        (start, end, image["text"])
+        for image in sidecar["images"] if image.get("text")
+        for start, end in image["offsets"]
+    )
+    pieces = []
+    position = 0
+    for start, end, text in replacements:
+        pieces.append(content[position:start])
+        pieces.append(f"\n\n{OCR_BLOCK_MARKER}\n{text}\n\n")
+        position = end
+    pieces.append(content[position:])
+    return "".join(pieces)
+
+# 解析邏輯的版本；修改Markdown→JSON的解析規則時需遞增，使建置清單中的舊結果失效
+CONVERTER_VERSION = 3
+
+# 增量建置清單的檔名（存放在Markdown中間目錄；JSON輸出目錄會被GUI逐檔當作準則讀取）
+BUILD_MANIFEST_NAME = ".gri_build_manifest.json"
+
+def converter_version():
+    """完整的轉換器版本字串：解析版本 + OCR預處理版本 + Tesseract配置簽章"""
+    return f"{CONVERTER_VERSION}-ocr{OCR_PREPROCESS_VERSION}-{ocr_config_signature()}"
+
+def marker_markdown_path(pdf_file, md_dir):
+    """marker 對單一PDF的輸出位置: <md_dir>/<檔名>/<檔名>.md"""
+    stem = Path(pdf_file).stem
+    return Path(md_dir) / stem / f"{stem}.md"
+
+def json_output_path(md_file, output_dir):
+    """與 convert_md_to_json 相同的JSON輸出檔名規則"""
+    return Path(output_dir) / f"{Path(md_file).stem}_converted.json"
+
+def _optional_sha256(file_path):
+    return sha256_file(file_path) if Path(file_path).exists() else None
+
+class ConversionManifest:
+    """
+    GRI準則的增量建置清單
+
+    以準則檔名（不含副檔名）為鍵，記錄每個準則的PDF雜湊、marker輸出Markdown的雜湊、
+    轉換器版本與JSON檔名。只有新增或變動的準則才需要重新執行 PDF→MD→JSON，
+    其餘準則沿用既有的Markdown與JSON輸出。
+    """
+    
+    def __init__(self, manifest_path):
+        self.path = Path(manifest_path)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("standards", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️  無法讀取建置清單，將完整重建: {e}")
+                self.entries = {}
+    
+    @classmethod
+    def for_md_dir(cls, md_dir):
+        return cls(Path(md_dir) / BUILD_MANIFEST_NAME)
+    
+    def pdf_is_current(self, pdf_file, md_dir, pdf_hash=None):
+        """PDF內容未變動且marker輸出仍存在時回傳 True"""
+        entry = self.entries.get(Path(pdf_file).stem)
+        if not entry or not marker_markdown_path(pdf_file, md_dir).exists():
+            return False
+        return entry.get("pdf_sha256") == (pdf_hash or sha256_file(pdf_file))
+    
+    def record_pdf(self, pdf_file, md_dir, pdf_hash=None):
+        """記錄marker轉換完成的PDF雜湊與其Markdown輸出的雜湊"""
+        entry = self.entries.setdefault(Path(pdf_file).stem, {})
+        entry["pdf_file"] = Path(pdf_file).name
+        entry["pdf_sha256"] = pdf_hash or sha256_file(pdf_file)
+        md_file = marker_markdown_path(pdf_file, md_dir)
+        entry["marker_sha256"] = sha256_file(md_file) if md_file.exists() else None
+    
+    def json_is_current(self, md_file, output_dir, ocr_backend="auto"):
+        """
+        Markdown與OCR旁路檔內容、轉換器版本都未變動，且JSON輸出仍存在時回傳 True
+
+        轉換時OCR無法執行（圖片段落因此缺漏）而現在已可執行OCR時，視為需要重新轉換
+        """
+        entry = self.entries.get(Path(md_file).stem)
+        if not entry or entry.get("converter_version") != converter_version():
+            return False
+        if not json_output_path(md_file, output_dir).exists():
+            return False
+        if (entry.get("markdown_sha256") != sha256_file(md_file)
+                or entry.get("ocr_sidecar_sha256") != _optional_sha256(ocr_sidecar_path(md_file))):
+            return False
+        return not (entry.get("ocr_status") == OCR_STATUS_UNAVAILABLE and ocr_backend_available(ocr_backend))
+    
+    def record_json(self, md_file, json_file, ocr_status=None):
+        """
+        記錄轉換所用的Markdown與OCR旁路檔雜湊
+
+        參數:
+            ocr_status: 轉換器的 ocr_status()，OCR無法執行時為 OCR_STATUS_UNAVAILABLE
+        """
+        entry = self.entries.setdefault(Path(md_file).stem, {})
+        entry["markdown_sha256"] = sha256_file(md_file)
+        entry["ocr_sidecar_sha256"] = _optional_sha256(ocr_sidecar_path(md_file))
+        entry["ocr_status"] = ocr_status
+        entry["converter_version"] = converter_version()
+        entry["json_file"] = Path(json_file).name
+        entry["updated_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+    
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"converter_version": converter_version(), "standards": self.entries},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+def select_changed_pdfs(pdf_files, md_dir, manifest, force=False):
+    """
+    找出需要重新以marker轉換的PDF
+
+    參數:
+        pdf_files: PDF檔案路徑列表
+        md_dir: marker輸出目錄
+        manifest: ConversionManifest
+        force: 為 True 時全部重新轉換
+
+    返回:
+        (需要轉換的 [(PDF路徑, 雜湊)], 未變動的PDF路徑列表)
+    """
+    changed, unchanged = [], []
+    for pdf_file in pdf_files:
+        pdf_hash = sha256_file(pdf_file)
+        if not force and manifest.pdf_is_current(pdf_file, md_dir, pdf_hash):
+            unchanged.append(pdf_file)
+        else:
+            changed.append((pdf_file, pdf_hash))
+    return changed, unchanged
+
+def run_marker(pdf_files, md_dir):
+    """
+    只對指定的PDF執行marker
+
+    marker 以目錄為輸入，因此先將要轉換的PDF複製到暫存目錄，再以該目錄執行。
+    找不到 marker 指令時會拋出 FileNotFoundError。
+
+    返回:
+        subprocess.CompletedProcess
+    """
+    import shutil
+    import subprocess
+    import tempfile
+    
+    with tempfile.TemporaryDirectory(prefix="gri_marker_") as staging_dir:
+        for pdf_file in pdf_files:
+            shutil.copy2(pdf_file, Path(staging_dir) / Path(pdf_file).name)
+        return subprocess.run([
+            'marker', staging_dir, '--output_dir', str(md_dir)
+        ], capture_output=True, text=True, cwd=str(Path.cwd()))
+
+class GRIMarkdownToJsonConverter:
+    def __init__(self, ocr_workers=None, ocr_cache=True, preprocess_mode="bounded", ocr_mode="auto",
+                 ocr_backend="auto"):
+        """
+        參數:
+        - ocr_workers: 平行OCR的行程數，預設為CPU核心數；設為1則逐張處理
+        - ocr_cache: True 使用預設路徑的 OCRResultCache；也可傳入 OCRResultCache 實例；False/None 停用快取
+        - preprocess_mode: 圖片預處理方式，"bounded"（依文字高度縮放並限制像素）或 "super_resolution"（固定至少6倍放大）
+        - ocr_mode: "auto" 旁路檔仍有效時沿用，否則重新OCR；"skip" 不執行OCR，只使用既有旁路檔；"redo" 一律重新OCR
+        - ocr_backend: "auto"（tesserocr → libtesseract → pytesseract）或指定後端名稱
+        """
         self.section = ""
         self.groups = []
         self.ocr_reader = None
-        
-        # 初始化OCR閱讀器（支援中文和英文）
-        if OCR_AVAILABLE:
-            try:
-                print("🔄 初始化Tesseract OCR...")
-                # 測試tesseract是否可用
-                pytesseract.get_tesseract_version()
-                self.ocr_available = True
-                print("✅ Tesseract OCR初始化完成")
-            except Exception as e:
-                print(f"⚠️  Tesseract初始化失敗: {e}")
+        self.ocr_workers = max(1, ocr_workers or os.cpu_count() or 1)
+        self.preprocess_mode = preprocess_mode
+        self.ocr_mode = ocr_mode
+        self.ocr_backend_name = ocr_backend
+        self.ocr_config_stats = self.load_ocr_config_stats()
+        self._unsaved_ocr_config_wins = {}
+        self.last_ocr_config = None
+        self.ocr_tile_count = 0
+        self.ocr_cache = None
+        self.ocr_backend = None
+        
+        # OCR後端在第一次需要OCR時才初始化（見 ocr_available）
+        self._ocr_cache_option = ocr_cache
+        self._ocr_available = None
+    
+    @property
+    def ocr_available(self):
+        """OCR是否可用；第一次存取時才載入OCR套件並初始化後端"""
+        if self._ocr_available is None:
+            self.init_ocr()
+        return self._ocr_available
+    
+    @ocr_available.setter
+    def ocr_available(self, value):
+        self._ocr_available = value
+    
+    def ocr_status(self):
+        """本次轉換的OCR狀態：實際使用的後端名稱、OCR_STATUS_UNAVAILABLE（需要OCR但無法執行）或 None（不需要OCR）"""
+        if self._ocr_available is None:
+            return None
+        return self.ocr_backend.name if self._ocr_available and self.ocr_backend else OCR_STATUS_UNAVAILABLE
+    
+    def init_ocr(self):
+        """載入OCR套件、初始化OCR後端（同一行程中的轉換器共用同一個常駐引擎）與OCR結果快取"""
+        if load_ocr_dependencies():
+            print("🔄 初始化Tesseract OCR...")
+            self.ocr_backend = get_ocr_backend(self.ocr_backend_name)
+            self._ocr_available = self.ocr_backend is not None
+            if self._ocr_available:
+                print(f"✅ Tesseract OCR初始化完成（後端: {self.ocr_backend.name}）")
+            else:
+                print("⚠️  Tesseract初始化失敗")
                 print("💡 請確認已安裝Tesseract並正確設定路徑")
-                self.ocr_available = False
         else:
             print("⚠️  OCR功能不可用，跳過圖片文字提取")
-            self.ocr_available = False
+            self._ocr_available = False
+        
+        # OCR結果快取（OCR不可用時不需要）
+        if self._ocr_available and self._ocr_cache_option:
+            option = self._ocr_cache_option
+            self.ocr_cache = option if isinstance(option, OCRResultCache) else OCRResultCache()
         
     def clean_text(self, text):
         """清理文字，移除多餘空格、星號標記和換行"""
-        # 移除markdown粗體標記
-        text = re.sub(r'\*\*([^*]+)\*\*', r'\1', text)
-        # 移除列表符號
-        text = re.sub(r'^[-•]\s*', '', text.strip())
-        # 合併多個空格
-        text = re.sub(r'\s+', ' ', text)
-        text = text.strip()
-        return text
+        return clean_markdown_text(text)
     
     def extract_section_number(self, content):
         """從內容中提取section編號 - 優先從揭露項目標題提取"""
         
         # 優先級1: 從揭露項目標題中提取（最可靠的方法）
         # 匹配 "揭露項目 **405-1**" 或 "揭露項目 405-1" 格式
-        disclosure_patterns = [
-            r'揭露項目\s*\*\*(\d+)-\d+\*\*',    # 揭露項目 **405-1**
-            r'揭露項目\s*(\d+)-\d+',             # 揭露項目 405-1
-            r'# 揭露項目\s*\*\*(\d+)-\d+\*\*',   # # 揭露項目 **405-1**
-            r'## 揭露項目\s*\*\*(\d+)-\d+\*\*',  # ## 揭露項目 **405-1**
-        ]
-        
-        for pattern in disclosure_patterns:
-            match = re.search(pattern, content)
+        for pattern in SECTION_DISCLOSURE_PATTERNS:
+            match = pattern.search(content)
             if match:
                 section_num = match.group(1)
                 print(f"🎯 從揭露項目標題提取section: {section_num}")
                 return section_num
         
         # 優先級2: 從 "GRI XXX" 格式中提取
-        match = re.search(r'GRI\s+(\d+)', content)
+        match = SECTION_GRI_RE.search(content)
         if match:
             section_num = match.group(1)
             print(f"🎯 從GRI標記提取section: {section_num}")
@@ -112,21 +1187,21 @@ class GRIMarkdownToJsonConverter:
         
         # 優先級3: 從檔案路徑中提取（如果前面的方法都失敗）
         # 尋找路徑中的 "GRI 405" 格式
-        file_path_match = re.search(r'GRI\s+(\d+)', content)
+        file_path_match = SECTION_GRI_RE.search(content)
         if file_path_match:
             section_num = file_path_match.group(1)
             print(f"🎯 從檔案路徑提取section: {section_num}")
             return section_num
         
         # 優先級4: 從任何 XXX-X 格式中提取section部分
-        match = re.search(r'(\d+)-\d+', content)
+        match = SECTION_NUMBER_RE.search(content)
         if match:
             section_num = match.group(1)
             print(f"🎯 從編號格式提取section: {section_num}")
             return section_num
         
         # 最後備案：尋找3位數編號（避免匹配單個數字如"2"）
-        matches = re.findall(r'\b(\d{3,})\b', content)  # 只匹配3位或以上的數字
+        matches = THREE_DIGIT_NUMBER_RE.findall(content)  # 只匹配3位或以上的數字
         for number in matches:
             if 200 <= int(number) <= 999:  # GRI標準的合理範圍
                 print(f"🎯 從3位數編號提取section: {number}")
@@ -150,10 +1225,11 @@ class GRIMarkdownToJsonConverter:
         i = 0
         while i < len(lines):
             line = lines[i].strip()
+            tags = classify_line(line)
             
             # 方法1: 檢測標準格式揭露項目
-            disclosure_match, title_text, disclosure_number = self.detect_standard_disclosure(line)
-            if disclosure_match:
+            if tags.disclosure:
+                disclosure_number, title_text = tags.disclosure
                 print(f"📋 標準格式揭露項目: {disclosure_number}")
                 items, next_i = self.extract_requirement_items(lines, i + 1, disclosure_number)
                 
@@ -169,7 +1245,7 @@ class GRIMarkdownToJsonConverter:
                 continue
             
             # 方法2: 檢測OCR提取的文字
-            if "**[從圖片提取的文字]**" in line:
+            if tags.ocr_block:
                 print(f"🖼️  發現OCR文字區塊")
                 ocr_items, next_i = self.extract_items_from_ocr_text_enhanced(lines, i)
                 
@@ -193,27 +1269,64 @@ class GRIMarkdownToJsonConverter:
     
     def detect_standard_disclosure(self, line):
         """檢測標準格式的揭露項目"""
-        disclosure_patterns = [
-            r'^#+\s*揭露項目\s*\*\*(\d+-\d+)\*\*\s*(.+)',   # ## 揭露項目 **303-1** 標題
-            r'^#+\s*揭露項目\s*(\d+-\d+)\s*(.+)',           # ## 揭露項目 303-1 標題
-            r'^揭露項目\s*\*\*(\d+-\d+)\*\*\s*(.+)',        # 揭露項目 **303-1** 標題
-            r'^揭露項目\s*(\d+-\d+)\s*(.+)',                # 揭露項目 303-1 標題
-            r'^\*\*(\d+-\d+)\*\*\s*(.+)',                   # **303-1** 標題
-            r'^(\d+-\d+)\s*(.+)',                           # 303-1 標題
-        ]
-        
-        for pattern in disclosure_patterns:
-            match = re.match(pattern, line)
-            if match:
-                disclosure_number = match.group(1)
-                title_text = self.clean_text(match.group(2))
-                return True, title_text, disclosure_number
-        
+        disclosure = classify_line(line).disclosure
+        if disclosure:
+            disclosure_number, title_text = disclosure
+            return True, title_text, disclosure_number
         return False, None, None
     
     def extract_requirement_items(self, lines, start_index, disclosure_number):
-        """提取要求區段的項目"""
+        """
+        提取要求區段的項目（單次掃描）
+        主狀態機逐行前進，掃過的每一行（包含收集子項目時跳過的行）只檢查一次，
+        同時記錄「彙編要求」回溯用的候選行與最終檢查的f、g、h項目，不再重新掃描
+        """
         items = []
+        collected = {}              # clause -> item，用於避免重複項目
+        extracted = {}              # 行索引 -> extract_single_item_with_subitems 的結果
+        backtrack_candidates = []   # 可能是項目開頭的行索引（遞增）
+        late_items = []             # 最終檢查發現的 (clause, 原始內容)
+        late_window_end = min(len(lines), start_index + REQUIREMENT_LATE_WINDOW)
+        late_window_open = True
+        noted_until = start_index
+        
+        def extract_item(index):
+            if index not in extracted:
+                extracted[index] = self.extract_single_item_with_subitems(lines, index, disclosure_number)
+            return extracted[index]
+        
+        def add_item(item):
+            if item['clause'] in collected:
+                return False
+            collected[item['clause']] = item
+            items.append(item)
+            return True
+        
+        def is_backtrack_candidate(line, tags):
+            # 標準項目格式，或含有揭露項目編號的深層縮進項目格式
+            return tags.bold_item_start or (tags.plain_item_start and disclosure_number in line)
+        
+        def note_lines(end, backtrack=True):
+            """記錄 [noted_until, end) 範圍內每一行的回溯候選與最終檢查項目"""
+            nonlocal noted_until, late_window_open
+            for index in range(noted_until, end):
+                if not backtrack and not late_window_open:
+                    break
+                line = lines[index].strip()
+                tags = classify_line(line)
+                if backtrack and is_backtrack_candidate(line, tags):
+                    backtrack_candidates.append(index)
+                
+                if late_window_open and index < late_window_end:
+                    # 遇到新的揭露項目或章節分隔符，最終檢查範圍結束
+                    if tags.new_disclosure or tags.guidance_heading:
+                        late_window_open = False
+                    # 檢查遺漏的項目（特別是f、g、h）
+                    elif tags.late_item:
+                        letter, content = tags.late_item
+                        late_items.append((f"{disclosure_number} {letter}", content))
+            noted_until = max(noted_until, end)
+        
         i = start_index
         in_requirements_section = False
         
@@ -221,30 +1334,35 @@ class GRIMarkdownToJsonConverter:
         
         # 尋找到下一個揭露項目或文件結束
         while i < len(lines):
+            note_lines(i + 1)
             line = lines[i].strip()
             
             if i < start_index + 15:  # 增加調試輸出範圍
                 print(f"   行 {i}: {line[:100]}")
             
+            tags = classify_line(line)
+            
             # 如果遇到下一個揭露項目，停止
-            if self.is_new_disclosure_item(line):
+            if tags.new_disclosure:
                 print(f"   遇到新揭露項目，停止於行 {i}")
                 break
             
             # 檢查是否進入要求區段
-            if self.is_requirements_section_start(line):
+            if tags.requirements_start:
                 in_requirements_section = True
                 print(f"   找到要求區段開始，行 {i}")
                 i += 1
                 continue
             
             # 檢測OCR文字區塊
-            if "**[從圖片提取的文字]**" in line:
+            if tags.ocr_block:
                 print(f"   找到OCR文字區塊，行 {i}")
-                # 處理OCR文字中的要求
+                # 處理OCR文字中的要求（OCR群組內的項目直接加入，與其他項目比對時才去重）
                 ocr_items, next_i = self.extract_items_from_ocr_text_enhanced(lines, i)
                 for item_group in ocr_items:
                     items.extend(item_group['items'])
+                    for ocr_item in item_group['items']:
+                        collected.setdefault(ocr_item['clause'], ocr_item)
                     print(f"   從OCR提取了 {len(item_group['items'])} 個項目")
                 i = next_i
                 continue
@@ -252,30 +1370,29 @@ class GRIMarkdownToJsonConverter:
             # 如果在要求區段中，提取項目
             if in_requirements_section:
                 # 檢查彙編要求 - 但不停止，確保所有項目都被收集
-                if re.search(r"^#+\s*彙編要求", line):
+                if tags.compilation_requirements:
                     print(f"   遇到彙編要求，進行最終項目回溯檢查，行 {i}")
-                    # 向前回溯檢查是否有遺漏的項目（擴展到h項目）
-                    for back_i in range(max(0, i-30), i):
-                        back_line = lines[back_i].strip()
-                        # 檢查是否有未收集的標準項目格式
-                        if re.search(r'^\s*-\s*\*\*[a-h]\.\*\*', back_line):
-                            back_item, _ = self.extract_single_item_with_subitems(lines, back_i, disclosure_number)
-                            if back_item and not any(existing['clause'] == back_item['clause'] for existing in items):
-                                items.append(back_item)
-                                print(f"   🔄 回溯收集項目: {back_item['clause']}")
-                        # 也檢查深層縮進項目格式（可能被遺漏）
-                        elif re.search(r'^\s*[a-h]\.\s*', back_line) and disclosure_number in back_line:
-                            back_item, _ = self.extract_single_item_with_subitems(lines, back_i, disclosure_number)
-                            if back_item and not any(existing['clause'] == back_item['clause'] for existing in items):
-                                items.append(back_item)
-                                print(f"   🔄 回溯收集深層項目: {back_item['clause']}")
+                    # 回溯前 REQUIREMENT_BACKTRACK_LINES 行內的候選行（擴展到h項目）
+                    window_start = max(0, i - REQUIREMENT_BACKTRACK_LINES)
+                    # 區段開頭之前的行不在本次掃描範圍內，另外檢查（最多 REQUIREMENT_BACKTRACK_LINES 行）
+                    candidates = []
+                    for index in range(window_start, start_index):
+                        previous_line = lines[index].strip()
+                        if is_backtrack_candidate(previous_line, classify_line(previous_line)):
+                            candidates.append(index)
+                    candidates += backtrack_candidates[bisect_left(backtrack_candidates, window_start):
+                                                       bisect_left(backtrack_candidates, i)]
+                    for back_i in candidates:
+                        back_item, _ = extract_item(back_i)
+                        if back_item and add_item(back_item):
+                            print(f"   🔄 回溯收集項目: {back_item['clause']}")
                     
                     # 完成收集後停止
                     print(f"   ✅ 完成彙編要求前的項目收集，停止於行 {i}")
                     break
                 
                 # 檢查是否遇到其他強烈結束信號
-                if self.is_strong_section_end(line):
+                if tags.strong_section_end:
                     print(f"   要求區段結束，行 {i}")
                     break
                 
@@ -284,205 +1401,69 @@ class GRIMarkdownToJsonConverter:
                     deep_item, next_index = self.extract_deep_indented_item(lines, i, disclosure_number)
                     if deep_item:
                         # 避免重複項目
-                        if not any(existing['clause'] == deep_item['clause'] for existing in items):
-                            items.append(deep_item)
+                        if add_item(deep_item):
                             print(f"   提取深層縮進項目: {deep_item['clause']}")
                         i = next_index - 1
                     i += 1
                     continue
                 
                 # 檢查各種可能的項目格式，並提取子項目
-                item, next_index = self.extract_single_item_with_subitems(lines, i, disclosure_number)
+                item, next_index = extract_item(i)
                 if item:
                     # 避免重複項目
-                    if not any(existing['clause'] == item['clause'] for existing in items):
-                        items.append(item)
+                    if add_item(item):
                         print(f"   提取項目: {item['clause']}")
                     i = next_index - 1  # 調整索引，因為下面會 i += 1
             
             i += 1
         
-        print(f"🔍 結束前最終檢查：掃描是否有遺漏的項目")
-        # 最終檢查：向後掃描是否有遺漏的f、g、h項目
-        for final_i in range(start_index, min(len(lines), start_index + 100)):
-            final_line = lines[final_i].strip()
+        # 最終檢查：主迴圈提前結束時，只需把仍開啟的最終檢查範圍掃完
+        note_lines(late_window_end, backtrack=False)
+        print(f"🔍 結束前最終檢查：加入遺漏的項目")
+        for clause, content in late_items:
+            # 檢查是否已經收集過
+            if clause in collected:
+                continue
+            content = content.strip()
+            # 簡單清理格式
+            content = BOLD_TEXT_RE.sub(r'\1', content)
             
-            # 檢查新的揭露項目或章節分隔符
-            if self.is_new_disclosure_item(final_line) or re.search(r'^#+\s*(指引|背景)', final_line):
-                break
-                
-            # 檢查遺漏的項目（特別是f、g、h）
-            for pattern in [
-                r'^\s*-\s*\*\*([f-h])\.\*\*\s*(.*)',  # - **f.** 內容
-                r'^\s*\*\*([f-h])\.\*\*\s*(.*)',      # **f.** 內容
-                r'^\s*([f-h])\.\s*(.*)',              # f. 內容
-            ]:
-                match = re.search(pattern, final_line)
-                if match:
-                    letter = match.group(1)
-                    clause = f"{disclosure_number} {letter}"
-                    
-                    # 檢查是否已經收集過
-                    if not any(existing['clause'] == clause for existing in items):
-                        content = match.group(2).strip()
-                        # 簡單清理格式
-                        content = re.sub(r'\*\*([^*]+)\*\*', r'\1', content)
-                        
-                        item = {
-                            "clause": clause,
-                            "query": content
-                        }
-                        items.append(item)
-                        print(f"   🔍 最終檢查發現項目: {clause} - {content[:50]}...")
+            add_item({
+                "clause": clause,
+                "query": content
+            })
+            print(f"   🔍 最終檢查發現項目: {clause} - {content[:50]}...")
                         
         print(f"✅ {disclosure_number} 總共提取了 {len(items)} 個項目")
         return items, i
     
     def is_new_disclosure_item(self, line):
         """檢查是否是新的揭露項目"""
-        patterns = [
-            r'^#+\s*揭露項目\s*\*\*\d+-\d+\*\*',
-            r'^#+\s*揭露項目\s*\d+-\d+',
-            r'^揭露項目\s*\*\*\d+-\d+\*\*',
-            r'^揭露項目\s*\d+-\d+',
-            r'^\*\*\d+-\d+\*\*\s+\S+'
-        ]
-        
-        for pattern in patterns:
-            if re.match(pattern, line):
-                return True
-        return False
+        return classify_line(line).new_disclosure
     
     def is_requirements_section_start(self, line):
         """檢查是否是要求區段的開始"""
-        patterns = [
-            r"要求",
-            r"報導組織應報導以下資訊",
-            r"報導組織應報導以下資訊.*要求",
-            r"要求.*報導組織應報導以下資訊"
-        ]
-        
-        # 特殊檢查：避免將403-8 a項目誤判為要求區段
-        # 如果行包含 "**a.**" 或 "**b.**" 等項目標記，不應該被認為是要求區段開始
-        if re.search(r'\*\*[a-e]\.\*\*', line):
-            return False
-        
-        for pattern in patterns:
-            if re.search(pattern, line):
-                return True
-        return False
+        return classify_line(line).requirements_start
     
     def is_requirements_section_end(self, line):
         """檢查是否是要求區段的結束"""
-        end_patterns = [
-            r"建議",
-            r"指引",
-            r"背景",
-            r"彙編要求",
-            r"^#+\s*(建議|指引|背景)",
-            r"^\d+\.\d+\s+"  # 如 2.1, 2.2 等編號
-        ]
-        
-        for pattern in end_patterns:
-            if re.search(pattern, line):
-                return True
-        return False
+        return classify_line(line).requirements_end
     
     def extract_single_item(self, line, disclosure_number):
         """從單行中提取項目（增強版，支援更多格式變化）"""
-        # 跳過空行
-        if not line.strip():
+        lettered_item = classify_lettered_item(line)
+        if not lettered_item:
             return None
         
-        # 格式1: 開頭有 a., b., c., d., e. (包括粗體格式)
-        patterns_start = [
-            r'^\s*-\s*\*\*([a-e])\.\*\*\s+(.+)',       # - **a.** 內容
-            r'^\s*-\s*([a-e])\.\s+(.+)',               # - a. 內容
-            r'^\s*\*\*([a-e])\.\*\*\s+(.+)',           # **a.** 內容
-            r'^\s*([a-e])\.\s+(.+)',                   # a. 內容
-        ]
-        
-        for pattern in patterns_start:
-            match = re.match(pattern, line)
-            if match:
-                clause_letter = match.group(1)
-                query_text = self.clean_text(match.group(2))
-                if query_text and len(query_text) > 5:
-                    return {
-                        "clause": f"{disclosure_number} {clause_letter}",
-                        "query": query_text
-                    }
-        
-        # 格式2: 結尾有 a., b., c., d., e. (包括粗體格式) - 增強版
-        patterns_end = [
-            r'^\s*-\s*(.+?)\s+\*\*([a-e])\.\*\*\s*$',  # - 內容 **a.**
-            r'^\s*-\s*(.+?)\s+([a-e])\.\s*$',          # - 內容 a.
-            r'^\s*(.+?)\s+\*\*([a-e])\.\*\*\s*$',      # 內容 **a.**
-            r'^\s*(.+?)\s+([a-e])\.\s*$',              # 內容 a.
-            # 新增：處理冒號後面接字母編號的情況
-            r'^\s*-\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$',  # - 內容: **a.**
-            r'^\s*-\s*(.+?)[：:]\s*([a-e])\.\s*$',          # - 內容: a.
-            # 新增：處理特殊的冒號前置格式
-            r'^\s*-?\s*#+?\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$',  # #### 內容: **a.**
-            r'^\s*-?\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$',       # 內容: **a.**
-            r'^\s*-?\s*(.+?)[：:]\s*([a-e])\.\s*$',               # 內容: a.
-        ]
-        
-        for pattern in patterns_end:
-            match = re.search(pattern, line)
-            if match:
-                query_text = self.clean_text(match.group(1))
-                clause_letter = match.group(2)
-                if query_text and len(query_text) > 5:
-                    return {
-                        "clause": f"{disclosure_number} {clause_letter}",
-                        "query": query_text
-                    }
-        
-        return None
+        clause_letter, query_text = lettered_item
+        return {
+            "clause": f"{disclosure_number} {clause_letter}",
+            "query": query_text
+        }
     
     def extract_roman_subitem(self, line):
         """提取羅馬數字子項目的文字（增強版，支援開頭和結尾位置）"""
-        # 匹配羅馬數字格式，支援開頭和結尾位置
-        patterns = [
-            # 開頭位置的羅馬數字
-            r'^\s*-\s*\*\*([ivx]+)\.\*\*\s+(.+?)；?$',      # - **i.** 內容；
-            r'^\s*-\s*\*\*([ivx]+)\.\*\*\s+(.+?)$',         # - **i.** 內容
-            r'^\s*\*\*([ivx]+)\.\*\*\s+(.+?)；?$',          # **i.** 內容；
-            r'^\s*\*\*([ivx]+)\.\*\*\s+(.+?)$',             # **i.** 內容
-            r'^\s*-\s*([ivx]+)\.\s+(.+?)；?$',              # - i. 內容；
-            r'^\s*-\s*([ivx]+)\.\s+(.+?)$',                 # - i. 內容
-            r'^\s*([ivx]+)\.\s+(.+?)；?$',                  # i. 內容；
-            r'^\s*([ivx]+)\.\s+(.+?)$',                     # i. 內容
-            
-            # 結尾位置的羅馬數字 - 新增
-            r'^\s*-\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*；?$',   # - 內容 **ii.**；
-            r'^\s*-\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*$',      # - 內容 **ii.**
-            r'^\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*；?$',       # 內容 **ii.**；
-            r'^\s*(.+?)\s+\*\*([ivx]+)\.\*\*\s*$',          # 內容 **ii.**
-            r'^\s*-\s*(.+?)\s+([ivx]+)\.\s*；?$',           # - 內容 ii.；
-            r'^\s*-\s*(.+?)\s+([ivx]+)\.\s*$',              # - 內容 ii.
-            r'^\s*(.+?)\s+([ivx]+)\.\s*；?$',               # 內容 ii.；
-            r'^\s*(.+?)\s+([ivx]+)\.\s*$',                  # 內容 ii.
-        ]
-        
-        for i, pattern in enumerate(patterns):
-            match = re.match(pattern, line)
-            if match:
-                if i < 8:  # 開頭位置的模式
-                    roman_num = match.group(1)
-                    content = self.clean_text(match.group(2))
-                else:  # 結尾位置的模式
-                    content = self.clean_text(match.group(1))
-                    roman_num = match.group(2)
-                
-                # 驗證是否是有效的羅馬數字（i, ii, iii, iv, v）
-                if roman_num in ['i', 'ii', 'iii', 'iv', 'v']:
-                    # 移除結尾的分號，統一格式
-                    content = content.rstrip('；;')
-                    return content
-        
-        return None
+        return classify_roman_subitem(line)
     
     def extract_single_item_with_subitems(self, lines, current_index, disclosure_number):
         """從單行中提取項目，並收集其子項目（羅馬數字）- 增強版，支援標題格式"""
@@ -493,7 +1474,7 @@ class GRIMarkdownToJsonConverter:
             return None, current_index + 1
         
         # 特殊處理：403-8 a 這種格式 "描述: **a.**"
-        special_403_8_match = re.search(r'^-\s*(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$', line)
+        special_403_8_match = SPECIAL_COLON_ITEM_RE.search(line)
         if special_403_8_match and disclosure_number == "403-8":
             main_content = self.clean_text(special_403_8_match.group(1))
             clause_letter = special_403_8_match.group(2)
@@ -516,19 +1497,19 @@ class GRIMarkdownToJsonConverter:
                 # 檢查是否是縮進的羅馬數字子項目
                 if original_line.startswith('\t'):
                     # 特殊處理：提取 "描述; **i.**" 格式
-                    roman_match = re.search(r'^(.+?);\s*\*\*([ivx]+)\.\*\*\s*$', subline)
+                    roman_match = SEMICOLON_ROMAN_RE.search(subline)
                     if roman_match:
                         subitem_content = self.clean_text(roman_match.group(1))
                         roman_num = roman_match.group(2)
                         
-                        if roman_num in ['i', 'ii', 'iii', 'iv', 'v']:
+                        if roman_num in VALID_ROMAN_NUMERALS:
                             subitems.append(subitem_content)
                             print(f"     📌 403-8子項目: {subitem_content[:50]}...")
                             i += 1
                             continue
                     
                     # 標準的羅馬數字提取
-                    subitem_text = self.extract_roman_subitem(subline)
+                    subitem_text = classify_roman_subitem(subline)
                     if subitem_text:
                         subitems.append(subitem_text)
                         print(f"     📌 標準子項目: {subitem_text[:50]}...")
@@ -536,9 +1517,8 @@ class GRIMarkdownToJsonConverter:
                         continue
                 
                 # 檢查是否遇到新的主項目或其他停止條件
-                if (self.is_main_item(subline) or 
-                    self.is_new_disclosure_item(subline) or 
-                    self.is_strong_section_end(subline)):
+                subtags = classify_line(subline)
+                if subtags.main_item or subtags.new_disclosure or subtags.strong_section_end:
                     print(f"     ⏹️  403-8停止收集，遇到: {subline[:50]}...")
                     break
                 
@@ -560,7 +1540,7 @@ class GRIMarkdownToJsonConverter:
             return item, i
         
         # 新增：支援標題格式的項目（如 ### **a.** 或 #### **b.**）
-        title_item_match = re.search(r'^#+\s*\*\*([a-h])\.\*\*\s*(.+)', line)
+        title_item_match = TITLE_ITEM_RE.search(line)
         if title_item_match:
             clause_letter = title_item_match.group(1)
             main_content = self.clean_text(title_item_match.group(2))
@@ -603,7 +1583,7 @@ class GRIMarkdownToJsonConverter:
                           original_line.startswith('        '))  # 8個空格也算縮進
             
             if is_indented and subline:
-                subitem_text = self.extract_roman_subitem(subline)
+                subitem_text = classify_roman_subitem(subline)
                 if subitem_text:
                     subitems.append(subitem_text)
                     print(f"     📌 子項目(縮進): {subitem_text[:50]}...")
@@ -611,7 +1591,7 @@ class GRIMarkdownToJsonConverter:
                     continue
             
             # 檢查是否是非縮進的羅馬數字子項目
-            subitem_text = self.extract_roman_subitem(subline)
+            subitem_text = classify_roman_subitem(subline)
             if subitem_text:
                 subitems.append(subitem_text)
                 print(f"     📌 子項目(非縮進): {subitem_text[:50]}...")
@@ -620,17 +1600,18 @@ class GRIMarkdownToJsonConverter:
             
             # 改進停止條件：只有在遇到明確的新主項目時才停止
             # 不要被標題、指引等中斷
-            if self.is_main_item(subline):
+            subtags = classify_line(subline)
+            if subtags.main_item:
                 print(f"     ⏹️  停止收集子項目，遇到新主項目: {subline[:50]}...")
                 break
             
             # 檢查是否是新的揭露項目
-            if self.is_new_disclosure_item(subline):
+            if subtags.new_disclosure:
                 print(f"     ⏹️  停止收集子項目，遇到新揭露項目: {subline[:50]}...")
                 break
             
             # 檢查是否是要求區段結束（但要更謹慎）
-            if self.is_strong_section_end(subline):
+            if subtags.strong_section_end:
                 print(f"     ⏹️  停止收集子項目，遇到強烈區段結束信號: {subline[:50]}...")
                 break
             
@@ -675,21 +1656,23 @@ class GRIMarkdownToJsonConverter:
     
     def is_main_item(self, line):
         """檢查是否是主項目（a., b., c., d., e.）- 支援多種格式"""
-        # 檢查標準列表格式的項目標記
-        standard_formats = (
-            re.search(r'\*\*[a-e]\.\*\*', line) is not None or 
-            re.search(r'^[a-e]\.\s+', line) is not None or 
-            re.search(r'[a-e]\.$', line) is not None
-        )
-        
-        # 檢查標題格式的項目標記（如 ### **a.** 或 #### **b.**）
-        title_formats = re.search(r'^#+\s*\*\*[a-e]\.\*\*', line) is not None
-        
-        return standard_formats or title_formats
+        return classify_line(line).main_item
     
-    def extract_text_from_image(self, image_path):
-        """使用Tesseract OCR從圖片中提取文字（使用最佳的超高解析度策略）"""
-        if not self.ocr_available or not OCR_AVAILABLE:
+    def extract_text_from_image(self, image_path, raise_errors=False):
+        """
+        使用Tesseract OCR從圖片中提取文字（依 preprocess_mode 選擇預處理策略，大圖會切成多個圖塊）
+        
+        參數:
+            image_path: 圖片路徑
+            raise_errors: 為 True 時OCR失敗會拋出 OCRError，否則返回空字串；
+                          圖片中沒有文字（OCR正常執行完畢）一律返回空字串
+        
+        返回:
+            提取的文字
+        """
+        if not self.ocr_available:
+            if raise_errors:
+                raise OCRError("OCR不可用")
             return ""
         
         try:
@@ -698,17 +1681,20 @@ class GRIMarkdownToJsonConverter:
             # 讀取圖片
             image = cv2.imread(str(image_path))
             if image is None:
-                print(f"❌ 無法讀取圖片: {image_path}")
-                return ""
-            
-            print("🎯 使用超高解析度處理策略")
-            print("-" * 40)
+                raise OCRError(f"無法讀取圖片: {image_path}")
             
-            # 使用最佳的超高解析度預處理策略
-            processed_image = self.preprocess_image_super_resolution(image)
+            if self.preprocess_mode == "super_resolution":
+                print("🎯 使用超高解析度處理策略")
+                print("-" * 40)
+                tiles = [self.preprocess_image_super_resolution(image)]
+            else:
+                print("🎯 使用有界解析度處理策略")
+                print("-" * 40)
+                tiles = self.preprocess_image_bounded(image)
             
-            # 使用優化的OCR配置
-            result = self.ocr_with_optimized_configs(processed_image, strategy="super_resolution")
+            # 使用分層OCR配置逐一辨識圖塊（圖塊依由上而下的順序排列）
+            tile_results = [self.ocr_with_optimized_configs(tile, strategy=self.preprocess_mode) for tile in tiles]
+            result = "\n".join(text.strip() for text in tile_results if text and text.strip())
             
             if result and result.strip():
                 print(f"✅ OCR成功提取繁體中文文字（{len(result)}字元）")
@@ -718,11 +1704,13 @@ class GRIMarkdownToJsonConverter:
                 
                 return result.strip()
             else:
-                print("❌ OCR未能提取到有效文字")
+                print("ℹ️  圖片中沒有可辨識的文字")
                 return ""
                 
         except Exception as e:
             print(f"❌ OCR處理失敗: {e}")
+            if raise_errors:
+                raise e if isinstance(e, OCRError) else OCRError(str(e)) from e
             return ""
     
     def preprocess_image_super_resolution(self, image):
@@ -747,191 +1735,245 @@ class GRIMarkdownToJsonConverter:
         print(f"📏 超高解析度處理: {width}x{height} -> {new_width}x{new_height}")
         return denoised
     
+    def preprocess_image_bounded(self, image):
+        """
+        有界解析度圖片預處理策略：依估計的文字行高決定縮放倍率，
+        並在縮放後像素超過上限時沿空白列切成多個水平圖塊，回傳處理後的圖塊列表
+        """
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        height, width = gray.shape
+        binary = self.binarize_for_layout(gray)
+        
+        # 📐 依文字行高決定縮放倍率（估計失敗時沿用「最短邊至少1000像素」的舊規則）
+        text_height = self.estimate_text_height(binary)
+        if text_height:
+            scale_factor = OCR_TARGET_TEXT_HEIGHT / text_height
+        else:
+            scale_factor = 1000 / min(height, width)
+        scale_factor = min(max(scale_factor, OCR_MIN_SCALE), OCR_MAX_SCALE)
+        
+        # 圖片過寬時降低倍率，確保每個圖塊至少能容納 OCR_MIN_TILE_ROWS 列
+        max_scale_for_width = (OCR_MAX_TILE_PIXELS / (width * OCR_MIN_TILE_ROWS)) ** 0.5
+        scale_factor = min(scale_factor, max_scale_for_width)
+        
+        # ✂️ 縮放後仍超過像素上限時，切成多個水平圖塊
+        tile_rows = max(1, int(OCR_MAX_TILE_PIXELS / (width * scale_factor * scale_factor)))
+        bounds = self.find_tile_bounds(binary, tile_rows)
+        
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8,8))
+        tiles = []
+        for top, bottom in bounds:
+            tile = gray[top:bottom]
+            if scale_factor != 1.0:
+                tile = cv2.resize(tile, (int(width * scale_factor), int((bottom - top) * scale_factor)),
+                                  interpolation=cv2.INTER_LANCZOS4 if scale_factor > 1.0 else cv2.INTER_AREA)
+            tiles.append(cv2.medianBlur(clahe.apply(tile), 3))
+        
+        text_height_info = f"{text_height:.0f}px" if text_height else "未知"
+        print(f"📏 有界解析度處理: {width}x{height} -> {int(width * scale_factor)}x{int(height * scale_factor)}"
+              f"（文字行高 {text_height_info}，倍率 {scale_factor:.2f}，{len(tiles)} 個圖塊）")
+        return tiles
+    
+    def binarize_for_layout(self, gray):
+        """以Otsu二值化取得文字像素遮罩（文字為非零），自動處理深色背景"""
+        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        if cv2.countNonZero(binary) > binary.size / 2:
+            binary = cv2.bitwise_not(binary)
+        return binary
+    
+    def estimate_text_height(self, binary):
+        """以水平投影估計文字行高（像素）；中文字常由多個連通元件組成，因此以整行高度估計"""
+        row_has_ink = (binary > 0).sum(axis=1) > max(2, binary.shape[1] * 0.005)
+        
+        # 找出連續含墨的列區段
+        padded = np.concatenate(([False], row_has_ink, [False])).astype(np.int8)
+        changes = np.flatnonzero(np.diff(padded))
+        run_heights = changes[1::2] - changes[0::2]
+        
+        # 排除表格線與雜訊（過矮）以及圖形區塊（過高）
+        run_heights = run_heights[(run_heights >= 4) & (run_heights <= binary.shape[0] / 4)]
+        if len(run_heights) < 2:
+            return None
+        return float(np.median(run_heights))
+    
+    def find_tile_bounds(self, binary, tile_rows):
+        """在每個圖塊的後四分之一範圍內，選擇含墨最少的列作為切割位置，避免切斷文字行"""
+        height = binary.shape[0]
+        if height <= tile_rows:
+            return [(0, height)]
+        
+        row_ink = (binary > 0).sum(axis=1)
+        bounds = []
+        top = 0
+        while height - top > tile_rows:
+            search_start = top + max(1, tile_rows * 3 // 4)
+            search_end = top + tile_rows
+            cut = search_start + int(np.argmin(row_ink[search_start:search_end]))
+            bounds.append((top, cut))
+            top = cut
+        bounds.append((top, height))
+        return bounds
+    
     def ocr_with_optimized_configs(self, processed_image, strategy="default"):
-        """使用優化的Tesseract配置進行OCR"""
+        """
+        分層執行Tesseract配置：依歷史勝出次數排序，逐一以image_to_data取得文字與信心分數，
+        一旦信心分數達門檻即提早結束；若都未達門檻則沿用最長結果
+
+        每 OCR_EXPLORE_INTERVAL 個圖塊完整比較一次所有配置，取文字量足夠且信心分數最高的結果。
+        只有實際比較過多種配置時才記錄勝出次數，避免排序鎖定在第一個執行的配置上
+        """
         from PIL import Image
         pil_image = Image.fromarray(processed_image)
         
-        # 📋 針對繁體中文高度優化的配置
-        configs = [
-            # 配置1: 高精度單行處理
-            ('--oem 3 --psm 6 -l chi_tra -c preserve_interword_spaces=1', "高精度單行"),
-            
-            # 配置2: 垂直文字專用
-            ('--oem 3 --psm 5 -l chi_tra -c preserve_interword_spaces=1', "垂直文字專用"),
-            
-            # 配置3: 稀疏文字處理
-            ('--oem 3 --psm 8 -l chi_tra', "稀疏文字處理"),
-            
-            # 配置4: 自動分割優化
-            ('--oem 3 --psm 3 -l chi_tra -c preserve_interword_spaces=1', "自動分割優化"),
-            
-            # 配置5: 混合語言處理
-            ('--oem 3 --psm 6 -l chi_tra+eng', "混合語言處理"),
-            
-            # 配置6: 單字符優化
-            ('--oem 3 --psm 10 -l chi_tra', "單字符優化"),
-            
-            # 配置7: 原始LSTM引擎
-            ('--oem 1 --psm 6 -l chi_tra', "LSTM引擎")
-        ]
+        self.ocr_tile_count += 1
+        explore = self.ocr_tile_count % OCR_EXPLORE_INTERVAL == 0
         
         best_result = ""
         best_config_name = ""
         best_length = 0
+        best_confidence = 0.0
+        best_qualified = False
+        tried = 0
+        failed = 0
+        last_error = None
         
-        for config, config_name in configs:
+        for config, config_name in self.ordered_ocr_configs():
             try:
-                result = pytesseract.image_to_string(pil_image, config=config)
+                tried += 1
+                result, confidence = self.ocr_with_confidence(pil_image, config)
+                length = len(result.strip())
+                qualified = length >= OCR_MIN_EARLY_EXIT_CHARS
                 
-                if result and len(result.strip()) > best_length:
+                if explore and qualified:
+                    # 完整比較：文字量足夠的結果中取信心分數最高者
+                    better = not best_qualified or confidence > best_confidence
+                else:
+                    better = not best_qualified and length > best_length
+                if better:
                     best_result = result
                     best_config_name = config_name
-                    best_length = len(result.strip())
+                    best_length = length
+                    best_confidence = confidence
+                    best_qualified = explore and qualified
+                
+                # ⚡ 信心分數達門檻且文字量足夠，直接採用此結果
+                if not explore and confidence >= OCR_CONFIDENCE_THRESHOLD and qualified:
+                    best_result = result
+                    best_config_name = config_name
+                    best_length = length
+                    best_confidence = confidence
+                    break
                     
             except Exception as e:
+                failed += 1
+                last_error = e
                 continue
         
+        if failed == tried:
+            self.last_ocr_config = None
+            print(f"   ❌ 所有配置都失敗")
+            raise OCRError(f"所有OCR配置都失敗: {last_error}")
+        
+        self.last_ocr_config = best_config_name or None
         if best_result.strip():
-            print(f"   🎯 最佳配置: {best_config_name} (長度: {best_length})")
+            if tried > 1:
+                self.record_ocr_config_win(best_config_name)
+            mode = "完整比較" if explore else "分層"
+            print(f"   🎯 最佳配置: {best_config_name} (長度: {best_length}, 信心: {best_confidence:.1f}, "
+                  f"{mode}嘗試 {tried}/{len(OCR_CONFIGS)} 種配置)")
         else:
-            print(f"   ❌ 所有配置都失敗")
+            print(f"   ℹ️  圖塊中沒有可辨識的文字")
             
         return best_result
     
+    @staticmethod
+    def join_ocr_words(words):
+        """
+        將同一行的字詞接回文字：chi_tra 會把每個中文字當成一個字詞，
+        與 image_to_string 相同，中文字之間不加空白，只有兩側都不是中日韓文字時才以空白分隔
+        """
+        pieces = []
+        for word in words:
+            if pieces and not OCR_CJK_CHAR_RE.match(pieces[-1][-1]) and not OCR_CJK_CHAR_RE.match(word[0]):
+                pieces.append(" ")
+            pieces.append(word)
+        return "".join(pieces)
+    
+    def ocr_with_confidence(self, pil_image, config):
+        """以OCR後端的image_to_data執行一次OCR，回傳 (依行重組的文字, 平均字詞信心分數)"""
+        data = self.ocr_backend.image_to_data(pil_image, config)
+        
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            confidence = float(data['conf'][i])
+            if not word or confidence < 0:
+                continue
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(key, []).append(word)
+            confidences.append(confidence)
+        
+        # 依區塊/段落/行重組文字，段落之間以空行分隔
+        text_lines = []
+        previous_paragraph = None
+        for (block_num, par_num, line_num), words in lines.items():
+            if previous_paragraph is not None and previous_paragraph != (block_num, par_num):
+                text_lines.append("")
+            text_lines.append(self.join_ocr_words(words))
+            previous_paragraph = (block_num, par_num)
+        
+        mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+        return "\n".join(text_lines), mean_confidence
+    
+    def ordered_ocr_configs(self):
+        """依歷史勝出次數排序OCR配置（次數相同時維持預設順序）"""
+        return sorted(OCR_CONFIGS, key=lambda item: -self.ocr_config_stats.get(item[1], 0))
+    
+    def record_ocr_config_win(self, config_name, count=1):
+        """記錄某個OCR配置勝出（同時累計尚未儲存的次數，儲存時與檔案合併）"""
+        self.ocr_config_stats[config_name] = self.ocr_config_stats.get(config_name, 0) + count
+        self._unsaved_ocr_config_wins[config_name] = self._unsaved_ocr_config_wins.get(config_name, 0) + count
+    
+    def load_ocr_config_stats(self):
+        """讀取持久化的OCR配置勝出統計"""
+        try:
+            with open(OCR_CONFIG_STATS_FILE, 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+            return {name: int(wins) for name, wins in stats.items()}
+        except (OSError, ValueError):
+            return {}
+    
+    def save_ocr_config_stats(self):
+        """
+        儲存OCR配置勝出統計，讓之後的執行沿用調整後的順序
+
+        --jobs 平行轉換時多個行程會各自儲存，因此只把本行程新增的次數加到檔案中的最新統計，
+        並先寫入暫存檔再以 os.replace 替換，避免互相覆蓋或讀到寫到一半的檔案
+        """
+        if not self._unsaved_ocr_config_wins:
+            return
+        try:
+            OCR_CONFIG_STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
+            stats = self.load_ocr_config_stats()
+            for name, wins in self._unsaved_ocr_config_wins.items():
+                stats[name] = stats.get(name, 0) + wins
+            tmp_path = OCR_CONFIG_STATS_FILE.with_name(f"{OCR_CONFIG_STATS_FILE.name}.{os.getpid()}.tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(stats, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, OCR_CONFIG_STATS_FILE)
+            self.ocr_config_stats = stats
+            self._unsaved_ocr_config_wins = {}
+        except OSError as e:
+            print(f"⚠️  無法儲存OCR配置統計: {e}")
+    
     def fix_chinese_ocr_errors(self, text):
         """修復繁體中文OCR常見錯誤（大幅增強版）"""
         if not text:
             return ""
         
-        # 🔧 繁體中文OCR常見錯誤字典
-        chinese_corrections = {
-            # 基本錯誤修正
-            '報導組纖': '報導組織',
-            '組纖': '組織',
-            '纖': '織',
-            '稚華': '衝擊', 
-            '千擊': '衝擊',
-            '衝聲': '衝擊',
-            '衝繫': '衝擊',
-            '衝軗': '衝擊',
-            '衝坎': '衝擊',
-            '衝軟': '衝擊',
-            '衝傘': '衝擊',
-            '衝黎': '衝擊',
-            
-            # 關係人相關
-            '利客關係人': '利害關係人',
-            '利雪關係人': '利害關係人',
-            '關係入': '關係人',
-            
-            # 間接/直接
-            '閒接': '間接',
-            '閒接經濟': '間接經濟',
-            '直援': '直接',
-            
-            # 意涵/注意
-            '意售': '意涵',
-            '圖注': '關注',
-            '標竿': '標準',
-            '外部標': '外部標準',
-            '外部標生': '外部標準',
-            
-            # 嚴重/貧困
-            '戲重': '嚴重',
-            '發困': '貧困',
-            '戲重發困': '嚴重貧困',
-            
-            # 生產/章節
-            '章力': '生產力',
-            '生章力': '生產力',
-            '行葉': '行業',
-            
-            # 參與
-            '芭與': '參與',
-            '芭加': '參加',
-            
-            # 產生/誠生
-            '誠生': '產生',
-            '卉生': '產生',
-            '章生': '產生',
-            
-            # 衝擊/影響
-            '生器': '衝擊',
-            '影韓': '影響',
-            
-            # 數量/勞動
-            '勞履': '勞動',
-            '勞履數量': '勞動數量',
-            '若域': '該域',
-            
-            # 成長
-            '經濟成長': '經濟成長',
-            '成長或纖減': '成長或縮減',
-            '纖減': '縮減',
-            
-            # 技能/知識
-            '知謀': '知識',
-            '技能和知謀': '技能和知識',
-            
-            # 投資
-            '直援投資': '直接投資',
-            '外國直援投資': '外國直接投資',
-            
-            # 地區/區域
-            '地區': '地區',
-            '當地': '當地',
-            
-            # 標點符號修正
-            '. ': '。',
-            ', ': '，',
-            ': ': '：',
-            '; ': '；',
-            '? ': '？',
-            '! ': '！',
-            
-            # 特殊符號清理 (移除OCR雜訊)
-            'GERM': '',
-            'aml': '',
-            '$0': '',
-            'WE': '',
-            'AREEHHRANAERERAT': '',
-            'ARBARAM': '',
-            'TAR]': '',
-            'MHRA': '',
-            'FMR': '',
-            'AHR': '',
-            'ARE': '',
-            'BAMERALRPEGAADHOT': '',
-            'AHRT': '',
-            'FMR': '',
-            
-            # 常見詞語修正
-            '侵惠': '優惠',
-            '大點': '大眾',
-            '供應鍵': '供應鏈',
-            '銷售通路': '銷售通路',
-            '基礎設施': '基礎設施',
-            '服務時': '服務時',
-            '譚品': '產品',
-            
-            # 英文字母和數字混淆
-            'O': '0',  # 字母O -> 數字0
-            'I': '1',  # 字母I -> 數字1
-            'l': '1',  # 小寫l -> 數字1
-        }
-        
-        # 🔄 應用字典修正
-        corrected_text = text
-        corrections_applied = 0
-        
-        for wrong, correct in chinese_corrections.items():
-            if wrong in corrected_text:
-                old_text = corrected_text
-                corrected_text = corrected_text.replace(wrong, correct)
-                if corrected_text != old_text:
-                    corrections_applied += 1
-                    print(f"   🔧 修正: '{wrong}' -> '{correct}'")
+        # 🔧 套用繁體中文OCR常見錯誤字典（ocr_corrections.json 的 chinese 表）
+        corrected_text, corrections_applied = get_correction_engine("chinese").replace(text)
         
         # 🧹 清理多餘的空格和標點
         corrected_text = re.sub(r'\s+', ' ', corrected_text)  # 合併多個空格
@@ -958,25 +2000,11 @@ class GRIMarkdownToJsonConverter:
         # 移除多餘的空白行
         lines = [line.strip() for line in text.split('\n') if line.strip()]
         
-        # 修復常見的OCR錯誤
+        # 修復常見的OCR錯誤並標準化標點符號（ocr_corrections.json 的 common 表）
+        engine = get_correction_engine("common")
         cleaned_lines = []
         for line in lines:
-            # 修復常見錯誤
-            line = line.replace('衝聲', '衝擊')
-            line = line.replace('衝繫', '衝擊') 
-            line = line.replace('衝軗', '衝擊')
-            line = line.replace('關係入', '關係人')
-            line = line.replace('利雪關係人', '利害關係人')
-            line = line.replace('標竿', '標準')
-            line = line.replace('例女口', '例如')
-            line = line.replace('國豕', '國家')
-            line = line.replace('團際', '國際')
-            
-            # 標準化標點符號
-            line = line.replace('. ', '。')
-            line = line.replace(', ', '，')
-            line = line.replace(': ', '：')
-            line = line.replace('; ', '；')
+            line, _ = engine.replace(line)
             
             # 清理多餘空格
             line = re.sub(r'\s+', ' ', line).strip()
@@ -1131,127 +2159,179 @@ class GRIMarkdownToJsonConverter:
     
     def fix_ocr_errors(self, text):
         """修復常見的OCR錯誤"""
-        # 常見錯誤替換
-        corrections = {
-            '衝聲': '衝擊',
-            '衝繫': '衝擊', 
-            '衝軗': '衝擊',
-            '關係入': '關係人',
-            '利雪關係人': '利害關係人',
-            '標竿': '標準',
-            '協定': '協定',
-            '例女口': '例如',
-            '國豕': '國家',
-            '團際': '國際',
-            '標竿': '標準',
-            '. ': '。',  # 修復句號
-            ', ': '，',  # 修復逗號
-            ': ': '：',  # 修復冒號
-        }
-        
-        fixed_text = text
-        for wrong, correct in corrections.items():
-            fixed_text = fixed_text.replace(wrong, correct)
+        # 常見錯誤替換（ocr_corrections.json 的 common 表）
+        fixed_text, _ = get_correction_engine("common").replace(text)
         
         # 清理多餘空格
         fixed_text = re.sub(r'\s+', ' ', fixed_text).strip()
         
         return fixed_text
     
-    def process_images_in_markdown(self, md_file_path):
-        """處理markdown中的圖片，使用Tesseract OCR提取文字並直接修改原始文件"""
-        print(f"🔎 開始處理圖片，檔案: {md_file_path}")
-        print(f"🔎 Tesseract OCR 狀態: {self.ocr_available}")
-        print(f"🔎 OCR_AVAILABLE: {OCR_AVAILABLE}")
+    def ocr_images(self, image_paths):
+        """
+        對多張圖片執行OCR，回傳 {圖片路徑: 文字}，OCR失敗的圖片為 None（沒有文字的圖片為空字串）
+        先查詢OCR快取，只有未命中的圖片才執行Tesseract；ocr_workers > 1 時以行程池平行處理
+        """
+        results = {}
+        image_hashes = {}
+        pending = list(image_paths)
+        
+        if self.ocr_cache is not None:
+            pending = []
+            for image_path in image_paths:
+                try:
+                    image_hashes[image_path] = OCRResultCache.hash_image(image_path)
+                except OSError:
+                    pending.append(image_path)
+                    continue
+                cached = self.ocr_cache.get(image_hashes[image_path], self.preprocess_mode)
+                if cached is None:
+                    pending.append(image_path)
+                else:
+                    results[image_path] = cached[0]
+                    print(f"💾 OCR快取命中: {Path(image_path).name}")
         
-        if not self.ocr_available:
-            print("❌ Tesseract OCR 未初始化，跳過圖片處理")
-            return False
+        outputs = None
+        workers = min(self.ocr_workers, len(pending))
+        if workers > 1:
+            print(f"⚡ 使用 {workers} 個行程平行OCR {len(pending)} 張圖片")
+            try:
+                # 行程池以 ocr_workers 建立並在之後的檔案中重複使用，不依本檔案的圖片數縮小
+                executor = get_ocr_process_pool(self.ocr_workers)
+                outputs = []
+                for text, config_name, wins in executor.map(_ocr_image_worker, pending,
+                                                            [self.preprocess_mode] * len(pending),
+                                                            [self.ocr_backend_name] * len(pending)):
+                    outputs.append((text, config_name))
+                    for name, count in wins.items():
+                        self.record_ocr_config_win(name, count)
+            except Exception as e:
+                print(f"⚠️  平行OCR失敗（{e}），改為逐張處理")
+                shutdown_ocr_process_pool()
+                outputs = None
+        
+        if outputs is None:
+            outputs = []
+            for image_path in pending:
+                try:
+                    text = self.extract_text_from_image(image_path, raise_errors=True)
+                except OCRError:
+                    text = None
+                outputs.append((text, self.last_ocr_config))
+        
+        for image_path, (text, config_name) in zip(pending, outputs):
+            results[image_path] = text
+            # 成功的結果（包含沒有文字的圖片）都寫入快取，只有OCR失敗的圖片下次會重試
+            if text is not None and self.ocr_cache is not None and image_path in image_hashes:
+                self.ocr_cache.put(image_hashes[image_path], self.preprocess_mode, text, config_name)
+        
+        if pending:
+            self.save_ocr_config_stats()
+        return results
+    
+    def ocr_version(self):
+        """OCR結果的版本：預處理方式 + 預處理版本 + Tesseract配置簽章"""
+        return f"{self.preprocess_mode}-v{OCR_PREPROCESS_VERSION}:{ocr_config_signature()}"
+    
+    def process_images_in_markdown(self, md_file_path, content=None):
+        """
+        對markdown中引用的圖片執行OCR，結果寫入旁路檔 <檔名>.ocr.json，不修改原始Markdown
         
-        # 找到markdown檔案所在的目錄
-        md_dir = Path(md_file_path).parent
-        print(f"🔎 檔案目錄: {md_dir}")
+        參數:
+            md_file_path: Markdown檔案路徑
+            content: 已讀取的Markdown內容（省略時從檔案讀取）
         
-        # 讀取原始內容
-        with open(md_file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        返回:
+            旁路檔內容（dict），沒有可用的OCR結果時返回 None
+        """
+        print(f"🔎 開始處理圖片，檔案: {md_file_path}")
         
-        print(f"🔎 檔案內容長度: {len(content)}")
+        if content is None:
+            with open(md_file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
         
-        # 尋找圖片引用的模式
-        image_pattern = r'!\[\]\(([^)]+\.(?:jpeg|jpg|png|gif))\)'
+        markdown_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        existing = load_ocr_sidecar(md_file_path, markdown_hash)
         
-        # 先檢查是否有圖片引用
-        matches = re.findall(image_pattern, content)
-        print(f"🔎 找到的圖片引用: {matches}")
+        if self.ocr_mode == "skip":
+            print("⏭️  跳過OCR" + ("，使用既有的旁路檔" if existing else ""))
+            return existing
         
-        if not matches:
-            print("ℹ️  沒有找到圖片引用，跳過OCR處理")
-            return False
+        # 找到markdown檔案所在的目錄
+        md_dir = Path(md_file_path).parent
         
-        modified = False
+        # 收集每張圖片（去除重複引用）在Markdown中的所有引用位置
+        image_offsets = {}
+        for match in OCR_IMAGE_REF_RE.finditer(content):
+            image_offsets.setdefault(match.group(1), []).append([match.start(), match.end()])
+        print(f"🔎 找到的圖片引用: {list(image_offsets)}")
+        
+        if not image_offsets:
+            print("ℹ️  沒有找到圖片引用，跳過OCR處理")
+            return None
         
-        def replace_image_with_text(match):
-            nonlocal modified
-            image_filename = match.group(1)
+        image_hashes = {}
+        for image_filename in image_offsets:
             image_path = md_dir / image_filename
-            
-            print(f"🔎 處理圖片: {image_filename}")
-            print(f"🔎 圖片路徑: {image_path}")
-            print(f"🔎 圖片存在: {image_path.exists()}")
-            
             if image_path.exists():
-                # 提取圖片中的文字
-                print(f"🔄 開始OCR處理...")
-                extracted_text = self.extract_text_from_image(image_path)
-                print(f"🔎 OCR結果長度: {len(extracted_text) if extracted_text else 0}")
-                
-                if extracted_text:
-                    # 將提取的文字直接格式化並替換圖片引用
-                    formatted_text = f"\n\n**[從圖片提取的文字]**\n{extracted_text}\n\n"
-                    modified = True
-                    
-                    # 💾 保留圖片檔案以供debug（不刪除）
-                    print(f"🖼️  已處理圖片檔案: {image_filename}（保留原檔案供debug）")
-                    
-                    return formatted_text
-                else:
-                    print(f"⚠️  OCR無法提取文字，保留原圖片引用")
-                    # 如果無法提取文字，保留原始圖片引用
-                    return match.group(0)
+                image_hashes[image_filename] = OCRResultCache.hash_image(image_path)
             else:
                 print(f"⚠️  找不到圖片檔案: {image_path}")
-                return match.group(0)
-        
-        # 替換所有圖片引用
-        print(f"🔄 開始替換圖片引用...")
-        processed_content = re.sub(image_pattern, replace_image_with_text, content)
-        
-        # 如果有修改，寫回原始文件
-        if modified:
-            print(f"💾 寫回修改後的檔案...")
-            with open(md_file_path, 'w', encoding='utf-8') as f:
-                f.write(processed_content)
-            print(f"✅ 已更新原始 Markdown 文件: {md_file_path}")
-        else:
-            print(f"ℹ️  沒有進行任何修改")
         
-        return modified
+        if self.ocr_mode == "auto" and is_ocr_sidecar_current(existing, self.ocr_version(), image_hashes):
+            print(f"♻️  沿用OCR旁路檔: {ocr_sidecar_path(md_file_path).name}")
+            return existing
+        
+        # 確定需要OCR時才載入OCR套件與引擎
+        print(f"🔎 Tesseract OCR 狀態: {self.ocr_available}")
+        if not self.ocr_available:
+            print("❌ Tesseract OCR 未初始化，跳過圖片處理" + ("，使用既有的旁路檔" if existing else ""))
+            return existing
+        
+        ocr_results = self.ocr_images([md_dir / image_filename for image_filename in image_hashes])
+        
+        # ok 記錄OCR是否成功執行：失敗或找不到檔案的圖片下次會重試，沒有文字的圖片則沿用
+        images = []
+        for image_filename, offsets in image_offsets.items():
+            text = ocr_results.get(md_dir / image_filename)
+            if text:
+                print(f"🖼️  已處理圖片檔案: {image_filename}")
+            elif text is not None:
+                print(f"ℹ️  圖片中沒有文字，保留原圖片引用: {image_filename}")
+            elif image_filename in image_hashes:
+                print(f"⚠️  OCR失敗，保留原圖片引用: {image_filename}")
+            images.append({
+                "image": image_filename,
+                "image_sha256": image_hashes.get(image_filename),
+                "offsets": offsets,
+                "text": text,
+                "ok": text is not None
+            })
+        
+        sidecar = {
+            "version": OCR_SIDECAR_VERSION,
+            "markdown_sha256": markdown_hash,
+            "ocr_version": self.ocr_version(),
+            "images": images
+        }
+        save_ocr_sidecar(md_file_path, sidecar)
+        print(f"💾 OCR結果已寫入旁路檔: {ocr_sidecar_path(md_file_path)}")
+        return sidecar
     
     def convert_md_to_json(self, md_file_path, output_dir):
         """將Markdown檔案轉換為JSON"""
         try:
             print(f"📄 開始處理: {md_file_path}")
             
-            # 處理圖片中的文字（直接修改原始文件）
-            images_processed = self.process_images_in_markdown(md_file_path)
-            
-            # 讀取（可能已修改的）Markdown檔案
+            # 讀取Markdown檔案（原始檔案不會被修改）
             with open(md_file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
             
+            # 處理圖片中的文字：OCR結果存於旁路檔，只在記憶體中合併
+            ocr_sidecar = self.process_images_in_markdown(md_file_path, content)
+            
             # 解析內容
-            self.parse_markdown_content(content)
+            self.parse_markdown_content(merge_ocr_sidecar(content, ocr_sidecar))
             
             # 建立JSON結構
             json_structure = {
@@ -1279,8 +2359,8 @@ class GRIMarkdownToJsonConverter:
             total_items = sum(len(group['items']) for group in self.groups)
             print(f"📋 總項目數: {total_items}")
             
-            if images_processed:
-                print(f"🖼️  已處理圖片並更新原始文件")
+            if ocr_sidecar:
+                print(f"🖼️  已合併圖片OCR文字（{sum(1 for image in ocr_sidecar['images'] if image['text'])} 張圖片）")
             
             return str(output_filename)
             
@@ -1653,29 +2733,19 @@ class GRIMarkdownToJsonConverter:
     
     def is_strong_section_end(self, line):
         """檢查是否是強烈的區段結束信號（比is_requirements_section_end更嚴格）"""
-        # 只有在遇到明確的大標題或新section時才認為是結束
-        strong_end_patterns = [
-            r"^#+\s*(建議|指引|背景)",  # 明確的標題（移除彙編要求）
-            r"^揭露項目\s*\*\*\d+-\d+\*\*",     # 新的揭露項目標題
-            r"^#.*揭露項目.*\d+-\d+",            # 其他揭露項目格式
-        ]
-        
-        for pattern in strong_end_patterns:
-            if re.search(pattern, line):
-                return True
-        return False
+        return classify_line(line).strong_section_end
     
     def is_deep_indented_item(self, lines, current_index, disclosure_number):
         """檢查是否是深層縮進項目結構（如 403-9 a）"""
         line = lines[current_index].strip()
         
         # 檢查當前行是否是冒號前置格式（如 "所有員工: **a.**"）
-        if re.search(r'(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$', line):
+        if classify_line(line).colon_bold_item:
             # 檢查下一行是否有縮進的羅馬數字
             if current_index + 1 < len(lines):
                 next_line = lines[current_index + 1]
                 if (next_line.startswith('\t') and 
-                    re.search(r'\*\*([ivx]+)\.\*\*', next_line.strip())):
+                    BOLD_ROMAN_RE.search(next_line.strip())):
                     return True
         
         return False
@@ -1685,12 +2755,12 @@ class GRIMarkdownToJsonConverter:
         line = lines[current_index].strip()
         
         # 解析主項目
-        match = re.search(r'(.+?)[：:]\s*\*\*([a-e])\.\*\*\s*$', line)
-        if not match:
+        colon_bold_item = classify_line(line).colon_bold_item
+        if not colon_bold_item:
             return None, current_index + 1
         
-        main_content = self.clean_text(match.group(1))
-        clause_letter = match.group(2)
+        main_content = self.clean_text(colon_bold_item[0])
+        clause_letter = colon_bold_item[1]
         
         print(f"   🎯 找到深層縮進主項目: {disclosure_number} {clause_letter} - {main_content[:50]}...")
         
@@ -1709,7 +2779,7 @@ class GRIMarkdownToJsonConverter:
             
             # 檢查是否是縮進的子項目
             if original_line.startswith('\t'):
-                subitem_text = self.extract_roman_subitem(subline)
+                subitem_text = classify_roman_subitem(subline)
                 if subitem_text:
                     subitems.append(subitem_text)
                     print(f"     📌 深層子項目: {subitem_text[:50]}...")
@@ -1717,7 +2787,8 @@ class GRIMarkdownToJsonConverter:
                     continue
             
             # 如果遇到不縮進的行，檢查是否是新的主項目
-            if self.is_main_item(subline) or self.is_new_disclosure_item(subline):
+            subtags = classify_line(subline)
+            if subtags.main_item or subtags.new_disclosure:
                 print(f"     ⏹️  深層縮進停止，遇到: {subline[:50]}...")
                 break
             
@@ -1886,12 +2957,82 @@ class GRIMarkdownToJsonConverter:
         # 如果找不到標題，返回預設值
         return "未知項目"
 
+# 轉換摘要的檔名（與建置清單一樣存放在Markdown中間目錄）
+CONVERSION_SUMMARY_NAME = ".gri_conversion_summary.json"
+
+def convert_markdown_file(md_file, output_dir, ocr_workers=None, ocr_cache=True,
+                          preprocess_mode="bounded", ocr_mode="auto", ocr_backend="auto", preview=True):
+    """
+    轉換單一Markdown檔案並回傳統計資料
+
+    返回:
+        dict: md_file, json_file, success, groups, items, seconds, ocr_cache_hits, ocr_cache_misses, ocr_status
+    """
+    start = time.perf_counter()
+    # 共用的快取會累計多個檔案的次數，因此記錄轉換前的數值以計算本檔案的命中數
+    shared_cache = ocr_cache if isinstance(ocr_cache, OCRResultCache) else None
+    hits_before, misses_before = (shared_cache.hits, shared_cache.misses) if shared_cache else (0, 0)
+    converter = GRIMarkdownToJsonConverter(ocr_workers=ocr_workers, ocr_cache=ocr_cache,
+                                           preprocess_mode=preprocess_mode, ocr_mode=ocr_mode,
+                                           ocr_backend=ocr_backend)
+    result = converter.convert_md_to_json(md_file, output_dir)
+    if result and preview:
+        converter.display_preview()
+    
+    return {
+        "md_file": str(md_file),
+        "json_file": result,
+        "success": bool(result),
+        "groups": len(converter.groups) if result else 0,
+        "items": sum(len(group['items']) for group in converter.groups) if result else 0,
+        "seconds": round(time.perf_counter() - start, 3),
+        "ocr_cache_hits": converter.ocr_cache.hits - hits_before if converter.ocr_cache is not None else 0,
+        "ocr_cache_misses": converter.ocr_cache.misses - misses_before if converter.ocr_cache is not None else 0,
+        "ocr_status": converter.ocr_status()
+    }
+
+def _convert_markdown_job(md_file, output_dir, options):
+    """行程池工作函式：轉換單一Markdown檔案，並收集該檔案的輸出訊息避免多個行程交錯輸出"""
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        try:
+            stats = convert_markdown_file(md_file, output_dir, preview=False, **options)
+        except Exception as e:
+            stats = {"md_file": str(md_file), "json_file": None, "success": False, "groups": 0, "items": 0,
+                     "seconds": 0.0, "ocr_cache_hits": 0, "ocr_cache_misses": 0, "ocr_status": None,
+                     "error": str(e)}
+    stats["log"] = log.getvalue()
+    return stats
+
+def write_conversion_summary(summary_path, file_stats, skipped_files, jobs, elapsed):
+    """將本次轉換的逐檔統計寫入摘要檔"""
+    summary = {
+        "generated_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "converter_version": converter_version(),
+        "jobs": jobs,
+        "elapsed_seconds": round(elapsed, 3),
+        "converted": sum(1 for stats in file_stats if stats["success"]),
+        "failed": sum(1 for stats in file_stats if not stats["success"]),
+        "skipped": [str(md_file) for md_file in skipped_files],
+        "files": [{key: value for key, value in stats.items() if key != "log"} for stats in file_stats]
+    }
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+
 def main():
     parser = argparse.ArgumentParser(description='將GRI PDF檔案轉換為JSON格式（包含PDF→MD→JSON完整流程）')
     parser.add_argument('--input_pdf_dir', default='input_pdf', help='輸入PDF檔案的目錄')
     parser.add_argument('--md_dir', default='pdf_to_md', help='中間Markdown檔案的目錄')
     parser.add_argument('--output_dir', default='output_json', help='輸出JSON檔案的目錄')
     parser.add_argument('--skip_pdf_conversion', action='store_true', help='跳過PDF轉換步驟，直接處理已存在的Markdown檔案')
+    parser.add_argument('--ocr_workers', type=int, default=None, help='平行OCR的行程數（預設為CPU核心數，1為逐張處理）')
+    parser.add_argument('--jobs', type=int, default=1, help='同時轉換的準則數（行程池大小，1為逐檔處理）')
+    parser.add_argument('--ocr_backend', choices=['auto'] + list(OCR_BACKENDS), default='auto',
+                        help='OCR引擎：auto 依 tesserocr → libtesseract → pytesseract 的順序選擇')
+    parser.add_argument('--preprocess_mode', choices=['bounded', 'super_resolution'], default='bounded', help='OCR圖片預處理方式')
+    parser.add_argument('--force', action='store_true', help='忽略增量建置清單，重新轉換所有準則')
+    parser.add_argument('--ocr', choices=['auto', 'skip', 'redo'], default='auto',
+                        help='OCR旁路檔的使用方式：auto 沿用有效的結果、skip 不執行OCR、redo 一律重新OCR')
     
     args = parser.parse_args()
     
@@ -1925,6 +3066,9 @@ def main():
         input_pdf_dir.mkdir(parents=True, exist_ok=True)
         print(f"💡 請將要轉換的PDF檔案放入 {input_pdf_dir} 目錄中")
     
+    # 增量建置清單：記錄每個準則的PDF/Markdown雜湊與轉換器版本
+    manifest = ConversionManifest.for_md_dir(md_dir)
+    
     # 步驟1: PDF轉Markdown（如果沒有跳過的話）
     if not args.skip_pdf_conversion:
         print("\n📋 步驟1: PDF轉Markdown")
@@ -1946,28 +3090,36 @@ def main():
         for pdf_file in pdf_files:
             print(f"   • {pdf_file.name}")
         
-        # 使用marker轉換所有PDF（目錄已在前面創建）
-        print(f"\n🔄 使用marker轉換PDF檔案...")
-        try:
-            import subprocess
-            result = subprocess.run([
-                'marker', str(input_pdf_dir), '--output_dir', str(md_dir)
-            ], capture_output=True, text=True, cwd=str(Path.cwd()))
-            
-            if result.returncode == 0:
-                print("✅ PDF轉換完成!")
-                print(f"📁 Markdown檔案已保存到: {md_dir}")
-            else:
-                print(f"❌ PDF轉換失敗: {result.stderr}")
-                return
+        # 只轉換新增或內容變動的PDF
+        changed_pdfs, unchanged_pdfs = select_changed_pdfs(pdf_files, md_dir, manifest, force=args.force)
+        if unchanged_pdfs:
+            print(f"⏭️  {len(unchanged_pdfs)} 個PDF未變動，沿用既有的Markdown")
+        
+        if not changed_pdfs:
+            print("✅ 所有PDF都已是最新，不需要重新轉換")
+        else:
+            # 使用marker轉換需要更新的PDF（目錄已在前面創建）
+            print(f"\n🔄 使用marker轉換 {len(changed_pdfs)} 個PDF檔案...")
+            try:
+                result = run_marker([pdf_file for pdf_file, _ in changed_pdfs], md_dir)
                 
-        except FileNotFoundError:
-            print("❌ 找不到marker指令，請確認marker已正確安裝")
-            print("💡 您可以使用 --skip_pdf_conversion 參數跳過此步驟")
-            return
-        except Exception as e:
-            print(f"❌ PDF轉換過程發生錯誤: {str(e)}")
-            return
+                if result.returncode == 0:
+                    for pdf_file, pdf_hash in changed_pdfs:
+                        manifest.record_pdf(pdf_file, md_dir, pdf_hash)
+                    manifest.save()
+                    print("✅ PDF轉換完成!")
+                    print(f"📁 Markdown檔案已保存到: {md_dir}")
+                else:
+                    print(f"❌ PDF轉換失敗: {result.stderr}")
+                    return
+                    
+            except FileNotFoundError:
+                print("❌ 找不到marker指令，請確認marker已正確安裝")
+                print("💡 您可以使用 --skip_pdf_conversion 參數跳過此步驟")
+                return
+            except Exception as e:
+                print(f"❌ PDF轉換過程發生錯誤: {str(e)}")
+                return
     else:
         print("\n⏭️  跳過PDF轉換步驟，直接處理已存在的Markdown檔案")
     
@@ -1987,32 +3139,83 @@ def main():
     for md_file in md_files:
         print(f"   • {md_file}")
     
-    # 處理每個markdown檔案（目錄已在前面創建）
-    success_count = 0
-    total_items = 0
-    
+    # 略過內容與轉換器版本都未變動的檔案
+    pending_files = []
+    skipped_files = []
     for md_file in md_files:
-        print(f"\n🔄 處理檔案: {md_file}")
-        print("-" * 30)
-        
-        converter = GRIMarkdownToJsonConverter()
-        result = converter.convert_md_to_json(md_file, output_dir)
-        
-        if result:
-            converter.display_preview()
-            print(f"✅ {md_file.name} -> {Path(result).name}")
-            success_count += 1
-            total_items += sum(len(group['items']) for group in converter.groups)
+        if not args.force and manifest.json_is_current(md_file, output_dir, args.ocr_backend):
+            print(f"⏭️  未變動，沿用: {json_output_path(md_file, output_dir).name}")
+            skipped_files.append(md_file)
         else:
-            print(f"❌ 處理失敗: {md_file.name}")
+            pending_files.append(md_file)
+    
+    file_stats = []
+    ocr_cache = None
+    jobs = max(1, min(args.jobs, len(pending_files)))
+    start_time = time.perf_counter()
+    
+    def record_result(stats):
+        file_stats.append(stats)
+        if stats["success"]:
+            manifest.record_json(stats["md_file"], stats["json_file"], stats["ocr_status"])
+            manifest.save()
+            print(f"✅ {Path(stats['md_file']).name} -> {Path(stats['json_file']).name}"
+                  f"（{stats['groups']} 群組 / {stats['items']} 項目，{stats['seconds']:.2f} 秒）")
+        else:
+            print(f"❌ 處理失敗: {Path(stats['md_file']).name} {stats.get('error', '')}")
+    
+    if jobs > 1:
+        # 平行轉換：每個行程各自建立轉換器與OCR快取連線，OCR行程數依準則數平均分配
+        ocr_workers = args.ocr_workers or max(1, (os.cpu_count() or 1) // jobs)
+        options = {"ocr_workers": ocr_workers, "ocr_cache": True,
+                   "preprocess_mode": args.preprocess_mode, "ocr_mode": args.ocr, "ocr_backend": args.ocr_backend}
+        print(f"\n⚡ 使用 {jobs} 個行程平行轉換 {len(pending_files)} 個檔案（每個行程 {ocr_workers} 個OCR行程）")
+        from concurrent.futures import ProcessPoolExecutor, as_completed
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            futures = [executor.submit(_convert_markdown_job, md_file, output_dir, options) for md_file in pending_files]
+            for future in as_completed(futures):
+                stats = future.result()
+                record_result(stats)
+                if not stats["success"] and stats["log"]:
+                    print("   最後的輸出訊息:")
+                    for line in stats["log"].strip().splitlines()[-10:]:
+                        print(f"   | {line}")
+    else:
+        # 所有檔案共用同一個OCR結果快取（與GUI使用相同的快取檔案）
+        ocr_cache = OCRResultCache()
+        for md_file in pending_files:
+            print(f"\n🔄 處理檔案: {md_file}")
+            print("-" * 30)
+            record_result(convert_markdown_file(md_file, output_dir, ocr_workers=args.ocr_workers,
+                                                ocr_cache=ocr_cache, preprocess_mode=args.preprocess_mode,
+                                                ocr_mode=args.ocr, ocr_backend=args.ocr_backend))
+        shutdown_ocr_process_pool()
+    
+    elapsed = time.perf_counter() - start_time
+    success_count = sum(1 for stats in file_stats if stats["success"])
+    total_items = sum(stats["items"] for stats in file_stats)
     
     # 最終統計
     print("\n" + "=" * 60)
     print("🎉 完整流程處理完成!")
     print(f"📊 處理統計:")
-    print(f"   • 成功處理: {success_count}/{len(md_files)} 個檔案")
-    print(f"   • 總提取項目數: {total_items}")
+    print(f"   • 成功處理: {success_count}/{len(pending_files)} 個檔案")
+    print(f"   • 未變動略過: {len(skipped_files)} 個檔案")
+    print(f"   • 總提取項目數: {total_items}（僅計算本次轉換的檔案）")
+    print(f"   • 轉換耗時: {elapsed:.2f} 秒（{jobs} 個行程）")
+    if file_stats:
+        print(f"\n{'檔案':<36}{'群組':>6}{'項目':>6}{'秒':>10}")
+        for stats in sorted(file_stats, key=lambda stats: stats["md_file"]):
+            print(f"{Path(stats['md_file']).name:<36}{stats['groups']:>6}{stats['items']:>6}{stats['seconds']:>10.2f}")
     print(f"📁 JSON檔案已保存到: {output_dir}")
+    cache_hits = sum(stats['ocr_cache_hits'] for stats in file_stats)
+    cache_misses = sum(stats['ocr_cache_misses'] for stats in file_stats)
+    if cache_hits or cache_misses:
+        print(f"💾 OCR快取: 命中 {cache_hits} / 未命中 {cache_misses}")
+    
+    summary_path = md_dir / CONVERSION_SUMMARY_NAME
+    write_conversion_summary(summary_path, file_stats, skipped_files, jobs, elapsed)
+    print(f"📝 轉換摘要: {summary_path}")
     
     # 列出生成的JSON檔案
     json_files = list(output_dir.glob("*.json"))
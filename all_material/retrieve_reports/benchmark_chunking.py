@@ -0,0 +1,81 @@
+"""
+報告書段落切分效能量測
+
+將報告書重複串接成數 MB 的暫存檔，分別以 iter_report_paragraphs（段落切分）與
+iter_report_chunks（語意分塊）串流切分，回報耗時與峰值記憶體（tracemalloc），確認處理時間
+隨檔案大小線性成長、記憶體維持平穩。另列出每段的平均與最大 token 數，即每個檢索結果
+放入合規分析提示時的成本。
+
+使用方式（於專案根目錄執行）:
+    python all_material/retrieve_reports/benchmark_chunking.py --report "data/report_md/AUO 2023.md" --copies 1 4 16
+    python all_material/retrieve_reports/benchmark_chunking.py --max_tokens 300 --overlap_tokens 40
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+from retrivel import (CHUNK_MAX_TOKENS, CHUNK_OVERLAP_TOKENS, estimate_tokens,
+                      iter_report_chunks, iter_report_paragraphs)
+
+def run_case(iter_texts):
+    """iter_texts 為產生段落文字的函式；返回 (段落數, 耗時, 峰值記憶體)"""
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_texts())
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    sum(1 for _ in iter_texts())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return count, elapsed, peak
+
+def token_stats(iter_texts):
+    """返回 (平均 token 數, 最大 token 數)"""
+    tokens = [estimate_tokens(text) for text in iter_texts()]
+    return sum(tokens) / max(len(tokens), 1), max(tokens, default=0)
+
+def main():
+    parser = argparse.ArgumentParser(description='量測報告書段落切分的耗時與記憶體')
+    parser.add_argument('--report', default='data/report_md/AUO 2023.md', help='報告書 Markdown 檔案')
+    parser.add_argument('--copies', type=int, nargs='+', default=[1, 4, 16], help='報告書重複串接的份數')
+    parser.add_argument('--max_tokens', type=int, default=CHUNK_MAX_TOKENS, help='語意分塊的 token 上限')
+    parser.add_argument('--overlap_tokens', type=int, default=CHUNK_OVERLAP_TOKENS, help='語意分塊的重疊 token 數')
+    args = parser.parse_args()
+
+    def methods(path):
+        return {
+            "段落": lambda: (paragraph for paragraph, _, _ in iter_report_paragraphs(path)),
+            "語意分塊": lambda: (chunk["text"] for chunk in iter_report_chunks(
+                path, max_tokens=args.max_tokens, overlap_tokens=args.overlap_tokens)),
+        }
+
+    with open(args.report, 'r', encoding='utf-8') as f:
+        content = f.read()
+
+    print(f"\n報告書: {args.report}")
+    print("-" * 64)
+    print(f"{'方式':<10}{'段落數':>10}{'平均token':>12}{'最大token':>12}")
+    for name, iter_texts in methods(args.report).items():
+        mean, largest = token_stats(iter_texts)
+        print(f"{name:<10}{sum(1 for _ in iter_texts()):>10}{mean:>12.0f}{largest:>12}")
+
+    print("-" * 76)
+    print(f"{'方式':<10}{'份數':>6}{'大小(MB)':>12}{'段落數':>10}{'耗時(秒)':>12}{'峰值記憶體(MB)':>18}")
+    for copies in args.copies:
+        fd, path = tempfile.mkstemp(suffix=".md", prefix="chunk_benchmark_")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                for _ in range(copies):
+                    f.write(content)
+            size_mb = os.path.getsize(path) / 1024 / 1024
+            for name, iter_texts in methods(path).items():
+                count, elapsed, peak = run_case(iter_texts)
+                print(f"{name:<10}{copies:>6}{size_mb:>12.1f}{count:>10}{elapsed:>12.2f}{peak / 1024 / 1024:>18.2f}")
+        finally:
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
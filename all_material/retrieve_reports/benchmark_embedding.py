@@ -0,0 +1,50 @@
+"""
+批次 embedding 效能比較
+
+使用本機模擬伺服器（embedding_stub_server.py），比較逐筆送出與批次送出
+報告書段落 embedding 的請求次數與耗時，不需要網路或 API 金鑰。
+
+使用方式（於專案根目錄執行）:
+    python all_material/retrieve_reports/benchmark_embedding.py --report "data/report_md/AUO 2023.md"
+"""
+
+import argparse
+import os
+import time
+
+from embedding_stub_server import EmbeddingStubHandler, start_server
+from retrivel import OpenAIEmbeddingFunction, process_markdown_content
+
+def run_case(label, embedding_function, paragraphs):
+    EmbeddingStubHandler.request_count = 0
+    start = time.perf_counter()
+    embeddings = embedding_function(paragraphs)
+    elapsed = time.perf_counter() - start
+    assert len(embeddings) == len(paragraphs)
+    print(f"{label:<10} 請求次數: {EmbeddingStubHandler.request_count:>5}   耗時: {elapsed:8.2f} 秒")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='比較逐筆與批次 embedding 的效能')
+    parser.add_argument('--report', default='data/report_md/AUO 2023.md', help='報告書 Markdown 檔案')
+    parser.add_argument('--latency', type=float, default=0.05, help='模擬伺服器每次請求的延遲（秒）')
+    parser.add_argument('--batch_size', type=int, default=512, help='批次模式每次請求的最多文字數')
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    server, base_url = start_server(latency=args.latency)
+
+    with open(args.report, 'r', encoding='utf-8') as f:
+        paragraphs = process_markdown_content(f.read())
+
+    print(f"\n報告書: {args.report}（{len(paragraphs)} 個段落，模擬延遲 {args.latency} 秒）")
+    print("-" * 50)
+    single = run_case("逐筆", OpenAIEmbeddingFunction(max_batch_size=1, base_url=base_url, cache=False), paragraphs)
+    batched = run_case("批次", OpenAIEmbeddingFunction(max_batch_size=args.batch_size, base_url=base_url, cache=False), paragraphs)
+    print("-" * 50)
+    print(f"加速倍數: {single / batched:.1f}x")
+
+    server.shutdown()
+
+if __name__ == "__main__":
+    main()
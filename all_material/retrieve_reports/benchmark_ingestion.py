@@ -0,0 +1,80 @@
+"""
+報告書寫入效能比較
+
+使用本機 embedding 模擬伺服器與暫存的 ChromaDB，比較逐段落 add 與
+批次 add（預先批次計算 embeddings）寫入整份報告書的耗時。
+
+使用方式（於專案根目錄執行）:
+    python all_material/retrieve_reports/benchmark_ingestion.py --report "data/report_md/AUO 2023.md"
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import chromadb
+
+from embedding_stub_server import EmbeddingStubHandler, start_server
+from retrivel import (OpenAIEmbeddingFunction, add_esg_report_content,
+                      add_esg_report_contents_bulk, process_markdown_content)
+
+REPORT_METADATA = {
+    "report_year": "2023",
+    "company": "benchmark",
+    "section": "GRI 203, 303, 403"
+}
+
+def new_collection(db_path, embedding_function):
+    client = chromadb.PersistentClient(path=db_path)
+    return client.create_collection(name="esg_gri_collection", embedding_function=embedding_function)
+
+def run_case(label, db_path, base_url, ingest):
+    embedding_function = OpenAIEmbeddingFunction(base_url=base_url, cache=False)
+    collection = new_collection(db_path, embedding_function)
+    EmbeddingStubHandler.request_count = 0
+    start = time.perf_counter()
+    ingest(collection, embedding_function)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} 段落數: {collection.count():>5}   embedding 請求: {EmbeddingStubHandler.request_count:>5}"
+          f"   耗時: {elapsed:8.2f} 秒")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description='比較逐段落與批次寫入報告書的效能')
+    parser.add_argument('--report', default='data/report_md/AUO 2023.md', help='報告書 Markdown 檔案')
+    parser.add_argument('--latency', type=float, default=0.05, help='模擬伺服器每次請求的延遲（秒）')
+    parser.add_argument('--chunk_size', type=int, default=256, help='批次模式每次寫入的段落數')
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    server, base_url = start_server(latency=args.latency)
+
+    with open(args.report, 'r', encoding='utf-8') as f:
+        paragraphs = process_markdown_content(f.read())
+
+    print(f"\n報告書: {args.report}（{len(paragraphs)} 個段落，模擬延遲 {args.latency} 秒）")
+    print("-" * 70)
+
+    def ingest_single(collection, embedding_function):
+        for i, paragraph in enumerate(paragraphs):
+            add_esg_report_content(collection, paragraph, REPORT_METADATA, i)
+
+    def ingest_bulk(collection, embedding_function):
+        add_esg_report_contents_bulk(collection, paragraphs, REPORT_METADATA,
+                                     embedding_function=embedding_function, chunk_size=args.chunk_size)
+
+    work_dir = tempfile.mkdtemp(prefix="ingest_benchmark_")
+    try:
+        single = run_case("逐段落", os.path.join(work_dir, "single"), base_url, ingest_single)
+        bulk = run_case("批次", os.path.join(work_dir, "bulk"), base_url, ingest_bulk)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+
+    print("-" * 70)
+    print(f"加速倍數: {single / bulk:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+GRI 準則檢索效能比較
+
+使用本機 embedding 模擬伺服器與暫存的 ChromaDB 寫入報告書後，對每份 GRI 準則比較
+逐子句查詢（每個子句一次 embedding 請求與一次 collection.query）與批次多查詢
+（整份準則一次 collection.query）的耗時，並確認兩者的檢索結果相同。最後比較依序處理
+所有準則與 process_gri_standards_async 同時處理所有準則的總耗時。
+查詢改寫以原文預先填入暫存的改寫快取，不會呼叫 LLM。
+
+使用方式（於專案根目錄執行）:
+    python all_material/retrieve_reports/benchmark_retrieval.py --report "data/report_md/esg_report_short.md"
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import chromadb
+
+from embedding_stub_server import EmbeddingStubHandler, start_server
+from retrivel import (QUERY_REWRITE_MODEL, OpenAIEmbeddingFunction, QueryRewriteCache,
+                      add_esg_report_to_db, process_gri_standards, process_gri_standards_concurrently)
+
+REPORT_METADATA = {
+    "report_year": "2023",
+    "company": "benchmark",
+    "section": "GRI 203, 303, 403"
+}
+
+def identity_rewrite_cache(path, gri_files):
+    """建立以原文作為改寫結果的快取，讓量測不受 LLM 影響"""
+    cache = QueryRewriteCache(path)
+    for gri_file in gri_files:
+        with open(gri_file, 'r', encoding='utf-8') as f:
+            for group in json.load(f)["groups"]:
+                for item in group["items"]:
+                    cache.put(QUERY_REWRITE_MODEL, item["query"], item["query"])
+    return cache
+
+def run_case(collection, gri_file, cache, batch_query):
+    EmbeddingStubHandler.request_count = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        output = process_gri_standards(gri_file, collection, rewrite_cache=cache, batch_query=batch_query)
+    return output, time.perf_counter() - start, EmbeddingStubHandler.request_count
+
+def main():
+    parser = argparse.ArgumentParser(description='比較逐子句與批次多查詢檢索GRI準則的效能')
+    parser.add_argument('--report', default='data/report_md/esg_report_short.md', help='報告書 Markdown 檔案')
+    parser.add_argument('--gri_dir', default='data/gri_json', help='GRI準則JSON檔案的目錄')
+    parser.add_argument('--latency', type=float, default=0.05, help='模擬伺服器每次請求的延遲（秒）')
+    parser.add_argument('--concurrency', type=int, default=4, help='同時處理時的呼叫上限')
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    server, base_url = start_server(latency=args.latency)
+    work_dir = tempfile.mkdtemp(prefix="retrieval_benchmark_")
+    try:
+        embedding_function = OpenAIEmbeddingFunction(base_url=base_url, cache=False)
+        client = chromadb.PersistentClient(path=os.path.join(work_dir, "chroma"))
+        collection = client.create_collection(name="esg_gri_collection", embedding_function=embedding_function)
+        with contextlib.redirect_stdout(io.StringIO()):
+            add_esg_report_to_db(collection, args.report, REPORT_METADATA, embedding_function=embedding_function)
+
+        print(f"\n報告書: {args.report}（{collection.count()} 個分塊，模擬延遲 {args.latency} 秒）")
+        print("-" * 78)
+        print(f"{'準則':<28}{'子句':>6}{'逐子句(秒)':>12}{'請求':>6}{'批次(秒)':>12}{'請求':>6}{'結果相同':>8}")
+        gri_files = sorted(Path(args.gri_dir).glob("*.json"))
+        cache = identity_rewrite_cache(os.path.join(work_dir, "rewrites.json"), gri_files)
+        sequential = {}
+        sequential_time = 0.0
+        for gri_file in gri_files:
+            single, single_time, single_requests = run_case(collection, gri_file, cache, batch_query=False)
+            batch, batch_time, batch_requests = run_case(collection, gri_file, cache, batch_query=True)
+            sequential[gri_file] = batch
+            sequential_time += batch_time
+            clause_count = sum(len(group["items"]) for group in single["rag_results"])
+            print(f"{gri_file.stem:<28}{clause_count:>6}{single_time:>12.2f}{single_requests:>6}"
+                  f"{batch_time:>12.2f}{batch_requests:>6}{'是' if single == batch else '否':>8}")
+
+        # 同時處理所有準則（同樣使用批次改寫與批次查詢）
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            concurrent = process_gri_standards_concurrently(gri_files, collection, rewrite_cache=cache,
+                                                            max_concurrency=args.concurrency)
+        concurrent_time = time.perf_counter() - start
+        print("-" * 78)
+        print(f"全部準則（批次）依序: {sequential_time:.2f} 秒   同時: {concurrent_time:.2f} 秒   "
+              f"結果相同: {'是' if concurrent == sequential else '否'}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+向量資料庫後端效能比較（ChromaDB 與 NumpyVectorCollection）
+
+將報告書語意分塊後，以 embedding 模擬伺服器的固定向量（不需網路）分別寫入暫存的
+ChromaDB 與 NumPy 索引，比較：
+- 冷啟動：在新的行程中匯入 retrivel、開啟既有索引並執行第一次查詢的總耗時
+- 查詢延遲：一次查詢一份準則的所有子句（多查詢），重複執行取中位數
+- 篩選查詢延遲：以 report_id 只查詢目標報告書；--library 大於 1 時另外寫入內容不同的
+  報告書副本，模擬資料庫中有多份報告書，篩選查詢應維持與單份報告書相近的耗時
+- 索引大小：磁碟上的檔案大小
+
+使用方式（於專案根目錄執行）:
+    python all_material/retrieve_reports/benchmark_vector_backends.py --report "data/report_md/AUO 2023.md"
+    python all_material/retrieve_reports/benchmark_vector_backends.py --library 8
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import chromadb
+
+from embedding_stub_server import fake_embedding
+from retrivel import (DEFAULT_COLLECTION_NAME, NumpyVectorCollection, add_esg_report_to_db,
+                      get_report_id, report_where)
+
+REPORT_METADATA = {
+    "report_year": "2023",
+    "company": "benchmark",
+    "section": "GRI 203, 303, 403"
+}
+
+COLD_START_SNIPPET = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {module_dir!r})
+from retrivel import NumpyVectorCollection
+backend, path, query = sys.argv[1], sys.argv[2], json.loads(sys.stdin.read())
+if backend == "chroma":
+    import chromadb
+    collection = chromadb.PersistentClient(path=path).get_collection({name!r})
+else:
+    collection = NumpyVectorCollection(path)
+collection.query(query_embeddings=[query], n_results=5)
+print(time.perf_counter() - start)
+"""
+
+def normalized_embedding(text):
+    vector = fake_embedding(text)
+    norm = sum(v * v for v in vector) ** 0.5
+    return [v / norm for v in vector]
+
+class StubEmbeddingFunction:
+    """以固定向量取代 OpenAI embedding，兩個後端使用完全相同的向量"""
+
+    def name(self):
+        return "stub"
+
+    def __call__(self, input):
+        return [normalized_embedding(text) for text in input]
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, files in os.walk(path) for name in files)
+
+def cold_start(backend, path, query, repeat):
+    """在新的行程中開啟索引並查詢一次，返回行程內量測的最佳耗時"""
+    snippet = COLD_START_SNIPPET.format(module_dir=os.path.dirname(os.path.abspath(__file__)),
+                                        name=DEFAULT_COLLECTION_NAME)
+    timings = []
+    for _ in range(repeat):
+        result = subprocess.run([sys.executable, "-c", snippet, backend, path], input=json.dumps(query),
+                                capture_output=True, text=True, env=dict(os.environ, ANONYMIZED_TELEMETRY="False"))
+        if result.returncode != 0:
+            raise RuntimeError(result.stderr.strip().splitlines()[-1])
+        timings.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(timings)
+
+def query_latency(collection, queries, repeat, where=None):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        collection.query(query_embeddings=queries, n_results=5, where=where,
+                         include=["documents", "distances", "metadatas"])
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='比較ChromaDB與NumPy向量索引的冷啟動與查詢延遲')
+    parser.add_argument('--report', default='data/report_md/AUO 2023.md', help='報告書 Markdown 檔案')
+    parser.add_argument('--gri_dir', default='data/gri_json', help='GRI準則JSON檔案的目錄（作為查詢）')
+    parser.add_argument('--repeat', type=int, default=20, help='查詢延遲的重複次數')
+    parser.add_argument('--cold_repeat', type=int, default=3, help='冷啟動的重複次數（取最佳值）')
+    parser.add_argument('--library', type=int, default=1, help='資料庫中的報告書份數（含目標報告書）')
+    args = parser.parse_args()
+
+    queries = []
+    for name in sorted(os.listdir(args.gri_dir)):
+        with open(os.path.join(args.gri_dir, name), 'r', encoding='utf-8') as f:
+            queries.extend(item["query"] for group in json.load(f)["groups"] for item in group["items"])
+    query_embeddings = [normalized_embedding(query) for query in queries]
+
+    embedding_function = StubEmbeddingFunction()
+    work_dir = tempfile.mkdtemp(prefix="vector_backend_benchmark_")
+    try:
+        chroma_path = os.path.join(work_dir, "chroma")
+        numpy_path = os.path.join(work_dir, "numpy")
+        collections = {
+            "chroma": chromadb.PersistentClient(path=chroma_path).create_collection(
+                name=DEFAULT_COLLECTION_NAME, embedding_function=embedding_function),
+            "numpy": NumpyVectorCollection(numpy_path, embedding_function=embedding_function),
+        }
+        paths = {"chroma": chroma_path, "numpy": numpy_path}
+
+        # 報告書副本在結尾加上不同的文字，使內容指紋（report_id）不同
+        with open(args.report, 'r', encoding='utf-8') as f:
+            content = f.read()
+        reports = [args.report]
+        for i in range(1, args.library):
+            copy_path = os.path.join(work_dir, f"library_{i}.md")
+            with open(copy_path, 'w', encoding='utf-8') as f:
+                f.write(f"{content}\n\n報告書副本 {i}。\n")
+            reports.append(copy_path)
+        where = report_where(get_report_id(args.report))
+
+        print(f"\n報告書: {args.report}（資料庫中 {len(reports)} 份報告書，查詢 {len(queries)} 個子句）")
+        print("-" * 86)
+        print(f"{'後端':<10}{'段落數':>8}{'寫入(秒)':>12}{'冷啟動(秒)':>14}{'查詢(ms)':>12}{'篩選查詢(ms)':>14}{'大小(MB)':>12}")
+        for backend, collection in collections.items():
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for report in reports:
+                    add_esg_report_to_db(collection, report, REPORT_METADATA, embedding_function=embedding_function)
+            ingest_time = time.perf_counter() - start
+            latency = query_latency(collection, query_embeddings, args.repeat)
+            filtered_latency = query_latency(collection, query_embeddings, args.repeat, where=where)
+            cold = cold_start(backend, paths[backend], query_embeddings[0], args.cold_repeat)
+            print(f"{backend:<10}{collection.count():>8}{ingest_time:>12.2f}{cold:>14.2f}{latency * 1000:>12.1f}"
+                  f"{filtered_latency * 1000:>14.1f}{directory_size(paths[backend]) / 1024 / 1024:>12.1f}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+本機 Embedding 模擬伺服器
+
+模擬 OpenAI `POST /v1/embeddings` 介面，回傳由文字雜湊產生的固定向量，
+並對每次請求加入固定延遲以模擬網路往返。用於離線量測批次 embedding 的效能。
+
+使用方式:
+    python embedding_stub_server.py --port 8765 --latency 0.2
+    set OPENAI_BASE_URL=http://127.0.0.1:8765/v1   (Windows)
+    export OPENAI_BASE_URL=http://127.0.0.1:8765/v1  (macOS/Linux)
+"""
+
+import argparse
+import hashlib
+import json
+import struct
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+EMBEDDING_DIM = 1536
+
+def fake_embedding(text, dim=EMBEDDING_DIM):
+    """由文字的 SHA-256 產生可重現的向量（數值介於 -1 與 1 之間）"""
+    values = []
+    counter = 0
+    while len(values) < dim:
+        digest = hashlib.sha256(f"{counter}:{text}".encode("utf-8")).digest()
+        values.extend(v / 32768.0 for v in struct.unpack("<16h", digest))
+        counter += 1
+    return values[:dim]
+
+class EmbeddingStubHandler(BaseHTTPRequestHandler):
+    latency = 0.2
+    request_count = 0
+    input_count = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/embeddings"):
+            self.send_error(404)
+            return
+
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        with EmbeddingStubHandler.lock:
+            EmbeddingStubHandler.request_count += 1
+            EmbeddingStubHandler.input_count += len(inputs)
+
+        # 模擬一次網路往返與伺服器處理時間
+        time.sleep(self.latency)
+
+        payload = {
+            "object": "list",
+            "data": [
+                {"object": "embedding", "index": i, "embedding": fake_embedding(text)}
+                for i, text in enumerate(inputs)
+            ],
+            "model": body.get("model", "text-embedding-ada-002"),
+            "usage": {"prompt_tokens": 0, "total_tokens": 0},
+        }
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_server(port=0, latency=0.2):
+    """在背景執行緒啟動模擬伺服器，回傳 (server, base_url)"""
+    EmbeddingStubHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", port), EmbeddingStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v1"
+    return server, base_url
+
+def main():
+    parser = argparse.ArgumentParser(description='本機 OpenAI Embedding 模擬伺服器')
+    parser.add_argument('--port', type=int, default=8765, help='監聽埠號')
+    parser.add_argument('--latency', type=float, default=0.2, help='每次請求的模擬延遲（秒）')
+    args = parser.parse_args()
+
+    EmbeddingStubHandler.latency = args.latency
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), EmbeddingStubHandler)
+    print(f"Embedding 模擬伺服器啟動: http://127.0.0.1:{args.port}/v1（延遲 {args.latency} 秒）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\n共收到 {EmbeddingStubHandler.request_count} 次請求，{EmbeddingStubHandler.input_count} 筆文字")
+
+if __name__ == "__main__":
+    main()
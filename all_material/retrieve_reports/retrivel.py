@@ -1,41 +1,629 @@
-from openai import OpenAI
-import chromadb
+from openai import OpenAI, APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+import asyncio
+import io
 import json
+import random
 import re
-from chromadb.utils import embedding_functions
+import time
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from array import array
 import os
 from dotenv import load_dotenv
 
 # 載入.env檔案
 load_dotenv()
 
+# tiktoken 為選用依賴：有安裝時精確計算 token，否則使用字元數估算
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uff00-\uffef]')
+_tiktoken_encodings = {}
+
+def estimate_tokens(text, model="text-embedding-ada-002"):
+    """
+    估算文字的 token 數
+
+    有 tiktoken 時使用模型對應的編碼；否則以中日韓字元每字 1 token、
+    其他字元每 4 字元 1 token 估算（偏保守）
+    """
+    if tiktoken is not None:
+        if model not in _tiktoken_encodings:
+            try:
+                _tiktoken_encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _tiktoken_encodings[model] = tiktoken.get_encoding("cl100k_base")
+        return len(_tiktoken_encodings[model].encode(text))
+
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    return cjk_count + (len(text) - cjk_count + 3) // 4
+
+DEFAULT_EMBEDDING_CACHE_PATH = os.path.join(os.path.dirname(__file__), "embedding_cache", "embeddings.sqlite3")
+
+def normalize_text(text):
+    """正規化文字（Unicode NFC、合併空白），作為快取鍵的來源"""
+    return re.sub(r'\s+', ' ', unicodedata.normalize("NFC", text)).strip()
+
+class EmbeddingCache:
+    """
+    以 (模型, 正規化文字雜湊) 為鍵的持久化 embedding 快取
+
+    儲存在 SQLite 中，向量以 float32 二進位保存；總大小超過上限時，
+    依最近使用時間（LRU）淘汰最舊的項目。
+    """
+
+    def __init__(self, db_path=DEFAULT_EMBEDDING_CACHE_PATH, max_size_mb=512):
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db_path = db_path
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # GUI 會在背景執行緒使用，因此允許跨執行緒共用連線（以鎖保護）
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS embeddings (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_access ON embeddings(last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, text):
+        return hashlib.sha256(f"{model}\0{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model, texts):
+        """查詢多筆文字，回傳 {索引: embedding}，只包含命中的項目"""
+        keys = [self.make_key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            # SQLite 參數數量有限制，分段查詢
+            for start in range(0, len(keys), 500):
+                chunk = list(set(keys[start:start + 500]))
+                rows = self._conn.execute(
+                    f"SELECT key, embedding FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})",
+                    chunk
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f")
+                    vector.frombytes(blob)
+                    found[key] = vector.tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE embeddings SET last_access = ? WHERE key = ?",
+                                       [(now, key) for key in found])
+                self._conn.commit()
+
+        result = {i: found[key] for i, key in enumerate(keys) if key in found}
+        self.hits += len(result)
+        self.misses += len(texts) - len(result)
+        return result
+
+    def put_many(self, model, texts, embeddings):
+        """寫入多筆 embedding，並在超過容量時進行淘汰"""
+        now = time.time()
+        rows = [(self.make_key(model, text), model, array("f", embedding).tobytes(), now)
+                for text, embedding in zip(texts, embeddings)]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, embedding, last_access) VALUES (?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """總大小超過上限時，刪除最久未使用的項目直到低於上限的 90%"""
+        total_size = self._conn.execute("SELECT COALESCE(SUM(LENGTH(embedding)), 0) FROM embeddings").fetchone()[0]
+        if total_size <= self.max_size_bytes:
+            return
+
+        target_size = int(self.max_size_bytes * 0.9)
+        removed = 0
+        cursor = self._conn.execute("SELECT key, LENGTH(embedding) FROM embeddings ORDER BY last_access")
+        stale_keys = []
+        for key, size in cursor:
+            if total_size - removed <= target_size:
+                break
+            stale_keys.append((key,))
+            removed += size
+        self._conn.executemany("DELETE FROM embeddings WHERE key = ?", stale_keys)
+        self._conn.commit()
+        print(f"Embedding 快取超過上限，已淘汰 {len(stale_keys)} 筆")
+
+    def stats(self):
+        with self._lock:
+            entries, total_size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(embedding)), 0) FROM embeddings"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "size_bytes": total_size}
+
 class OpenAIEmbeddingFunction:
-    def __init__(self, model="text-embedding-ada-002"):
+    def __init__(self, model="text-embedding-ada-002", max_batch_size=512, max_batch_tokens=100000,
+                 max_retries=5, base_url=None, cache=True):
+        """
+        參數:
+        - model: embedding 模型名稱
+        - max_batch_size: 每次請求最多的文字數（OpenAI 上限為 2048）
+        - max_batch_tokens: 每次請求最多的 token 數（OpenAI 上限為 300000，保留估算誤差空間）
+        - max_retries: 每個批次失敗時的最大重試次數
+        - base_url: API 位址，預設使用 OPENAI_BASE_URL 環境變數或官方位址
+        - cache: True 使用預設路徑的 EmbeddingCache；也可傳入 EmbeddingCache 實例；False/None 停用快取
+        """
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI(api_key=self.api_key)
+        self.client = OpenAI(api_key=self.api_key, base_url=base_url or os.getenv("OPENAI_BASE_URL"))
         self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_retries = max_retries
+        if cache is True:
+            cache = EmbeddingCache()
+        self.cache = cache or None
 
     def name(self):
         return "openai"
 
+    def _make_batches(self, texts):
+        """依 token 預算與數量上限切分批次，回傳每個批次的原始索引列表"""
+        batches = []
+        current_batch = []
+        current_tokens = 0
+        for i, text in enumerate(texts):
+            tokens = estimate_tokens(text, self.model)
+            if current_batch and (len(current_batch) >= self.max_batch_size
+                                  or current_tokens + tokens > self.max_batch_tokens):
+                batches.append(current_batch)
+                current_batch = []
+                current_tokens = 0
+            current_batch.append(i)
+            current_tokens += tokens
+        if current_batch:
+            batches.append(current_batch)
+        return batches
+
+    def _embed_batch(self, batch_texts):
+        """
+        送出單一批次；只有速率限制、逾時、連線錯誤與 5xx 伺服器錯誤會依 Retry-After
+        或指數退避（含抖動）重試，其餘錯誤（輸入過長、金鑰或模型錯誤等）直接拋出
+        """
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.client.embeddings.create(
+                    model=self.model,
+                    input=batch_texts
+                )
+                # 回傳資料依 index 排序，確保與輸入順序一致
+                return [item.embedding for item in sorted(response.data, key=lambda d: d.index)]
+            except (RateLimitError, APITimeoutError, APIConnectionError, APIStatusError) as e:
+                retryable = not isinstance(e, APIStatusError) or isinstance(e, RateLimitError) or e.status_code >= 500
+                if not retryable or attempt == self.max_retries:
+                    raise
+                retry_after = None
+                response = getattr(e, "response", None)
+                if response is not None:
+                    try:
+                        retry_after = float(response.headers.get("retry-after"))
+                    except (TypeError, ValueError):
+                        retry_after = None
+                wait_seconds = retry_after if retry_after is not None else min(2 ** attempt, 30) + random.random()
+                print(f"Embedding 批次失敗（{len(batch_texts)} 筆，{type(e).__name__}），"
+                      f"{wait_seconds:.1f} 秒後重試 ({attempt + 1}/{self.max_retries}): {str(e)}")
+                time.sleep(wait_seconds)
+
     def __call__(self, input):
         # 確保輸入是列表
         if isinstance(input, str):
             input = [input]
-        
-        # 獲取 embeddings
-        embeddings = []
-        for text in input:
-            response = self.client.embeddings.create(
-                model=self.model,
-                input=text
-            )
-            embeddings.append(response.data[0].embedding)
-        
+
+        embeddings = [None] * len(input)
+
+        # 先從快取取得已計算過的 embedding
+        if self.cache is not None:
+            for i, embedding in self.cache.get_many(self.model, input).items():
+                embeddings[i] = embedding
+
+        # 未命中的文字以正規化形式去重（與快取鍵一致），相同文字只計算一次；
+        # 送出的仍是原始文字，是否啟用快取不影響 embedding 的輸入
+        pending = {}
+        for i, text in enumerate(input):
+            if embeddings[i] is None:
+                pending.setdefault(normalize_text(text), []).append(i)
+        pending_keys = list(pending)
+        pending_texts = [input[pending[key][0]] for key in pending_keys]
+
+        # 分批獲取 embeddings，並放回原始順序
+        for batch in self._make_batches(pending_texts):
+            batch_texts = [pending_texts[j] for j in batch]
+            batch_embeddings = self._embed_batch(batch_texts)
+            if self.cache is not None:
+                self.cache.put_many(self.model, batch_texts, batch_embeddings)
+            for j, embedding in zip(batch, batch_embeddings):
+                for i in pending[pending_keys[j]]:
+                    embeddings[i] = embedding
+
         return embeddings
 
+# 向量資料庫後端：chroma（ChromaDB 持久化集合）或 numpy（NumpyVectorCollection）
+VECTOR_BACKENDS = ("chroma", "numpy")
+DEFAULT_COLLECTION_NAME = "esg_gri_collection"
+
+def match_where(metadata, where):
+    """
+    判斷元數據是否符合 ChromaDB 格式的 where 條件
+
+    支援 {"鍵": 值}、{"鍵": {"$eq"/"$ne"/"$gt"/"$gte"/"$lt"/"$lte"/"$in"/"$nin": 值}}
+    以及 {"$and": [...]}、{"$or": [...]}；與 ChromaDB 相同，沒有該鍵的項目不符合任何條件
+    """
+    for key, condition in where.items():
+        if key == "$and":
+            if not all(match_where(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(match_where(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key not in metadata:
+            return False
+        value = metadata[key]
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq":
+                matched = value == operand
+            elif operator == "$ne":
+                matched = value != operand
+            elif operator == "$gt":
+                matched = value > operand
+            elif operator == "$gte":
+                matched = value >= operand
+            elif operator == "$lt":
+                matched = value < operand
+            elif operator == "$lte":
+                matched = value <= operand
+            elif operator == "$in":
+                matched = value in operand
+            elif operator == "$nin":
+                matched = value not in operand
+            else:
+                raise ValueError(f"不支援的 where 運算子: {operator}")
+            if not matched:
+                return False
+    return True
+
+class NumpyVectorCollection:
+    """
+    以 NumPy 實作的本機向量索引，介面與本程式使用到的 ChromaDB 集合方法相同
+    （add / upsert / get / delete / query / count）
+
+    向量正規化後以 float32 連續矩陣保存在向量檔，查詢時以記憶體映射讀取，
+    一次矩陣乘法即可算出所有查詢對所有段落的相似度；文件與元數據逐行附加在元數據檔。
+    刪除與更新時寫入新一代的檔案，再以 manifest.json 原子性地切換到新檔案。
+    距離為正規化向量的平方 L2 距離（2 - 2 × 餘弦相似度），與 ChromaDB 預設的 l2 一致。
+    適合一次只分析一份報告書、數千個段落規模的情境。
+    """
+
+    VECTORS_FILE = "vectors.f32"
+    RECORDS_FILE = "records.jsonl"
+    MANIFEST_FILE = "manifest.json"
+
+    def __init__(self, path, name=DEFAULT_COLLECTION_NAME, embedding_function=None):
+        import numpy as np
+        self._np = np
+        self.name = name
+        self.path = path
+        self.embedding_function = embedding_function
+        self._lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+        self._manifest_path = os.path.join(path, self.MANIFEST_FILE)
+        self._load()
+
+    def _data_paths(self, generation):
+        """返回指定世代的向量檔與元數據檔路徑（第 0 代沿用不含世代編號的檔名）"""
+        if generation == 0:
+            names = (self.VECTORS_FILE, self.RECORDS_FILE)
+        else:
+            names = (f"vectors.{generation}.f32", f"records.{generation}.jsonl")
+        return tuple(os.path.join(self.path, name) for name in names)
+
+    def _read_generation(self):
+        if not os.path.exists(self._manifest_path):
+            return 0
+        with open(self._manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)["generation"]
+
+    def _remove_stale_files(self):
+        """刪除非目前世代的資料檔（替換中斷或 Windows 上仍被映射而未能刪除的舊檔案）"""
+        current = set(self._data_paths(self._generation))
+        for file_name in os.listdir(self.path):
+            file_path = os.path.join(self.path, file_name)
+            if file_path in current or not re.fullmatch(r'(vectors(\.\d+)?\.f32|records(\.\d+)?\.jsonl)', file_name):
+                continue
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+    @staticmethod
+    def _truncate(file_path, size):
+        if os.path.exists(file_path) and os.path.getsize(file_path) > size:
+            os.truncate(file_path, size)
+
+    def _load(self):
+        """
+        讀取元數據並映射向量檔案
+
+        附加寫入中斷時兩個檔案的列數可能不一致（或元數據最後一行不完整），此時以兩者中
+        較短的一方為準，並將兩個檔案截斷到相同列數，避免之後附加的段落與向量錯位
+        """
+        self.ids, self.documents, self.metadatas = [], [], []
+        self.dim = None
+        self._generation = self._read_generation()
+        self._vectors_path, self._records_path = self._data_paths(self._generation)
+        self._remove_stale_files()
+
+        record_ends = []
+        if os.path.exists(self._records_path):
+            with open(self._records_path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        record = json.loads(line.decode('utf-8'))
+                    except ValueError:
+                        break
+                    offset += len(line)
+                    record_ends.append(offset)
+                    self.ids.append(record["id"])
+                    self.documents.append(record["document"])
+                    self.metadatas.append(record["metadata"])
+                    self.dim = record["dim"]
+        row_count = 0
+        if self.dim and os.path.exists(self._vectors_path):
+            row_count = os.path.getsize(self._vectors_path) // (4 * self.dim)
+        count = min(row_count, len(self.ids))
+        del self.ids[count:], self.documents[count:], self.metadatas[count:]
+        if count == 0:
+            self.dim = None
+        self._truncate(self._records_path, record_ends[count - 1] if count else 0)
+        self._truncate(self._vectors_path, count * 4 * (self.dim or 0))
+        self._positions = {record_id: i for i, record_id in enumerate(self.ids)}
+        self._remap()
+
+    def _remap(self):
+        np = self._np
+        if self.ids:
+            self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode='r', shape=(len(self.ids), self.dim))
+        else:
+            self._vectors = np.zeros((0, self.dim or 0), dtype=np.float32)
+        self._mask_cache = {}
+
+    def _normalize(self, embeddings):
+        np = self._np
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def _embed(self, documents, embeddings):
+        if embeddings is None:
+            if self.embedding_function is None:
+                raise ValueError("未提供 embeddings，且集合沒有設定 embedding 函式")
+            embeddings = self.embedding_function(documents)
+        return self._normalize(embeddings)
+
+    def _append_files(self, vectors_path, records_path, ids, documents, metadatas, matrix):
+        """將段落附加到指定的向量檔與元數據檔末端（先寫向量再寫元數據）"""
+        with open(vectors_path, 'ab') as f:
+            f.write(matrix.tobytes())
+        with open(records_path, 'a', encoding='utf-8') as f:
+            for record_id, document, metadata in zip(ids, documents, metadatas):
+                f.write(json.dumps({"id": record_id, "document": document, "metadata": metadata,
+                                    "dim": self.dim}, ensure_ascii=False) + "\n")
+
+    def _write(self, ids, documents, metadatas, matrix):
+        """新增段落到檔案與記憶體中的索引"""
+        if self.dim is None:
+            self.dim = matrix.shape[1]
+        elif matrix.shape[1] != self.dim:
+            raise ValueError(f"embedding 維度不一致: {matrix.shape[1]} != {self.dim}")
+        metadatas = [metadata or {} for metadata in metadatas]
+        # 先釋放記憶體映射再寫入（Windows 不允許修改仍被映射的檔案）
+        self._vectors = None
+        self._append_files(self._vectors_path, self._records_path, ids, documents, metadatas, matrix)
+        for record_id, document, metadata in zip(ids, documents, metadatas):
+            self._positions[record_id] = len(self.ids)
+            self.ids.append(record_id)
+            self.documents.append(document)
+            self.metadatas.append(metadata)
+        self._remap()
+
+    def _rewrite(self, keep_rows):
+        """
+        只保留指定的列（刪除與更新時使用）
+
+        保留的段落寫入新一代的檔案後，以暫存檔替換 manifest.json 切換世代；
+        os.replace 為原子操作，任何時間點中斷都只會看到完整的舊檔案或完整的新檔案
+        """
+        np = self._np
+        vectors = np.array(self._vectors[keep_rows], dtype=np.float32)
+        ids = [self.ids[i] for i in keep_rows]
+        documents = [self.documents[i] for i in keep_rows]
+        metadatas = [self.metadatas[i] for i in keep_rows]
+
+        generation = self._generation + 1
+        vectors_path, records_path = self._data_paths(generation)
+        for file_path in (vectors_path, records_path):
+            open(file_path, 'wb').close()
+        self._append_files(vectors_path, records_path, ids, documents, metadatas, vectors)
+        temp_manifest = f"{self._manifest_path}.tmp"
+        with open(temp_manifest, 'w', encoding='utf-8') as f:
+            json.dump({"generation": generation}, f)
+        self._vectors = None
+        os.replace(temp_manifest, self._manifest_path)
+
+        self._generation = generation
+        self._vectors_path, self._records_path = vectors_path, records_path
+        self.ids, self.documents, self.metadatas = ids, documents, metadatas
+        self._positions = {record_id: i for i, record_id in enumerate(self.ids)}
+        self._remove_stale_files()
+        self._remap()
+
+    def _row_mask(self, where):
+        """以 where 條件篩選列，相同條件的結果快取到下次寫入為止"""
+        np = self._np
+        if not where:
+            return None
+        key = json.dumps(where, sort_keys=True, ensure_ascii=False)
+        if key not in self._mask_cache:
+            self._mask_cache[key] = np.fromiter((match_where(metadata, where) for metadata in self.metadatas),
+                                                dtype=bool, count=len(self.metadatas))
+        return self._mask_cache[key]
+
+    def count(self):
+        return len(self.ids)
+
+    @staticmethod
+    def _check_unique_ids(ids):
+        """同一批次中的 ID 不可重複（與 ChromaDB 相同）"""
+        if len(set(ids)) != len(ids):
+            duplicates = sorted({record_id for record_id in ids if ids.count(record_id) > 1})
+            raise ValueError(f"同一批次中有重複的 ID: {duplicates[:5]}")
+
+    def add(self, ids, documents, metadatas=None, embeddings=None):
+        """新增段落；已存在的 ID 會被略過（與 ChromaDB 的 add 相同）"""
+        self._check_unique_ids(ids)
+        metadatas = metadatas or [None] * len(ids)
+        with self._lock:
+            new_rows = [i for i, record_id in enumerate(ids) if record_id not in self._positions]
+            if not new_rows:
+                return
+            ids = [ids[i] for i in new_rows]
+            documents = [documents[i] for i in new_rows]
+            metadatas = [metadatas[i] for i in new_rows]
+            if embeddings is not None:
+                embeddings = [embeddings[i] for i in new_rows]
+            self._write(ids, documents, metadatas, self._embed(documents, embeddings))
+
+    def upsert(self, ids, documents, metadatas=None, embeddings=None):
+        """新增或更新段落"""
+        self._check_unique_ids(ids)
+        with self._lock:
+            existing = {record_id for record_id in ids if record_id in self._positions}
+            if existing:
+                self._rewrite([i for i, record_id in enumerate(self.ids) if record_id not in existing])
+        self.add(ids, documents, metadatas, embeddings)
+
+    def delete(self, ids=None, where=None):
+        """刪除符合 ids 與 where 條件的段落（兩者皆未提供時不刪除任何段落）"""
+        if ids is None and not where:
+            return
+        with self._lock:
+            mask = self._row_mask(where)
+            delete_ids = set(ids or [])
+            keep_rows = [i for i, record_id in enumerate(self.ids)
+                         if not ((not ids or record_id in delete_ids) and (mask is None or mask[i]))]
+            if len(keep_rows) != len(self.ids):
+                self._rewrite(keep_rows)
+
+    def get(self, ids=None, where=None, include=("documents", "metadatas")):
+        with self._lock:
+            mask = self._row_mask(where)
+            if ids is not None:
+                rows = [self._positions[record_id] for record_id in ids if record_id in self._positions]
+            else:
+                rows = range(len(self.ids))
+            rows = [i for i in rows if mask is None or mask[i]]
+            result = {"ids": [self.ids[i] for i in rows]}
+            if "documents" in include:
+                result["documents"] = [self.documents[i] for i in rows]
+            if "metadatas" in include:
+                result["metadatas"] = [self.metadatas[i] for i in rows]
+        return result
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10, where=None,
+              include=("documents", "metadatas", "distances")):
+        """
+        以一次矩陣乘法計算所有查詢的相似度，返回每個查詢最近的 n_results 個段落
+
+        有 where 條件時只讀取並計算符合條件的列（同一份報告書的段落通常連續寫入，
+        此時直接取矩陣的連續切片），計算量與目標報告書的大小成正比，而非整個索引
+        """
+        np = self._np
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(list(query_texts))
+        queries = self._normalize(query_embeddings)
+
+        with self._lock:
+            vectors = self._vectors
+            mask = self._row_mask(where)
+            ids, documents, metadatas = self.ids, self.documents, self.metadatas
+
+        rows = None
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                vectors = vectors[rows[0]:rows[-1] + 1]
+            else:
+                vectors = vectors[rows]
+
+        result = {"ids": []}
+        for field in ("documents", "metadatas", "distances"):
+            if field in include:
+                result[field] = []
+        k = min(n_results, len(vectors))
+        if k == 0:
+            for values in result.values():
+                values.extend([] for _ in range(len(queries)))
+            return result
+
+        similarities = queries @ vectors.T
+        for row in similarities:
+            top = np.argpartition(-row, k - 1)[:k]
+            top = top[np.argsort(-row[top], kind="stable")]
+            positions = rows[top] if rows is not None else top
+            result["ids"].append([ids[i] for i in positions])
+            if "documents" in result:
+                result["documents"].append([documents[i] for i in positions])
+            if "metadatas" in result:
+                result["metadatas"].append([metadatas[i] for i in positions])
+            if "distances" in result:
+                result["distances"].append([float(max(0.0, 2.0 - 2.0 * row[i])) for i in top])
+        return result
+
 # 建立向量資料庫結構
-def setup_collection():
+def setup_collection(embedding_function=None, backend=None):
+    """
+    參數:
+    - embedding_function: 使用的 embedding 函式，預設為啟用快取的 OpenAIEmbeddingFunction
+    - backend: "chroma" 使用 ChromaDB；"numpy" 使用記憶體映射的 NumpyVectorCollection
+      （啟動快、適合單一報告書）；預設讀取 ESG_VECTOR_BACKEND 環境變數，未設定時為 chroma
+    """
+    if embedding_function is None:
+        embedding_function = OpenAIEmbeddingFunction()
+    backend = backend or os.getenv("ESG_VECTOR_BACKEND", "chroma")
+    if backend not in VECTOR_BACKENDS:
+        raise ValueError(f"不支援的向量資料庫後端: {backend}（可用: {', '.join(VECTOR_BACKENDS)}）")
+
+    if backend == "numpy":
+        db_path = os.path.join(os.path.dirname(__file__), "numpy_index", DEFAULT_COLLECTION_NAME)
+        collection = NumpyVectorCollection(db_path, embedding_function=embedding_function)
+        print(f"已載入 NumPy 向量索引（{collection.count()} 個段落），路徑：{db_path}")
+        return collection
+
+    import chromadb
+
     # 設定資料庫路徑
     db_path = os.path.join(os.path.dirname(__file__), "chroma_db")
     
@@ -44,21 +632,21 @@ def setup_collection():
     
     # 檢查集合是否存在
     collections = client.list_collections()
-    collection_exists = any(col.name == "esg_gri_collection" for col in collections)
+    collection_exists = any(col.name == DEFAULT_COLLECTION_NAME for col in collections)
     
     if collection_exists:
         # 如果集合存在，直接獲取
         collection = client.get_collection(
-            name="esg_gri_collection",
-            embedding_function=OpenAIEmbeddingFunction()
+            name=DEFAULT_COLLECTION_NAME,
+            embedding_function=embedding_function
         )
         print(f"已載入現有的向量資料庫，路徑：{db_path}")
     else:
         # 如果集合不存在，創建新的集合
         print(f"建立新的向量資料庫，路徑：{db_path}")
         collection = client.create_collection(
-            name="esg_gri_collection",
-            embedding_function=OpenAIEmbeddingFunction(),
+            name=DEFAULT_COLLECTION_NAME,
+            embedding_function=embedding_function,
             metadata={"description": "ESG報告水資源管理段落與GRI準則對應"}
         )
     
@@ -73,51 +661,329 @@ def add_esg_report_content(collection, report_content, metadata, index):
     - metadata: {
         "report_year": "2023",
         "company": "台積電",
-        "section": "水資源管理"
+        "section": "水資源管理",
+        "report_hash": "...",  # 選填，報告書內容指紋
+        "report_id": "..."     # 選填，報告書命名空間（見 report_id_from_hash），查詢時以此篩選
     }
     - index: 段落的索引編號
     """
     collection.add(
         documents=[report_content],
         metadatas=[metadata],
-        ids=[f"{metadata['company']}_{metadata['report_year']}_{metadata.get('section', 'unknown')}_{index}"]
+        ids=[make_paragraph_id(metadata, index)]
     )
 
-def optimize_query_with_llm(query_text):
+def add_esg_report_contents_bulk(collection, paragraphs, metadata, embedding_function=None,
+                                 chunk_size=256, upsert=False, start_index=0):
+    """
+    批次添加多個段落到資料庫，每個分塊只呼叫一次 add/upsert
+
+    參數:
+    - paragraphs: 段落列表（或任何可迭代的段落來源）；項目也可以是 (段落, 該段落額外的元數據)
+    - metadata: 所有段落共用的元數據（格式同 add_esg_report_content）
+    - embedding_function: 提供時先以批次計算 embeddings 再寫入；否則由集合的 embedding 函式計算
+    - chunk_size: 每次寫入的段落數
+    - upsert: True 時使用 upsert，已存在的 ID 會被更新
+    - start_index: 第一個段落的索引編號
+
+    返回:
+    - 寫入的段落數
+    """
+    write = collection.upsert if upsert else collection.add
+    total = 0
+
+    def flush(chunk):
+        documents = [paragraph for _, paragraph, _ in chunk]
+        kwargs = {
+            "documents": documents,
+            "metadatas": [dict(metadata, chunk_index=index, **extra) if extra else metadata
+                          for index, _, extra in chunk],
+            "ids": [make_paragraph_id(metadata, index) for index, _, _ in chunk],
+        }
+        if embedding_function is not None:
+            kwargs["embeddings"] = embedding_function(documents)
+        write(**kwargs)
+
+    chunk = []
+    for index, paragraph in enumerate(paragraphs, start_index):
+        extra = None
+        if isinstance(paragraph, tuple):
+            paragraph, extra = paragraph
+        chunk.append((index, paragraph, extra))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            total += len(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+        total += len(chunk)
+
+    return total
+
+def make_paragraph_id(metadata, index):
+    """產生段落 ID；有報告書指紋時加入指紋前綴，避免不同報告書的段落 ID 互相覆蓋"""
+    report_hash = metadata.get('report_hash')
+    prefix = f"{metadata['company']}_{metadata['report_year']}_{metadata.get('section', 'unknown')}"
+    if report_hash:
+        prefix = f"{prefix}_{report_hash[:16]}"
+    return f"{prefix}_{index}"
+
+def compute_report_fingerprint(md_file):
+    """計算報告書檔案內容的 SHA-256 指紋"""
+    sha256 = hashlib.sha256()
+    with open(md_file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha256.update(block)
+    return sha256.hexdigest()
+
+def report_id_from_hash(report_hash):
+    """由報告書指紋產生報告書 ID（內容相同的報告書共用同一個命名空間）"""
+    return report_hash[:16]
+
+def get_report_id(md_file):
+    """計算報告書檔案的報告書 ID，檢索時用於只查詢該報告書的段落"""
+    return report_id_from_hash(compute_report_fingerprint(md_file))
+
+def report_where(report_id=None, where=None):
+    """組合報告書 ID 與其他 where 條件；都未提供時返回 None（查詢整個集合）"""
+    conditions = [condition for condition in (where, {"report_id": report_id} if report_id else None) if condition]
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+def is_report_ingested(collection, report_hash, expected_count, chunker=None):
+    """
+    檢查集合中是否已有該指紋的完整段落（段落數不足視為未完成的寫入）
+
+    以報告書 ID 查詢，沒有 report_id 的舊段落不計入，會被重新寫入；
+    提供 chunker 時只計算以相同分塊設定寫入的段落，分塊設定改變後會重新寫入
+    """
+    where = {"report_id": report_id_from_hash(report_hash)}
+    if chunker is not None:
+        where = {"$and": [where, {"chunker": chunker}]}
+    existing = collection.get(where=where, include=[])
+    return len(existing["ids"]) >= expected_count
+
+# 查詢改寫使用的模型；提示內容修改時需遞增版本，使舊的改寫結果失效
+QUERY_REWRITE_MODEL = "gpt-4o-mini"
+QUERY_REWRITE_PROMPT_VERSION = 1
+QUERY_REWRITE_BATCH_SIZE = 40
+QUERY_REWRITE_SYSTEM_PROMPT = "你是一個專業的ESG報告分析助手，負責優化查詢文本。"
+
+_openai_clients = {}
+
+def get_openai_client():
+    """取得共用的 OpenAI 客戶端（同一組 API 金鑰與位址只建立一次）"""
+    key = (os.getenv("OPENAI_API_KEY"), os.getenv("OPENAI_BASE_URL"))
+    if key not in _openai_clients:
+        _openai_clients[key] = OpenAI(api_key=key[0], base_url=key[1])
+    return _openai_clients[key]
+
+def query_rewrite_cache_path(gri_json_file):
+    """
+    查詢改寫快取的路徑：與 GRI JSON 目錄同層的 gri_query_rewrites/<準則檔名>.json
+
+    不放在 GRI JSON 目錄中，因為 GUI 會把該目錄下的每個檔案都當作準則處理
+    """
+    gri_dir = os.path.dirname(os.path.abspath(gri_json_file))
+    return os.path.join(os.path.dirname(gri_dir), "gri_query_rewrites", os.path.basename(gri_json_file))
+
+class QueryRewriteCache:
+    """
+    GRI 子句查詢的改寫結果快取，以 (模型, 提示版本, 正規化子句文字雜湊) 為鍵，保存為 JSON 檔案
+
+    GRI 子句內容固定，改寫過一次後即可重複使用，之後的檢索不需再呼叫 LLM。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._dirty = False
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f).get("entries", {})
+            except (OSError, ValueError) as e:
+                print(f"⚠️ 無法讀取查詢改寫快取 {path}: {e}")
+
+    @staticmethod
+    def make_key(model, query_text):
+        return hashlib.sha256(
+            f"{model}\0{QUERY_REWRITE_PROMPT_VERSION}\0{normalize_text(query_text)}".encode("utf-8")
+        ).hexdigest()
+
+    def get(self, model, query_text):
+        entry = self.entries.get(self.make_key(model, query_text))
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry["rewritten"]
+
+    def put(self, model, query_text, rewritten):
+        self.entries[self.make_key(model, query_text)] = {
+            "model": model,
+            "query": query_text,
+            "rewritten": rewritten,
+        }
+        self._dirty = True
+
+    def save(self):
+        """有新項目時寫回檔案（先寫入暫存檔再替換，避免中斷時損壞快取）"""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({"prompt_version": QUERY_REWRITE_PROMPT_VERSION, "entries": self.entries},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(temp_path, self.path)
+        self._dirty = False
+
+def _rewrite_query(query_text, model=QUERY_REWRITE_MODEL, client=None):
+    """以單一請求改寫一個查詢，失敗時拋出例外"""
+    client = client or get_openai_client()
+    prompt = f"""
+    你是一個專業的ESG報告分析助手。以下的查詢文本是GRI準則的內容，我們的目的是要利用這個文本，將它當作QUERY去檢索esg報告書確保是否有符合的內容，所以請幫我優化這個文本，使其更適合用於搜尋ESG報告中的相關內容。
+    請保持原始查詢的核心意圖，但使用更精確和專業的詞彙。
+    
+    原始查詢：{query_text}
+    
+    請直接返回優化後的查詢文本，不需要其他說明。
+    """
+    
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": QUERY_REWRITE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3
+    )
+    
+    return response.choices[0].message.content.strip()
+
+def _rewrite_queries_batch(query_texts, model=QUERY_REWRITE_MODEL, client=None):
+    """
+    以單一結構化請求改寫多個查詢
+
+    返回:
+    - {索引: 改寫後的查詢}，只包含回應中格式正確的項目
+    """
+    client = client or get_openai_client()
+    numbered = "\n".join(json.dumps({"id": i, "query": text}, ensure_ascii=False)
+                         for i, text in enumerate(query_texts))
+    prompt = f"""
+    你是一個專業的ESG報告分析助手。以下每一行都是一個GRI準則子句的查詢文本，我們的目的是要利用這些文本，將它們當作QUERY去檢索esg報告書確保是否有符合的內容，所以請幫我逐一優化這些文本，使其更適合用於搜尋ESG報告中的相關內容。
+    請保持每個原始查詢的核心意圖，但使用更精確和專業的詞彙。
+    
+    原始查詢（每行一個JSON物件）：
+    {numbered}
+    
+    請只返回JSON物件：{{"queries": [{{"id": 編號, "query": "優化後的查詢文本"}}, ...]}}，每個原始查詢對應一個項目。
+    """
+    
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": QUERY_REWRITE_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.3,
+        response_format={"type": "json_object"}
+    )
+    
+    data = json.loads(response.choices[0].message.content)
+    rewritten = {}
+    for entry in data.get("queries", []):
+        if not isinstance(entry, dict):
+            continue
+        index, text = entry.get("id"), entry.get("query")
+        if isinstance(index, int) and 0 <= index < len(query_texts) and isinstance(text, str) and text.strip():
+            rewritten[index] = text.strip()
+    return rewritten
+
+def optimize_query_with_llm(query_text, model=QUERY_REWRITE_MODEL, cache=None):
     """
     使用 LLM 優化查詢文本
     
     參數:
     - query_text: 原始查詢文本
+    - model: 改寫使用的模型
+    - cache: QueryRewriteCache，提供時先查快取，成功改寫後寫入快取
     
     返回:
-    - 優化後的查詢文本
+    - 優化後的查詢文本（發生錯誤時返回原始查詢）
     """
+    if cache is not None:
+        cached = cache.get(model, query_text)
+        if cached is not None:
+            return cached
     try:
-        client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        prompt = f"""
-        你是一個專業的ESG報告分析助手。以下的查詢文本是GRI準則的內容，我們的目的是要利用這個文本，將它當作QUERY去檢索esg報告書確保是否有符合的內容，所以請幫我優化這個文本，使其更適合用於搜尋ESG報告中的相關內容。
-        請保持原始查詢的核心意圖，但使用更精確和專業的詞彙。
-        
-        原始查詢：{query_text}
-        
-        請直接返回優化後的查詢文本，不需要其他說明。
-        """
-        
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "你是一個專業的ESG報告分析助手，負責優化查詢文本。"},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.3
-        )
-        
-        optimized_query = response.choices[0].message.content.strip()
-        return optimized_query
+        optimized_query = _rewrite_query(query_text, model)
     except Exception as e:
         print(f"LLM優化查詢時發生錯誤: {str(e)}")
         return query_text
+    if cache is not None:
+        cache.put(model, query_text, optimized_query)
+    return optimized_query
+
+def optimize_queries_with_llm(query_texts, model=QUERY_REWRITE_MODEL, cache=None, batch_size=QUERY_REWRITE_BATCH_SIZE):
+    """
+    批次改寫多個查詢：快取命中的直接使用，其餘去重後每 batch_size 個合併為一次請求
+
+    批次回應缺少的項目或批次請求失敗時，改以逐筆請求改寫；仍失敗的查詢使用原始文本且不寫入快取。
+
+    參數:
+    - query_texts: 原始查詢列表
+    - model: 改寫使用的模型
+    - cache: QueryRewriteCache，提供時會在結束時保存新的改寫結果
+    - batch_size: 每次批次請求的查詢數
+
+    返回:
+    - 與 query_texts 順序一致的改寫結果列表
+    """
+    results = [None] * len(query_texts)
+    pending = {}
+    for i, text in enumerate(query_texts):
+        cached = cache.get(model, text) if cache is not None else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(text, []).append(i)
+    
+    pending_texts = list(pending)
+    rewritten = {}
+    for start in range(0, len(pending_texts), batch_size):
+        batch = pending_texts[start:start + batch_size]
+        try:
+            batch_result = _rewrite_queries_batch(batch, model)
+        except Exception as e:
+            print(f"LLM批次優化查詢時發生錯誤，改為逐筆優化: {str(e)}")
+            batch_result = {}
+        for j, text in enumerate(batch):
+            if j in batch_result:
+                rewritten[text] = batch_result[j]
+                continue
+            try:
+                rewritten[text] = _rewrite_query(text, model)
+            except Exception as e:
+                print(f"LLM優化查詢時發生錯誤: {str(e)}")
+    
+    for text, indices in pending.items():
+        optimized_query = rewritten.get(text)
+        if optimized_query is not None and cache is not None:
+            cache.put(model, text, optimized_query)
+        for i in indices:
+            results[i] = optimized_query if optimized_query is not None else text
+    
+    if cache is not None:
+        cache.save()
+    cached_count = len(query_texts) - sum(len(indices) for indices in pending.values())
+    print(f"查詢改寫: {cached_count} 個使用快取，{len(rewritten)}/{len(pending_texts)} 個以 LLM 改寫")
+    return results
 
 def filter_results_by_relevance(results, threshold=0.8):
     """
@@ -135,21 +1001,30 @@ def filter_results_by_relevance(results, threshold=0.8):
     
     filtered_docs = []
     filtered_distances = []
+    filtered_metadatas = []
+    metadatas = (results.get("metadatas") or [None])[0] or [None] * len(results["documents"][0])
     
-    for doc, distance in zip(results["documents"][0], results["distances"][0]):
+    for doc, distance, meta in zip(results["documents"][0], results["distances"][0], metadatas):
         # 將距離轉換為相關性分數 (0-1)
         relevance_score = 1 - (distance / 2)  # 假設最大距離為2
         
         if relevance_score >= threshold:
             filtered_docs.append(doc)
             filtered_distances.append(distance)
+            filtered_metadatas.append(meta)
     
     return {
         "documents": [filtered_docs],
-        "distances": [filtered_distances]
+        "distances": [filtered_distances],
+        "metadatas": [filtered_metadatas]
     }
 
-def query_by_gri_standard(collection, query_text, n_results=5):
+def clean_query_text(query_text):
+    """將中文標點替換為空白並合併空白，作為向量檢索的查詢文本"""
+    query_text = re.sub(r'[，。、；：！？]', ' ', query_text)
+    return re.sub(r'\s+', ' ', query_text).strip()
+
+def query_by_gri_standard(collection, query_text, n_results=5, optimized_query=None, rewrite_cache=None, where=None):
     """
     根據GRI準則查詢相關的報告書段落
     
@@ -157,17 +1032,20 @@ def query_by_gri_standard(collection, query_text, n_results=5):
     - collection: ChromaDB集合
     - query_text: GRI準則的查詢內容
     - n_results: 返回結果數量
+    - optimized_query: 已改寫的查詢文本，提供時不再呼叫 LLM
+    - rewrite_cache: QueryRewriteCache，未提供 optimized_query 時用於查詢改寫
+    - where: 元數據篩選條件（例如 report_where(report_id)），只在符合條件的段落中檢索
     
     返回:
     - 符合條件的報告書段落列表
     """
     try:
         # 使用 LLM 優化查詢文本
-        optimized_query = optimize_query_with_llm(query_text)
+        if optimized_query is None:
+            optimized_query = optimize_query_with_llm(query_text, cache=rewrite_cache)
         
         # 優化查詢文本格式
-        optimized_query = re.sub(r'[，。、；：！？]', ' ', optimized_query)
-        optimized_query = re.sub(r'\s+', ' ', optimized_query).strip()
+        optimized_query = clean_query_text(optimized_query)
         
         print(f"\n原始查詢: {query_text}")
         print(f"優化後查詢: {optimized_query}")
@@ -175,8 +1053,9 @@ def query_by_gri_standard(collection, query_text, n_results=5):
         # 執行查詢
         results = collection.query(
             query_texts=[optimized_query],
-            include=["documents", "distances"],
-            n_results=n_results
+            include=["documents", "distances", "metadatas"],
+            n_results=n_results,
+            where=where
         )
         
         # 過濾結果
@@ -186,21 +1065,121 @@ def query_by_gri_standard(collection, query_text, n_results=5):
         return filtered_results
     except Exception as e:
         print(f"查詢時發生錯誤: {str(e)}")
-        return {"documents": [[]], "distances": [[]]}
+        return {"documents": [[]], "distances": [[]], "metadatas": [[]]}
 
-def process_gri_standards(input_file, collection):
+def query_by_gri_standards_batch(collection, query_texts, optimized_queries, n_results=5, where=None):
     """
-    處理GRI準則並查詢相關內容
-    
+    以單次多查詢 collection.query 檢索一份準則所有子句，再依子句拆分結果
+
+    所有查詢的 embedding 由集合的 embedding 函式一次批次計算；相同的查詢文本只送出一次。
+    批次查詢失敗時改為逐個子句查詢。
+
     參數:
-    - input_file: GRI準則的JSON檔案路徑
     - collection: ChromaDB集合
+    - query_texts: GRI準則的查詢內容列表
+    - optimized_queries: 與 query_texts 順序一致的改寫後查詢
+    - n_results: 每個查詢返回結果數量
+    - where: 元數據篩選條件（同 query_by_gri_standard）
+
+    返回:
+    - 與 query_texts 順序一致的過濾後結果列表（格式同 query_by_gri_standard）
     """
+    cleaned = [clean_query_text(query) for query in optimized_queries]
+    unique_queries = list(dict.fromkeys(cleaned))
+    if not unique_queries:
+        return []
+    
+    try:
+        print(f"\n批次查詢 {len(query_texts)} 個子句（{len(unique_queries)} 個不重複查詢）")
+        results = collection.query(
+            query_texts=unique_queries,
+            include=["documents", "distances", "metadatas"],
+            n_results=n_results,
+            where=where
+        )
+    except Exception as e:
+        print(f"批次查詢時發生錯誤，改為逐個子句查詢: {str(e)}")
+        return [query_by_gri_standard(collection, query, n_results, optimized_query=optimized, where=where)
+                for query, optimized in zip(query_texts, optimized_queries)]
+    
+    metadatas = results.get("metadatas") or [None] * len(unique_queries)
+    per_query = {}
+    for i, query in enumerate(unique_queries):
+        per_query[query] = filter_results_by_relevance({
+            "documents": [results["documents"][i]],
+            "distances": [results["distances"][i]],
+            "metadatas": [metadatas[i]],
+        })
+    return [per_query[query] for query in cleaned]
+
+def merge_adjacent_chunks(documents, distances, metadatas):
+    """
+    合併同一份報告書中連續的語意分塊，並去除重疊部分，避免重疊內容在提示中重複計費
+
+    參數:
+    - documents / distances / metadatas: 單一查詢的結果（metadatas 可為 None）
+
+    返回:
+    - [{"content", "distance", "metadata"}]，依最佳距離排序；合併後的距離取較小者
+    """
+    metadatas = metadatas or [None] * len(documents)
+    results = [{"content": doc, "distance": distance, "metadata": meta or {}}
+               for doc, distance, meta in zip(documents, distances, metadatas)]
+
+    # 只有帶 chunk_index 的語意分塊可以合併；依 (報告書, 索引) 排序後合併連續的索引
+    mergeable = sorted((r for r in results if "chunk_index" in r["metadata"]),
+                       key=lambda r: (r["metadata"].get("report_hash", ""), r["metadata"]["chunk_index"]))
+    merged = [r for r in results if "chunk_index" not in r["metadata"]]
+    for result in mergeable:
+        previous = merged[-1] if merged and "chunk_index" in merged[-1]["metadata"] else None
+        meta = result["metadata"]
+        if (previous is not None
+                and previous["metadata"].get("report_hash") == meta.get("report_hash")
+                and previous["metadata"]["chunk_index"] + 1 == meta["chunk_index"]):
+            overlap = meta.get("overlap_chars", 0)
+            separator = "" if overlap else "\n"
+            previous["content"] = previous["content"] + separator + result["content"][overlap:]
+            previous["distance"] = min(previous["distance"], result["distance"])
+            previous["metadata"] = dict(previous["metadata"],
+                                        chunk_index=meta["chunk_index"],
+                                        end_offset=meta.get("end_offset"),
+                                        page_end=meta.get("page_end"))
+            continue
+        merged.append(dict(result, metadata=dict(meta)))
+
+    merged.sort(key=lambda r: r["distance"])
+    return merged
+
+def format_answer(result):
+    """將檢索結果轉為輸出的答案項目，語意分塊附上章節與頁碼供合規分析引用"""
+    answer = {"content": result["content"]}
+    meta = result["metadata"]
+    if meta.get("heading_path"):
+        answer["heading_path"] = meta["heading_path"]
+    if meta.get("page") is not None:
+        answer["page"] = meta["page"]
+        if meta.get("page_end") not in (None, meta["page"]):
+            answer["page_end"] = meta["page_end"]
+    return answer
+
+def load_gri_standard(input_file):
+    """讀取GRI準則JSON，返回 (準則內容, 不重複的子句查詢列表)"""
     print(f"\n開始處理檔案: {input_file}")
     with open(input_file, 'r', encoding='utf-8') as f:
         input_data = json.load(f)
     
     print(f"讀取到 {len(input_data['groups'])} 個群組")
+    queries = list(dict.fromkeys(item["query"] for group in input_data["groups"] for item in group["items"]))
+    return input_data, queries
+
+def build_rag_results(input_data, get_results):
+    """
+    依準則的群組與子句順序組成 rag_results
+
+    參數:
+    - input_data: GRI準則內容
+    - get_results: 以子句查詢取得過濾後檢索結果的函式（格式同 query_by_gri_standard 的返回值）
+    """
     output_data = {"rag_results": []}
     
     for group in input_data["groups"]:
@@ -213,21 +1192,18 @@ def process_gri_standards(input_file, collection):
         for item in group["items"]:
             clause = item["clause"]
             query = item["query"]
-            
-            # 使用GRI準則的查詢內容進行搜索
-            results = query_by_gri_standard(collection, query)
+            results = get_results(query)
             
             # 整理查詢結果，保留所有結果
             answers = []
             if results["documents"] and len(results["documents"]) > 0:
                 documents = results["documents"][0]
                 distances = results["distances"][0]
+                metadatas = results.get("metadatas", [None])[0]
                 
                 print(f"找到 {len(documents)} 個結果")
-                for doc, distance in zip(documents, distances):
-                    answers.append({
-                        "content": doc
-                    })
+                for result in merge_adjacent_chunks(documents, distances, metadatas):
+                    answers.append(format_answer(result))
             else:
                 print("沒有找到任何結果")
             
@@ -243,6 +1219,441 @@ def process_gri_standards(input_file, collection):
     
     return output_data
 
+def process_gri_standards(input_file, collection, rewrite_cache=True, batch_rewrite=True,
+                          rewrite_model=QUERY_REWRITE_MODEL, batch_query=True, report_id=None):
+    """
+    處理GRI準則並查詢相關內容
+    
+    參數:
+    - input_file: GRI準則的JSON檔案路徑
+    - collection: ChromaDB集合
+    - rewrite_cache: True 使用 query_rewrite_cache_path 的快取；也可傳入 QueryRewriteCache；False/None 停用快取
+    - batch_rewrite: True 時先以批次請求改寫所有子句的查詢，否則逐個子句改寫
+    - rewrite_model: 查詢改寫使用的模型
+    - batch_query: True 時以單次多查詢檢索所有子句（需搭配 batch_rewrite），否則逐個子句查詢
+    - report_id: 只在該報告書的段落中檢索（見 get_report_id）；None 時查詢整個集合
+    """
+    input_data, queries = load_gri_standard(input_file)
+    where = report_where(report_id)
+
+    if rewrite_cache is True:
+        rewrite_cache = QueryRewriteCache(query_rewrite_cache_path(input_file))
+    rewrite_cache = rewrite_cache or None
+
+    # 批次改寫整份準則的查詢；快取全部命中時不會呼叫 LLM
+    optimized_queries = {}
+    batch_results = {}
+    if batch_rewrite:
+        optimized_queries = dict(zip(queries, optimize_queries_with_llm(queries, rewrite_model, rewrite_cache)))
+        
+        # 一次檢索所有子句，之後逐個子句取出對應的結果
+        if batch_query:
+            batch_results = dict(zip(queries, query_by_gri_standards_batch(
+                collection, queries, [optimized_queries[query] for query in queries], where=where)))
+    
+    def get_results(query):
+        if query in batch_results:
+            return batch_results[query]
+        optimized_query = optimized_queries.get(query)
+        if optimized_query is None:
+            optimized_query = optimize_query_with_llm(query, rewrite_model, rewrite_cache)
+        
+        # 使用GRI準則的查詢內容進行搜索
+        return query_by_gri_standard(collection, query, optimized_query=optimized_query, where=where)
+    
+    output_data = build_rag_results(input_data, get_results)
+    
+    if rewrite_cache is not None:
+        rewrite_cache.save()
+    return output_data
+
+async def process_gri_standards_async(input_files, collection, max_concurrency=4, rewrite_cache=True,
+                                      batch_rewrite=True, rewrite_model=QUERY_REWRITE_MODEL, batch_query=True,
+                                      report_id=None):
+    """
+    同時處理多份GRI準則的查詢改寫與檢索
+
+    每份準則各自依序進行「改寫 → embedding 與向量檢索」，不同準則之間交錯進行；逐子句模式下
+    同一份準則的子句也會同時處理。阻塞的 OpenAI 與 ChromaDB 呼叫在執行緒中執行，
+    以 semaphore 限制同時進行的呼叫數。
+
+    參數:
+    - input_files: GRI準則的JSON檔案路徑列表
+    - collection: ChromaDB集合
+    - max_concurrency: 同時進行的改寫/檢索呼叫上限
+    - 其餘參數同 process_gri_standards（rewrite_cache 為 True 時每份準則使用各自的快取檔案）
+
+    返回:
+    - {準則檔案路徑: rag_results 輸出}，格式與 process_gri_standards 相同
+    """
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+    where = report_where(report_id)
+
+    async def run_blocking(func, *args, **kwargs):
+        async with sem:
+            return await asyncio.to_thread(func, *args, **kwargs)
+
+    async def process_one(input_file):
+        input_data, queries = load_gri_standard(input_file)
+        cache = QueryRewriteCache(query_rewrite_cache_path(input_file)) if rewrite_cache is True else rewrite_cache or None
+        
+        if batch_rewrite:
+            optimized = await run_blocking(optimize_queries_with_llm, queries, rewrite_model, cache)
+        else:
+            optimized = await asyncio.gather(*(run_blocking(optimize_query_with_llm, query, rewrite_model, cache)
+                                               for query in queries))
+        
+        if batch_query:
+            results = await run_blocking(query_by_gri_standards_batch, collection, queries, optimized, where=where)
+        else:
+            results = await asyncio.gather(*(run_blocking(query_by_gri_standard, collection, query,
+                                                          optimized_query=optimized_query, where=where)
+                                             for query, optimized_query in zip(queries, optimized)))
+        
+        if cache is not None:
+            cache.save()
+        return build_rag_results(input_data, dict(zip(queries, results)).__getitem__)
+
+    outputs = await asyncio.gather(*(process_one(input_file) for input_file in input_files))
+    return dict(zip(input_files, outputs))
+
+def process_gri_standards_concurrently(input_files, collection, **options):
+    """process_gri_standards_async 的同步入口（參數相同），供非 async 的呼叫端使用"""
+    return asyncio.run(process_gri_standards_async(input_files, collection, **options))
+
+# 報告書段落的長度上限（字元數，累計達到時強制分段）與最短保留長度
+MAX_PARAGRAPH_CHARS = 8100
+MIN_PARAGRAPH_CHARS = 10
+
+# 逐行清理Markdown標記用的預編譯模式
+HEADING_MARK_RE = re.compile(r'#+ ')
+EMPHASIS_MARK_RE = re.compile(r'\*\*|\*|__|_')
+LINK_MARK_RE = re.compile(r'\[([^\]]+)\]\([^\)]+\)')
+PARAGRAPH_END_RE = re.compile(r'[。？！]$')
+
+def clean_markdown_line(line):
+    """移除單行中的標題、粗體/斜體與連結標記（先以字元檢查略過不含標記的行）"""
+    if '#' in line:
+        line = HEADING_MARK_RE.sub('', line)
+    if '*' in line or '_' in line:
+        line = EMPHASIS_MARK_RE.sub('', line)
+    if '](' in line:
+        line = LINK_MARK_RE.sub(r'\1', line)
+    return line
+
+def iter_markdown_paragraphs(lines, max_chars=MAX_PARAGRAPH_CHARS, min_chars=MIN_PARAGRAPH_CHARS):
+    """
+    逐行串流切分Markdown段落，記憶體用量只與當前段落有關
+
+    遇到以句號、問號或驚嘆號結尾的行即結束段落；以 # 開頭的行（去除標題標記後）開始新的區段；
+    段落累計長度達到 max_chars 時強制分段；包含 .png 的行會被略過。
+
+    參數:
+    - lines: 逐行的文字來源（已開啟的檔案或 io.StringIO）
+    - max_chars: 段落長度上限
+    - min_chars: 長度不超過此值的段落會被捨棄
+
+    產生:
+    - (段落文字, 起始偏移, 結束偏移)：段落第一行起點與最後一行終點在原始內容中的字元位置
+    """
+    parts = []
+    length = 0      # 等同 len(' '.join(parts))，隨著加入的行累計，不需每行重新組合
+    start = end = 0
+    offset = 0
+    
+    for raw_line in lines:
+        line_start = offset
+        offset += len(raw_line)
+        line = clean_markdown_line(raw_line.rstrip('\n'))
+        if '.png' in line:
+            continue
+        
+        stripped = line.strip()
+        # 新區段、段落長度達上限時，先結束當前段落
+        if parts and (line.startswith('#') or (stripped and length + len(stripped) >= max_chars)):
+            paragraph = ' '.join(parts)
+            if len(paragraph) > min_chars:
+                yield paragraph, start, end
+            parts = []
+            length = 0
+        
+        if not stripped:
+            continue
+        
+        if not parts:
+            start = line_start
+            length = len(stripped)
+        else:
+            length += 1 + len(stripped)
+        parts.append(stripped)
+        end = line_start + len(line)
+        
+        # 如果遇到句號、問號或驚嘆號，可能是段落結束
+        if PARAGRAPH_END_RE.search(stripped):
+            paragraph = ' '.join(parts)
+            if len(paragraph) > min_chars:
+                yield paragraph, start, end
+            parts = []
+            length = 0
+    
+    # 處理最後一個段落
+    if parts:
+        paragraph = ' '.join(parts)
+        if len(paragraph) > min_chars:
+            yield paragraph, start, end
+
+def iter_report_paragraphs(md_file):
+    """從報告書檔案串流讀取並切分段落，產生 (段落文字, 起始偏移, 結束偏移)"""
+    with open(md_file, 'r', encoding='utf-8') as f:
+        yield from iter_markdown_paragraphs(f)
+
+# 語意分塊的 token 預算：每塊上限、相鄰塊重疊量，以及計算 token 使用的模型
+CHUNK_MAX_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 60
+CHUNK_TOKEN_MODEL = "text-embedding-ada-002"
+
+# 語意分塊規則的版本；修改分塊或元數據規則時需遞增，使既有的分塊重新寫入
+CHUNKER_VERSION = 2
+
+HEADING_LINE_RE = re.compile(r'^(#{1,6})\s+(.*)$')
+TABLE_SEPARATOR_RE = re.compile(r'^\|?\s*:?-{3,}')
+SENTENCE_SPLIT_RE = re.compile(r'(?<=[。？！；])|(?<=[.?!;])\s+')
+PAGE_BREAK = '\x0c'
+
+def split_oversized_text(text, max_tokens, model=CHUNK_TOKEN_MODEL):
+    """
+    將超過 token 上限的文字切成句子（單一句子仍超過上限時依字元數等比例硬切）
+
+    返回:
+    - [(片段, 與前一片段之間的分隔字元)]，第一個片段的分隔字元為換行
+    """
+    if estimate_tokens(text, model) <= max_tokens:
+        return [(text, '\n')]
+
+    pieces = []
+    for sentence in SENTENCE_SPLIT_RE.split(text):
+        if not sentence:
+            continue
+        # 中文句讀後直接相接，英文句子之間補回被切掉的空白
+        separator = '' if not pieces or pieces[-1][0].endswith(('。', '？', '！', '；')) else ' '
+        while estimate_tokens(sentence, model) > max_tokens:
+            cut = max(1, len(sentence) * max_tokens // estimate_tokens(sentence, model))
+            pieces.append((sentence[:cut], separator))
+            sentence = sentence[cut:]
+            separator = ''
+        pieces.append((sentence, separator))
+    pieces[0] = (pieces[0][0], '\n')
+    return pieces
+
+def split_table_rows(rows, max_tokens, model=CHUNK_TOKEN_MODEL):
+    """將過大的表格依列分組，每組重複表頭（標題列與分隔列）以保留欄位意義"""
+    header = rows[:2] if len(rows) > 1 and TABLE_SEPARATOR_RE.match(rows[1]) else rows[:1]
+    header_tokens = estimate_tokens('\n'.join(header), model)
+    groups = []
+    current = []
+    current_tokens = header_tokens
+    for row in rows[len(header):]:
+        row_tokens = estimate_tokens(row, model) + 1
+        if current and current_tokens + row_tokens > max_tokens:
+            groups.append('\n'.join(header + current))
+            current = []
+            current_tokens = header_tokens
+        current.append(row)
+        current_tokens += row_tokens
+    if current or not groups:
+        groups.append('\n'.join(header + current))
+    return groups
+
+def has_page_breaks(md_file):
+    """以區塊方式掃描檔案，判斷是否含有換頁字元"""
+    with open(md_file, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            if PAGE_BREAK.encode() in block:
+                return True
+    return False
+
+def iter_markdown_blocks(lines, paginated=None):
+    """
+    將Markdown逐行轉為結構區塊，供語意分塊使用
+
+    產生 (類型, 內容, 起始偏移, 結束偏移, 起始頁, 結束頁)：
+    - ("heading", (層級, 標題文字), ...)：標題行
+    - ("table", [表格列], ...)：連續以 | 開頭的行
+    - ("text", 文字, ...)：以句號、問號、驚嘆號結尾或遇到空行時結束的文字段
+    頁碼依換頁字元（\\f，PDF 轉出的 Markdown 中的頁界）計算，從 1 開始；
+    內容沒有任何換頁字元時頁碼為 None（手寫或未保留分頁的 Markdown 無法得知頁碼）。
+
+    參數:
+    - paginated: 內容是否含有換頁字元；None 時先讀入所有行再判斷（串流讀檔時應由呼叫端提供）
+    """
+    if paginated is None:
+        lines = list(lines)
+        paginated = any(PAGE_BREAK in line for line in lines)
+    page = 1 if paginated else None
+    offset = 0
+    kind = None
+    parts = []
+    start = end = 0
+    start_page = page
+
+    def flush():
+        if kind == "table":
+            return ("table", parts, start, end, start_page, page)
+        return ("text", ' '.join(parts), start, end, start_page, page)
+
+    for raw_line in lines:
+        line_start = offset
+        offset += len(raw_line)
+        line = raw_line.rstrip('\n')
+        line_page = page
+        if PAGE_BREAK in line:
+            if paginated:
+                page += line.count(PAGE_BREAK)
+            line = line.replace(PAGE_BREAK, ' ')
+        if '.png' in line:
+            continue
+
+        stripped = line.strip()
+        heading = HEADING_LINE_RE.match(stripped)
+        line_kind = "table" if stripped.startswith('|') else "text"
+        if parts and (not stripped or heading or line_kind != kind):
+            yield flush()
+            parts = []
+        if not stripped:
+            continue
+        if heading:
+            title = clean_markdown_line(heading.group(2)).strip()
+            yield ("heading", (len(heading.group(1)), title), line_start, line_start + len(line), line_page, page)
+            continue
+
+        if not parts:
+            kind = line_kind
+            start = line_start
+            start_page = line_page
+        parts.append(clean_markdown_line(stripped).strip() if kind == "text" else stripped)
+        end = line_start + len(line)
+
+        if kind == "text" and PARAGRAPH_END_RE.search(stripped):
+            yield flush()
+            parts = []
+
+    if parts:
+        yield flush()
+
+def iter_markdown_chunks(lines, max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS,
+                         min_chars=MIN_PARAGRAPH_CHARS, model=CHUNK_TOKEN_MODEL, paginated=None):
+    """
+    依 token 預算將Markdown串流切成語意分塊
+
+    文字段與表格為最小單位，依序累積到 max_tokens 為止；標題會結束當前分塊並更新標題路徑，
+    因此分塊不跨越章節。因預算而切開時，下一塊會以前一塊結尾不超過 overlap_tokens 的
+    單位開頭，保留上下文。表格不與文字拆散，過大的表格依列切分並重複表頭。
+
+    參數:
+    - lines: 逐行的文字來源（已開啟的檔案或 io.StringIO）
+    - max_tokens: 每塊的 token 上限
+    - overlap_tokens: 相鄰分塊重疊的 token 上限（0 表示不重疊）
+    - min_chars: 長度不超過此值的分塊會被捨棄
+    - model: 計算 token 使用的模型
+    - paginated: 內容是否含有換頁字元（見 iter_markdown_blocks）
+
+    產生:
+    - {"text", "heading_path", "page", "page_end", "start", "end", "tokens", "overlap_chars"}
+      其中 heading_path 為標題列表，start/end 為分塊在原始內容中的字元位置（以行為單位），
+      overlap_chars 為分塊開頭與前一塊結尾重複的字元數
+    """
+    headings = []
+    units = []          # [(文字, token數, 起始偏移, 結束偏移, 起始頁, 結束頁, 與前一單位的分隔字元)]
+    tokens = 0
+    overlap_count = 0   # units 開頭屬於重疊部分的單位數
+
+    def emit():
+        if overlap_count == len(units):
+            return None
+        text = units[0][0] + ''.join(unit[6] + unit[0] for unit in units[1:])
+        if len(text) <= min_chars:
+            return None
+        overlap_chars = 0
+        if overlap_count:
+            overlap_chars = len(units[0][0]) + sum(len(unit[6]) + len(unit[0]) for unit in units[1:overlap_count])
+        return {
+            "text": text,
+            "heading_path": list(headings),
+            "page": units[0][4],
+            "page_end": units[-1][5],
+            "start": units[0][2],
+            "end": units[-1][3],
+            "tokens": estimate_tokens(text, model),
+            "overlap_chars": overlap_chars,
+        }
+
+    def carry_overlap():
+        """保留結尾不超過 overlap_tokens 的單位，作為下一塊的開頭"""
+        carried = []
+        carried_tokens = 0
+        for unit in reversed(units):
+            if carried_tokens + unit[1] > overlap_tokens:
+                break
+            carried.insert(0, unit)
+            carried_tokens += unit[1]
+        return carried, carried_tokens
+
+    for kind, content, start, end, page, page_end in iter_markdown_blocks(lines, paginated):
+        if kind == "heading":
+            chunk = emit() if units else None
+            if chunk:
+                yield chunk
+            units, tokens, overlap_count = [], 0, 0
+            level, title = content
+            del headings[level - 1:]
+            headings.extend([""] * (level - 1 - len(headings)))
+            headings.append(title)
+            continue
+
+        if kind == "table":
+            pieces = [(group, '\n') for group in split_table_rows(content, max_tokens, model)]
+        else:
+            pieces = split_oversized_text(content, max_tokens, model)
+
+        for piece, separator in pieces:
+            piece_tokens = estimate_tokens(piece, model)
+            if units and tokens + piece_tokens + 1 > max_tokens:
+                chunk = emit()
+                if chunk:
+                    yield chunk
+                units, tokens = carry_overlap()
+                overlap_count = len(units)
+                # 重疊部分加上新單位仍超過上限時，放棄重疊
+                if units and tokens + piece_tokens + 1 > max_tokens:
+                    units, tokens, overlap_count = [], 0, 0
+            units.append((piece, piece_tokens, start, end, page, page_end, separator))
+            tokens += piece_tokens + (1 if len(units) > 1 else 0)
+
+    if units:
+        chunk = emit()
+        if chunk:
+            yield chunk
+
+def iter_report_chunks(md_file, **chunk_options):
+    """從報告書檔案串流讀取並產生語意分塊（參數同 iter_markdown_chunks）"""
+    paginated = has_page_breaks(md_file)
+    with open(md_file, 'r', encoding='utf-8') as f:
+        yield from iter_markdown_chunks(f, paginated=paginated, **chunk_options)
+
+def chunk_metadata(chunk):
+    """將分塊資訊轉為 ChromaDB 元數據（值只能是純量，標題路徑以 > 串接，頁碼未知時省略）"""
+    metadata = {
+        "heading_path": " > ".join(title for title in chunk["heading_path"] if title),
+        "start_offset": chunk["start"],
+        "end_offset": chunk["end"],
+        "token_count": chunk["tokens"],
+        "overlap_chars": chunk["overlap_chars"],
+    }
+    if chunk.get("page") is not None:
+        metadata["page"] = chunk["page"]
+        metadata["page_end"] = chunk["page_end"]
+    return metadata
+
 def process_markdown_content(md_content):
     """
     處理Markdown內容，將其分割成適當的段落
@@ -256,48 +1667,7 @@ def process_markdown_content(md_content):
     print("\n開始處理Markdown內容...")
     print(f"原始內容長度: {len(md_content)} 字元")
     
-    # 移除Markdown標記
-    content = re.sub(r'#+ ', '', md_content)  # 移除標題標記
-    content = re.sub(r'\*\*|\*|__|_', '', content)  # 移除粗體和斜體標記
-    content = re.sub(r'\[([^\]]+)\]\([^\)]+\)', r'\1', content)  # 移除連結標記
-    
-    # 過濾掉包含 .png 的行
-    lines = content.split('\n')
-    filtered_lines = [line for line in lines if '.png' not in line]
-    content = '\n'.join(filtered_lines)
-    
-    # 先按標題分割
-    sections = re.split(r'(?m)^(?=#)', content)
-    
-    cleaned_paragraphs = []
-    
-    for section in sections:
-        # 移除空行並分割段落
-        lines = [line.strip() for line in section.split('\n') if line.strip()]
-        
-        # 合併相關的段落
-        current_paragraph = []
-        for line in lines:
-            tmp_text = ' '.join(current_paragraph)
-            if len(tmp_text)+len(line) >= 8100:
-                cleaned_paragraphs.append(' '.join(current_paragraph))
-                current_paragraph = [line]
-            # 如果遇到句號、問號或驚嘆號，可能是段落結束
-            if re.search(r'[。？！]$', line):
-                current_paragraph.append(line)
-                if current_paragraph:
-                    cleaned_paragraphs.append(' '.join(current_paragraph))
-                    current_paragraph = []
-            # 其他情況，繼續當前段落
-            else:
-                current_paragraph.append(line)
-        
-        # 處理最後一個段落
-        if current_paragraph:
-            cleaned_paragraphs.append(' '.join(current_paragraph))
-    
-    # 過濾太短的段落
-    cleaned_paragraphs = [para for para in cleaned_paragraphs if len(para) > 10]
+    cleaned_paragraphs = [paragraph for paragraph, _, _ in iter_markdown_paragraphs(io.StringIO(md_content))]
     
     print(f"清理後保留 {len(cleaned_paragraphs)} 個段落")
     
@@ -309,27 +1679,58 @@ def process_markdown_content(md_content):
     
     return cleaned_paragraphs
 
-def add_esg_report_to_db(collection, md_file, metadata):
+def add_esg_report_to_db(collection, md_file, metadata, embedding_function=None, chunk_size=256,
+                         chunking="semantic", max_tokens=CHUNK_MAX_TOKENS, overlap_tokens=CHUNK_OVERLAP_TOKENS):
+    """
+    將報告書內容加入資料庫（以內容指紋確保同一份報告書只寫入一次）
+
+    參數:
+    - embedding_function: 提供時以批次預先計算 embeddings
+    - chunk_size: 每次寫入資料庫的段落數
+    - chunking: "semantic" 依 token 預算語意分塊並保存標題路徑、頁碼與偏移；"paragraph" 使用原本的段落切分
+    - max_tokens: 語意分塊的 token 上限
+    - overlap_tokens: 語意分塊相鄰塊的重疊 token 數
 
-    with open(md_file, 'r', encoding='utf-8') as f:
-        md_content = f.read()
-    
-    # 處理Markdown內容
-    paragraphs = process_markdown_content(md_content)
-    print(f"從檔案中提取出 {len(paragraphs)} 個段落")
-    
-    # 將每個段落添加到資料庫
-    for i, paragraph in enumerate(paragraphs):
-        add_esg_report_content(collection, paragraph, metadata, i)
+    返回:
+    - True 表示本次有寫入，False 表示集合中已存在相同內容而略過
+    """
+    report_hash = compute_report_fingerprint(md_file)
+    if chunking == "semantic":
+        chunker = f"semantic-v{CHUNKER_VERSION}-{max_tokens}-{overlap_tokens}"
+        def iter_items():
+            for chunk in iter_report_chunks(md_file, max_tokens=max_tokens, overlap_tokens=overlap_tokens):
+                yield chunk["text"], chunk_metadata(chunk)
+    else:
+        chunker = "paragraph"
+        def iter_items():
+            for paragraph, start, end in iter_report_paragraphs(md_file):
+                yield paragraph, {"start_offset": start, "end_offset": end}
+    metadata = dict(metadata, report_hash=report_hash, report_id=report_id_from_hash(report_hash), chunker=chunker)
+
+    # 先串流計算段落數（不保留段落內容），用於判斷是否已完整寫入
+    paragraph_count = sum(1 for _ in iter_items())
+    print(f"從檔案中提取出 {paragraph_count} 個段落（分塊方式: {chunker}）")
+
+    if is_report_ingested(collection, report_hash, paragraph_count, chunker):
+        print(f"報告書已存在於資料庫（指紋 {report_hash[:16]}），略過寫入")
+        return False
+
+    # 移除同一份報告書先前寫入的段落（未完成的寫入或不同的分塊設定），避免新舊分塊同時被檢索到
+    collection.delete(where={"report_hash": report_hash})
+
+    # 再次串流讀取段落，分塊批次添加到資料庫
+    add_esg_report_contents_bulk(collection, iter_items(), metadata,
+                                 embedding_function=embedding_function, chunk_size=chunk_size)
     
-    print(f"已將 {len(paragraphs)} 個段落添加到資料庫")
+    print(f"已將 {paragraph_count} 個段落添加到資料庫")
+    return True
 
 def ReportRetriverAgent():
 
     # 初始化集合
-    collection = setup_collection()
+    embedding_function = OpenAIEmbeddingFunction()
+    collection = setup_collection(embedding_function)
 
-    
     # 設定報告書元數據
     report_metadata = {
         "report_year": "2023",
@@ -339,17 +1740,21 @@ def ReportRetriverAgent():
     
     # 將ESG報告書內容添加到資料庫
     report_path = os.path.join(os.path.dirname(__file__), "marker方法", "部分之ESG報告書", "esg_report.md")
-    add_esg_report_to_db(collection, report_path, report_metadata)
+    add_esg_report_to_db(collection, report_path, report_metadata, embedding_function=embedding_function)
     print("ESG報告書內容已添加到資料庫")
     
     # 處理GRI準則並查詢相關內容
     print("\n開始處理GRI準則...")
-    output_data = process_gri_standards("data/gri_json/GRI 203_converted.json", collection)
+    output_data = process_gri_standards("data/gri_json/GRI 203_converted.json", collection,
+                                        report_id=get_report_id(report_path))
     
     # 將結果寫入輸出檔案
     print("\n將結果寫入檔案...")
     with open("real_output.json", 'w', encoding='utf-8') as f:
         json.dump(output_data, f, ensure_ascii=False, indent=2)
+
+    stats = embedding_function.cache.stats()
+    print(f"Embedding 快取: 命中 {stats['hits']} 筆，未命中 {stats['misses']} 筆，共 {stats['entries']} 筆")
     print("程式執行完成")
 
 if __name__ == "__main__":
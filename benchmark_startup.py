@@ -0,0 +1,90 @@
+"""
+啟動（匯入）時間量測
+
+以 `python -X importtime` 在獨立行程中匯入 GUI 與各階段模組，回報總匯入時間與
+最耗時的頂層模組。可用 --save 保存結果，之後以 --compare 比較啟動時間的變化。
+
+使用方式（於專案根目錄執行）:
+    python benchmark_startup.py --repeat 5
+    python benchmark_startup.py --save startup_before.json
+    python benchmark_startup.py --compare startup_before.json
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+TARGETS = {
+    "GUI": "gui",
+    "GRI轉換CLI": "all_material.extract_standards.gri_to_json_converter",
+    "報告書檢索": "all_material.retrieve_reports.retrivel",
+    "合規分析": "all_material.check_compliance.esg_compliance_agents",
+}
+
+def parse_importtime(stderr):
+    """解析 -X importtime 輸出，返回 [(模組, 累計微秒, 是否為頂層)]"""
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|", 2)
+        entries.append((name.strip(), int(cumulative), not name[1:].startswith(" ")))
+    return entries
+
+def measure(module, repeat):
+    """返回 (最佳行程耗時秒數, 最佳匯入總微秒, 頂層模組列表)，匯入失敗時返回錯誤訊息"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                                capture_output=True, text=True)
+        elapsed = time.perf_counter() - start
+        entries = parse_importtime(result.stderr)
+        if result.returncode != 0:
+            error_lines = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+            return None, error_lines[-1] if error_lines else "匯入失敗"
+        top_level = sorted(((name, us) for name, us, is_top in entries if is_top), key=lambda item: -item[1])
+        total = sum(us for _, us in top_level)
+        if best is None or total < best[1]:
+            best = (elapsed, total, top_level)
+    return best, None
+
+def main():
+    parser = argparse.ArgumentParser(description='量測GUI與各階段模組的匯入時間')
+    parser.add_argument('--repeat', type=int, default=3, help='每個模組重複量測的次數（取最佳值）')
+    parser.add_argument('--top', type=int, default=8, help='列出最耗時的頂層模組數')
+    parser.add_argument('--save', help='將結果保存為JSON檔案')
+    parser.add_argument('--compare', help='與先前保存的結果比較')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    results = {}
+    for label, module in TARGETS.items():
+        print(f"\n📦 {label}（import {module}）")
+        print("-" * 60)
+        best, error = measure(module, args.repeat)
+        if error:
+            print(f"❌ 無法匯入: {error}")
+            continue
+        elapsed, total, top_level = best
+        results[label] = {"import_ms": round(total / 1000, 1), "process_ms": round(elapsed * 1000, 1)}
+        line = f"匯入總時間: {total / 1000:8.1f} ms   行程總時間: {elapsed * 1000:8.1f} ms"
+        if label in baseline:
+            line += f"   （先前: {baseline[label]['import_ms']:.1f} ms）"
+        print(line)
+        for name, us in top_level[:args.top]:
+            print(f"   {name:<40}{us / 1000:>10.1f} ms")
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f"\n📝 結果已保存到: {args.save}")
+
+if __name__ == "__main__":
+    main()
@@ -10,19 +10,12 @@ import sys
 import argparse
 from pathlib import Path
 import warnings
-from all_material.extract_standards.gri_to_json_converter import GRIMarkdownToJsonConverter
-from markitdown import MarkItDown
 import shutil
-from all_material.retrieve_reports.retrivel import setup_collection, add_esg_report_to_db, process_gri_standards, OpenAIEmbeddingFunction
-from all_material.check_compliance.esg_compliance_agents import ComplianceAnalysisAgent, ResultIntegrationAgent, setup_database
-from autogen_ext.models.openai import OpenAIChatCompletionClient
-from autogen_agentchat.messages import TextMessage, BaseChatMessage
-from autogen_core import CancellationToken
-from dotenv import load_dotenv, find_dotenv
 from typing import Sequence, Dict, Any, List, Tuple
-import aiomysql, asyncio
-import pandas as pd
-import chromadb
+import asyncio
+
+# 各階段的模組與重量級套件（GRI轉換器、markitdown、chromadb/openai、autogen、aiomysql、pandas、OCR套件）
+# 都在使用它們的方法內才匯入，啟動GUI時只載入介面本身需要的模組
 
 class App(ctk.CTk):
     def __init__(self):
@@ -47,6 +40,9 @@ class App(ctk.CTk):
         self.results_output_dir = os.path.join(os.getcwd(), "data/result")
         os.makedirs(self.results_output_dir, exist_ok=True) # 確保目錄存在
 
+        # 向量資料庫使用的 embedding 函式（首次寫入報告書時建立）
+        self.embedding_function = None
+
         # 檔案選擇區域 1
         self.frame_files1 = ctk.CTkFrame(self, fg_color="transparent")
         # 調整 grid 位置到 column 0
@@ -351,48 +347,19 @@ class App(ctk.CTk):
             return False
 
     def gri_to_json(self):
-        try:
-            import pytesseract
-            import cv2
-            import numpy as np
-            from PIL import Image
-            OCR_AVAILABLE = True
-            
-            # 🔧 Windows環境下設定Tesseract執行檔路徑
-            import platform
-            import os
-            if platform.system() == "Windows":
-                # 常見的Tesseract安裝路徑
-                tesseract_paths = [
-                    r"C:\Program Files\Tesseract-OCR\tesseract.exe",
-                    r"C:\Program Files (x86)\Tesseract-OCR\tesseract.exe",
-                    r"C:\Tesseract-OCR\tesseract.exe"
-                ]
-                
-                for path in tesseract_paths:
-                    if Path(path).exists():
-                        pytesseract.pytesseract.tesseract_cmd = path
-                        self.append_progress_message(f"✅ 找到Tesseract執行檔: {path}")
-                        
-                        # 🔧 同時設定TESSDATA_PREFIX環境變數
-                        tessdata_dir = str(Path(path).parent / "tessdata")
-                        if Path(tessdata_dir).exists():
-                            os.environ['TESSDATA_PREFIX'] = tessdata_dir
-                            self.append_progress_message(f"✅ 設定TESSDATA_PREFIX: {tessdata_dir}")
-                        
-                        break
-                else:
-                    self.append_progress_message("⚠️  未在常見路徑找到Tesseract，請確認安裝位置")
-            
-        except ImportError:
-            OCR_AVAILABLE = False
-            warnings.warn("OCR功能不可用: 請安裝 pytesseract, opencv-python-headless 和 Pillow")
-            
+        # OCR套件與Tesseract路徑在第一張需要OCR的圖片出現時才由轉換器載入（見 load_ocr_dependencies）
+        from all_material.extract_standards.gri_to_json_converter import (GRIMarkdownToJsonConverter, OCRResultCache,
+                                                                          ConversionManifest, json_output_path,
+                                                                          run_marker, select_changed_pdfs)
+        
         parser = argparse.ArgumentParser(description='將GRI PDF檔案轉換為JSON格式（包含PDF→MD→JSON完整流程）')
         parser.add_argument('--input_pdf_dir', default='data/gri_pdf', help='輸入PDF檔案的目錄')
         parser.add_argument('--md_dir', default='data/gri_pdf_to_md', help='中間Markdown檔案的目錄')
         parser.add_argument('--output_dir', default='data/gri_json', help='輸出JSON檔案的目錄')
         parser.add_argument('--skip_pdf_conversion', action='store_true', help='跳過PDF轉換步驟，直接處理已存在的Markdown檔案')
+        parser.add_argument('--force', action='store_true', help='忽略增量建置清單，重新轉換所有準則')
+        parser.add_argument('--ocr', choices=['auto', 'skip', 'redo'], default='auto',
+                            help='OCR旁路檔的使用方式：auto 沿用有效的結果、skip 不執行OCR、redo 一律重新OCR')
         
         args = parser.parse_args()
         
@@ -426,6 +393,9 @@ class App(ctk.CTk):
             input_pdf_dir.mkdir(parents=True, exist_ok=True)
             self.append_progress_message(f"💡 請將要轉換的PDF檔案放入 {input_pdf_dir} 目錄中")
         
+        # 增量建置清單：記錄每個準則的PDF/Markdown雜湊與轉換器版本（與CLI共用）
+        manifest = ConversionManifest.for_md_dir(md_dir)
+        
         # 步驟1: PDF轉Markdown（如果沒有跳過的話）
         if not args.skip_pdf_conversion:
             self.append_progress_message("\n📋 步驟1: PDF轉Markdown")
@@ -447,28 +417,36 @@ class App(ctk.CTk):
             for pdf_file in pdf_files:
                 self.append_progress_message(f"   • {pdf_file.name}")
             
-            # 使用marker轉換所有PDF（目錄已在前面創建）
-            self.append_progress_message(f"\n🔄 使用marker轉換PDF檔案...")
-            try:
-                import subprocess
-                result = subprocess.run([
-                    'marker', str(input_pdf_dir), '--output_dir', str(md_dir)
-                ], capture_output=True, text=True, cwd=str(Path.cwd()))
-                
-                if result.returncode == 0:
-                    self.append_progress_message("✅ PDF轉換完成!")
-                    self.append_progress_message(f"📁 Markdown檔案已保存到: {md_dir}")
-                else:
-                    self.append_progress_message(f"❌ PDF轉換失敗: {result.stderr}")
-                    return
+            # 只轉換新增或內容變動的PDF
+            changed_pdfs, unchanged_pdfs = select_changed_pdfs(pdf_files, md_dir, manifest, force=args.force)
+            if unchanged_pdfs:
+                self.append_progress_message(f"⏭️  {len(unchanged_pdfs)} 個PDF未變動，沿用既有的Markdown")
+            
+            if not changed_pdfs:
+                self.append_progress_message("✅ 所有PDF都已是最新，不需要重新轉換")
+            else:
+                # 使用marker轉換需要更新的PDF（目錄已在前面創建）
+                self.append_progress_message(f"\n🔄 使用marker轉換 {len(changed_pdfs)} 個PDF檔案...")
+                try:
+                    result = run_marker([pdf_file for pdf_file, _ in changed_pdfs], md_dir)
                     
-            except FileNotFoundError:
-                self.append_progress_message("❌ 找不到marker指令，請確認marker已正確安裝")
-                self.append_progress_message("💡 您可以使用 --skip_pdf_conversion 參數跳過此步驟")
-                return
-            except Exception as e:
-                self.append_progress_message(f"❌ PDF轉換過程發生錯誤: {str(e)}")
-                return
+                    if result.returncode == 0:
+                        for pdf_file, pdf_hash in changed_pdfs:
+                            manifest.record_pdf(pdf_file, md_dir, pdf_hash)
+                        manifest.save()
+                        self.append_progress_message("✅ PDF轉換完成!")
+                        self.append_progress_message(f"📁 Markdown檔案已保存到: {md_dir}")
+                    else:
+                        self.append_progress_message(f"❌ PDF轉換失敗: {result.stderr}")
+                        return
+                        
+                except FileNotFoundError:
+                    self.append_progress_message("❌ 找不到marker指令，請確認marker已正確安裝")
+                    self.append_progress_message("💡 您可以使用 --skip_pdf_conversion 參數跳過此步驟")
+                    return
+                except Exception as e:
+                    self.append_progress_message(f"❌ PDF轉換過程發生錯誤: {str(e)}")
+                    return
         else:
             self.append_progress_message("\n⏭️  跳過PDF轉換步驟，直接處理已存在的Markdown檔案")
         
@@ -490,13 +468,22 @@ class App(ctk.CTk):
         
         # 處理每個markdown檔案（目錄已在前面創建）
         success_count = 0
+        skipped_count = 0
         total_items = 0
         
+        # 所有檔案共用同一個OCR結果快取（與CLI使用相同的快取檔案；需要OCR時才開啟）
+        ocr_cache = OCRResultCache()
+        
         for md_file in md_files:
+            if not args.force and manifest.json_is_current(md_file, output_dir):
+                self.append_progress_message(f"\n⏭️  未變動，沿用: {json_output_path(md_file, output_dir).name}")
+                skipped_count += 1
+                continue
+            
             self.append_progress_message(f"\n🔄 處理檔案: {md_file}")
             self.append_progress_message("-" * 30)
             
-            converter = GRIMarkdownToJsonConverter()
+            converter = GRIMarkdownToJsonConverter(ocr_cache=ocr_cache, ocr_mode=args.ocr)
             result = converter.convert_md_to_json(md_file, output_dir)
             
             if result:
@@ -504,6 +491,8 @@ class App(ctk.CTk):
                 self.append_progress_message(f"✅ {md_file.name} -> {Path(result).name}")
                 success_count += 1
                 total_items += sum(len(group['items']) for group in converter.groups)
+                manifest.record_json(md_file, result, converter.ocr_status())
+                manifest.save()
             else:
                 self.append_progress_message(f"❌ 處理失敗: {md_file.name}")
         
@@ -511,9 +500,13 @@ class App(ctk.CTk):
         self.append_progress_message("\n" + "=" * 60)
         self.append_progress_message("🎉 完整流程處理完成!")
         self.append_progress_message(f"📊 處理統計:")
-        self.append_progress_message(f"   • 成功處理: {success_count}/{len(md_files)} 個檔案")
-        self.append_progress_message(f"   • 總提取項目數: {total_items}")
+        self.append_progress_message(f"   • 成功處理: {success_count}/{len(md_files) - skipped_count} 個檔案")
+        self.append_progress_message(f"   • 未變動略過: {skipped_count} 個檔案")
+        self.append_progress_message(f"   • 總提取項目數: {total_items}（僅計算本次轉換的檔案）")
         self.append_progress_message(f"📁 JSON檔案已保存到: {output_dir}")
+        if ocr_cache.hits or ocr_cache.misses:
+            cache_stats = ocr_cache.stats()
+            self.append_progress_message(f"💾 OCR快取: 命中 {cache_stats['hits']} / 未命中 {cache_stats['misses']}（共 {cache_stats['entries']} 筆）")
         
         # 列出生成的JSON檔案
         json_files = list(output_dir.glob("*.json"))
@@ -529,6 +522,7 @@ class App(ctk.CTk):
     def report_to_md(self, file):
         output_dir = 'data/report_md'
         supported_formats = ['.pdf', '.docx', '.doc', '.pptx', '.ppt', '.xlsx', '.xls']
+        from markitdown import MarkItDown
         md = MarkItDown()
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
@@ -559,6 +553,9 @@ class App(ctk.CTk):
                 self.append_progress_message(f"轉換失敗 {file}: {str(e)}")
 
     def setup_collection():
+        import chromadb
+        from all_material.retrieve_reports.retrivel import OpenAIEmbeddingFunction
+        
         # 設定資料庫路徑
         db_path = os.path.join(os.path.dirname(__file__), "chroma_db")
         
@@ -587,10 +584,14 @@ class App(ctk.CTk):
         
         return collection
 
-    def ReportRetriverAgent(self, gri_path, report_file_path):
-
-        # 初始化集合
-        collection = setup_collection()
+    def ingest_report(self, report_file_path):
+        """將報告書寫入向量資料庫並回傳集合（以內容指紋判斷，同一份報告書只寫入一次）"""
+        from all_material.retrieve_reports.retrivel import OpenAIEmbeddingFunction, add_esg_report_to_db, setup_collection
+        
+        # 初始化集合（embedding 函式在整個執行期間共用，以共用快取）
+        if self.embedding_function is None:
+            self.embedding_function = OpenAIEmbeddingFunction()
+        collection = setup_collection(self.embedding_function)
         report_metadata = {
         "report_year": "2023",
         "company": "台積電",
@@ -598,27 +599,61 @@ class App(ctk.CTk):
     }
         
         # 將ESG報告書內容添加到資料庫
-        add_esg_report_to_db(collection, report_file_path, report_metadata)
-        self.append_progress_message("ESG報告書內容已添加到資料庫")
+        if add_esg_report_to_db(collection, report_file_path, report_metadata,
+                                embedding_function=self.embedding_function):
+            self.append_progress_message("ESG報告書內容已添加到資料庫")
+        else:
+            self.append_progress_message("ESG報告書內容已存在於資料庫，略過寫入")
+        return collection
+
+    def ReportRetriverAgent(self, gri_path, report_file_path, collection=None):
+        from all_material.retrieve_reports.retrivel import get_report_id, process_gri_standards
+
+        # 未提供集合時才寫入報告書
+        if collection is None:
+            collection = self.ingest_report(report_file_path)
         
         # 處理GRI準則並查詢相關內容
         self.append_progress_message("\n開始處理GRI準則...")
         
         self.append_progress_message(f"\n正在處理 {gri_path}...")
-        output_data = process_gri_standards(gri_path, collection)
+        # 只檢索這份報告書的段落（集合中可能有其他報告書）
+        output_data = process_gri_standards(gri_path, collection, report_id=get_report_id(report_file_path))
+        content_path = self.save_content_pair(output_data, gri_path, report_file_path)
+
+        stats = self.embedding_function.cache.stats()
+        self.append_progress_message(f"Embedding 快取: 命中 {stats['hits']} 筆，未命中 {stats['misses']} 筆")
+        self.append_progress_message("RAG搜尋完成")
+        return content_path
+
+    def retrieve_standards(self, gri_paths, report_file_path, collection):
+        """同時檢索多份準則（查詢改寫與向量檢索交錯進行），返回各準則的 content_pair 路徑"""
+        from all_material.retrieve_reports.retrivel import get_report_id, process_gri_standards_concurrently
+
+        self.append_progress_message(f"\n同時處理 {len(gri_paths)} 份GRI準則...")
+        outputs = process_gri_standards_concurrently(gri_paths, collection, report_id=get_report_id(report_file_path))
+        content_paths = [self.save_content_pair(outputs[gri_path], gri_path, report_file_path)
+                         for gri_path in gri_paths]
+
+        stats = self.embedding_function.cache.stats()
+        self.append_progress_message(f"Embedding 快取: 命中 {stats['hits']} 筆，未命中 {stats['misses']} 筆")
+        self.append_progress_message("RAG搜尋完成")
+        return content_paths
+
+    def save_content_pair(self, output_data, gri_path, report_file_path):
+        """將檢索結果寫入 content_pair 檔案並返回其路徑"""
         gri_name = os.path.splitext(os.path.split(gri_path)[1])[0]
         report_name = os.path.splitext(os.path.split(report_file_path)[1])[0]
     
         # 將結果寫入輸出檔案
-        self.append_progress_message("\n將結果寫入檔案...")
+        self.append_progress_message(f"\n將 {gri_name} 的結果寫入檔案...")
         output_path = os.path.join('C:/Users/User/Documents/GitHub/esg_compliance_multi-agent/data/content_pair/', f'{report_name}_{gri_name}.json')
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(output_data, f, ensure_ascii=False, indent=2)
-            
-        self.append_progress_message("RAG搜尋完成")
         return f"data/content_pair/{report_name}_{gri_name}.json"
 
     async def setup_database(self, cfg: Dict[str, Any], *, recreate: bool = True) -> bool:
+        import aiomysql
         ddl_columns = {
             "gri_standard_title": "VARCHAR(255) NOT NULL",
             "gri_clause"        : "VARCHAR(50)  NOT NULL",
@@ -659,6 +694,13 @@ class App(ctk.CTk):
             return False
 
     async def compilance_agent(self, content_path):
+        from dotenv import load_dotenv, find_dotenv
+        from autogen_ext.models.openai import OpenAIChatCompletionClient
+        from autogen_agentchat.messages import TextMessage
+        from autogen_core import CancellationToken
+        from all_material.check_compliance.esg_compliance_agents import (ComplianceAnalysisAgent, ResultIntegrationAgent,
+                                                                        create_db_pool, close_db_pool)
+        
         env_path = Path(__file__).resolve().parent / ".env"
         load_dotenv(dotenv_path=env_path if env_path.exists() else find_dotenv(), override=False)
 
@@ -675,20 +717,24 @@ class App(ctk.CTk):
         content_pair_name = os.path.splitext(os.path.split(content_path)[1])[0]
         TEST_EXCEL_OUTPUT    = f"data/result/{content_pair_name}_compliance_summary_report.xlsx"
         MODEL_NAME           = "gpt-4.1"
+        pool  = await create_db_pool(MYSQL_CONFIG)
         model = OpenAIChatCompletionClient(model=MODEL_NAME, api_key=API_KEY)
-        comp = ComplianceAnalysisAgent("ComplianceAnalyzer", MYSQL_CONFIG, model)
-        integ= ResultIntegrationAgent("ReportIntegrator", MYSQL_CONFIG, TEST_EXCEL_OUTPUT)
+        comp = ComplianceAnalysisAgent("ComplianceAnalyzer", MYSQL_CONFIG, model, pool=pool)
+        integ= ResultIntegrationAgent("ReportIntegrator", MYSQL_CONFIG, TEST_EXCEL_OUTPUT, pool=pool)
 
         with open(TEST_PAIRS_JSON,"r",encoding="utf-8") as f:
             raw=f.read()
-        self.append_progress_message("\n--- 🎬 開始 LLM 分析流程 ---")
-        await comp.on_messages([TextMessage(content=raw,source="Orchestrator")], CancellationToken())
-        self.append_progress_message("--- ✅ 分析結束 ---\n")
+        try:
+            self.append_progress_message("\n--- 🎬 開始 LLM 分析流程 ---")
+            await comp.on_messages([TextMessage(content=raw,source="Orchestrator")], CancellationToken())
+            self.append_progress_message("--- ✅ 分析結束 ---\n")
 
-        self.append_progress_message("--- 🎬 產生 Excel ---")
-        await integ.on_messages([TextMessage(content="export",source="Orchestrator")], CancellationToken())
-        self.append_progress_message("--- ✅ 流程完成 ---")
-        await model.close()
+            self.append_progress_message("--- 🎬 產生 Excel ---")
+            await integ.on_messages([TextMessage(content="export",source="Orchestrator")], CancellationToken())
+            self.append_progress_message("--- ✅ 流程完成 ---")
+        finally:
+            await model.close()
+            await close_db_pool(pool)
 
     def _run_long_process(self):
         try:
@@ -707,13 +753,16 @@ class App(ctk.CTk):
             for i, file_path in enumerate(self.selected_files2):
                 self.append_progress_message(f"處理中: 報告 - {os.path.basename(file_path)}...")
                 md_path = self.report_to_md(file_path)
+
+                # 每份報告書只寫入向量資料庫一次，所有準則共用
+                collection = self.ingest_report(md_path)
             
-                for root, dir, gri_files in os.walk('data/gri_json'):
-                    for gri_file in gri_files:
-                        gri_path = os.path.join('data/gri_json', gri_file)
-                        content_path = self.ReportRetriverAgent(gri_path, md_path)
-                        print(content_path)
-                        asyncio.run(self.compilance_agent(content_path))
+                # 所有準則的檢索同時進行，完成後再依序進行合規分析
+                gri_paths = [os.path.join('data/gri_json', gri_file)
+                             for root, dir, gri_files in os.walk('data/gri_json') for gri_file in gri_files]
+                for content_path in self.retrieve_standards(gri_paths, md_path, collection):
+                    print(content_path)
+                    asyncio.run(self.compilance_agent(content_path))
                 
             self.append_progress_message("\n--- 所有檔案已處理完成 ---")
             # messagebox.showinfo("完成", "檔案處理程序已成功完成！")
@@ -737,6 +786,8 @@ class App(ctk.CTk):
 
     def show_results_window(self):
         """開啟一個新視窗來顯示處理結果 (XLSX 檔案內容使用 Treeview 呈現)"""
+        import pandas as pd
+        
         results_window = ctk.CTkToplevel(self)
         results_window.title("處理結果")
         results_window.geometry("800x600") # 調整視窗大小以容納表格